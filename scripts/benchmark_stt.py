@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+STT 基準測試
+對一個資料夾的 WAV 檔（搭配參考逐字稿）執行不同的 STT 引擎與設定，
+輸出即時率 (RTF)、延遲百分位數、斷句延遲（以 recognizer.listen() 實測）與字元錯誤率 (CER)
+
+參考逐字稿：與音檔同名的 .txt（例如 q01.wav + q01.txt），
+或以 --references 指定 JSONL（每行 {"file": "q01.wav", "text": "..."}）
+
+用法：
+    python scripts/benchmark_stt.py data/eval --config whisper:model=tiny --config whisper:model=base
+    python scripts/benchmark_stt.py --compare data/benchmarks/a.json data/benchmarks/b.json
+"""
+
+import sys
+import os
+import json
+import time
+import wave
+import argparse
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import speech_recognition as sr
+
+# 將 src 目錄加入 Python 路徑
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.voice import SpeechToText, EnergyVAD
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def parse_config(spec: str) -> dict:
+    """
+    解析設定字串，格式: engine[:key=value,key=value]
+
+    支援的 key：model（Whisper 模型）、pause（停頓容忍秒數）、energy（能量門檻）
+    """
+    engine, _, params = spec.partition(':')
+    config = {'name': spec, 'engine': engine.strip().lower(), 'params': {}}
+    for item in filter(None, params.split(',')):
+        key, _, value = item.partition('=')
+        config['params'][key.strip()] = value.strip()
+    return config
+
+
+def build_engine(config: dict) -> SpeechToText:
+    """依設定建立 SpeechToText"""
+    stt = SpeechToText(engine=config['engine'])
+    params = config['params']
+
+    if 'model' in params:
+        stt.whisper_model_name = params['model']
+    if 'pause' in params:
+        stt.recognizer.pause_threshold = float(params['pause'])
+    if 'energy' in params:
+        stt.recognizer.energy_threshold = int(params['energy'])
+    return stt
+
+
+def load_corpus(folder: Path, references: Path = None) -> list:
+    """讀取音檔與參考逐字稿"""
+    refs = {}
+    if references:
+        with open(references, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    refs[entry['file']] = entry['text']
+
+    corpus = []
+    for wav_path in sorted(folder.rglob('*.wav')):
+        text = refs.get(wav_path.name) or refs.get(str(wav_path.relative_to(folder)))
+        txt_path = wav_path.with_suffix('.txt')
+        if text is None and txt_path.exists():
+            text = txt_path.read_text(encoding='utf-8').strip()
+        if text is None:
+            print(f"⚠️  缺少參考逐字稿，略過: {wav_path}")
+            continue
+        corpus.append({'path': wav_path, 'reference': text})
+    return corpus
+
+
+def read_pcm(path: Path):
+    """讀取 WAV 為 int16 單聲道 PCM"""
+    with wave.open(str(path), 'rb') as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+        data = wf.readframes(wf.getnframes())
+
+    if sample_width != 2:
+        raise ValueError(f"只支援 16-bit WAV: {path}")
+
+    samples = np.frombuffer(data, dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+
+class PCMSource(sr.AudioSource):
+    """把記憶體中的 PCM 當成麥克風交給 recognizer.listen()，並記錄讀到哪裡"""
+
+    CHUNK = 1024
+
+    def __init__(self, samples: np.ndarray, sample_rate: int):
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = 2
+        self.data = samples.astype('<i2').tobytes()
+        self.total = len(samples)
+        self.position = 0  # 已讀取的樣本數
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+    def read(self, size: int) -> bytes:
+        chunk = self.data[self.position * 2:(self.position + size) * 2]
+        self.position += len(chunk) // 2
+        return chunk
+
+
+def endpointing_delay(recognizer: sr.Recognizer, samples: np.ndarray, sample_rate: int) -> Optional[float]:
+    """
+    實測斷句延遲：音檔後面補一段靜音當成麥克風輸入，交給 recognizer.listen() 斷句，
+    計算「最後一個語音音框結束」（以 EnergyVAD 標記）到 listen() 判定語句結束之間的延遲（秒）
+
+    負值表示話還沒說完就被切斷；補上的靜音內都沒有斷句（或音檔裡沒有語音）時回傳 None
+    """
+    frame_ms = 20
+    frame_size = sample_rate * frame_ms // 1000
+    vad = EnergyVAD(sample_rate=sample_rate, frame_ms=frame_ms, max_segment_ms=10 ** 9)
+
+    last_voiced_end = None
+    for index in range(len(samples) // frame_size):
+        vad.process(samples[index * frame_size:(index + 1) * frame_size])
+        if vad.last_speech:
+            last_voiced_end = (index + 1) * frame_size
+    if last_voiced_end is None:
+        return None
+
+    silence = np.zeros(int(sample_rate * (recognizer.pause_threshold + 1.0)), dtype=np.int16)
+    source = PCMSource(np.concatenate([samples, silence]), sample_rate)
+
+    # 動態門檻會在 listen() 中被調整，每個音檔都從同樣的門檻開始
+    threshold = recognizer.energy_threshold
+    try:
+        with source:
+            recognizer.listen(source)
+    finally:
+        recognizer.energy_threshold = threshold
+
+    if source.position >= source.total:
+        return None
+    return (source.position - last_voiced_end) / sample_rate
+
+
+def normalize_text(text: str) -> str:
+    """移除空白與標點，英文轉小寫，再轉為繁體（若有安裝 OpenCC）"""
+    text = _to_traditional(text)
+    return ''.join(
+        ch.lower() for ch in text
+        if not ch.isspace() and not unicodedata.category(ch).startswith('P')
+    )
+
+
+_opencc = None
+
+
+def _to_traditional(text: str) -> str:
+    """Whisper 常輸出簡體字，有 OpenCC 時先轉為台灣繁體再比對"""
+    global _opencc
+    if _opencc is None:
+        try:
+            import opencc
+            _opencc = opencc.OpenCC('s2twp')
+        except ImportError:
+            _opencc = False
+    return _opencc.convert(text) if _opencc else text
+
+
+def edit_distance(ref: str, hyp: str) -> int:
+    """字元層級 Levenshtein 距離"""
+    if not ref:
+        return len(hyp)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (r != h)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def percentiles(values: list) -> dict:
+    """常用百分位數"""
+    if not values:
+        return {}
+    arr = np.asarray(values)
+    return {
+        'p50': float(np.percentile(arr, 50)),
+        'p90': float(np.percentile(arr, 90)),
+        'p95': float(np.percentile(arr, 95)),
+        'max': float(arr.max()),
+        'mean': float(arr.mean())
+    }
+
+
+def run_config(config: dict, corpus: list) -> dict:
+    """對整個語料執行一組設定"""
+    print(f"\n🚀 執行設定: {config['name']}")
+    if config['engine'] == 'google':
+        print("⚠️  google 引擎需要網路，結果不是離線數據")
+
+    stt = build_engine(config)
+
+    load_start = time.perf_counter()
+    stt.warm_up()
+    load_time = time.perf_counter() - load_start
+
+    utterances = []
+    total_edits = 0
+    total_chars = 0
+    total_audio = 0.0
+    total_compute = 0.0
+
+    for item in corpus:
+        samples, sample_rate = read_pcm(item['path'])
+        duration = len(samples) / sample_rate
+
+        start = time.perf_counter()
+        try:
+            hypothesis = stt._transcribe_file(str(item['path']))
+            error = None
+        except Exception as e:
+            hypothesis = ""
+            error = type(e).__name__
+        latency = time.perf_counter() - start
+
+        endpoint = endpointing_delay(stt.recognizer, samples, sample_rate)
+
+        ref = normalize_text(item['reference'])
+        hyp = normalize_text(hypothesis)
+        edits = edit_distance(ref, hyp)
+
+        total_edits += edits
+        total_chars += len(ref)
+        total_audio += duration
+        total_compute += latency
+
+        utterances.append({
+            'file': item['path'].name,
+            'duration': duration,
+            'latency': latency,
+            'rtf': latency / duration if duration else 0.0,
+            'endpoint_delay': endpoint,
+            'response_delay': endpoint + latency if endpoint is not None else None,
+            'reference': item['reference'],
+            'hypothesis': hypothesis,
+            'cer': edits / len(ref) if ref else float(bool(hyp)),
+            'error': error
+        })
+        endpoint_text = f"{endpoint:.2f}s" if endpoint is not None else "未斷句"
+        print(f"  • {item['path'].name}: {latency:.2f}s, 斷句 {endpoint_text}, CER {utterances[-1]['cer']:.1%}")
+
+    summary = {
+        'utterances': len(utterances),
+        'audio_seconds': total_audio,
+        'load_time': load_time,
+        'rtf': total_compute / total_audio if total_audio else 0.0,
+        'cer': total_edits / total_chars if total_chars else 0.0,
+        'latency': percentiles([u['latency'] for u in utterances]),
+        'endpoint_delay': percentiles([u['endpoint_delay'] for u in utterances if u['endpoint_delay'] is not None]),
+        'response_delay': percentiles([u['response_delay'] for u in utterances if u['response_delay'] is not None]),
+        'endpoint_missed': sum(1 for u in utterances if u['endpoint_delay'] is None),
+        'errors': sum(1 for u in utterances if u['error'])
+    }
+
+    return {
+        'config': config['name'],
+        'engine': config['engine'],
+        'params': config['params'],
+        'pause_threshold': stt.recognizer.pause_threshold,
+        'summary': summary,
+        'utterances': utterances
+    }
+
+
+def print_summary(results: list):
+    """印出各設定的摘要表"""
+    print("\n" + "=" * 90)
+    print(f"{'設定':<30}{'RTF':>8}{'CER':>8}{'延遲p50':>10}{'延遲p95':>10}{'斷句p50':>10}{'回應p95':>10}")
+    print("-" * 90)
+    for result in results:
+        s = result['summary']
+        print(f"{result['config']:<30}"
+              f"{s['rtf']:>8.3f}"
+              f"{s['cer']:>8.1%}"
+              f"{s['latency'].get('p50', 0):>10.2f}"
+              f"{s['latency'].get('p95', 0):>10.2f}"
+              f"{s['endpoint_delay'].get('p50', 0):>10.2f}"
+              f"{s['response_delay'].get('p95', 0):>10.2f}")
+    print("=" * 90)
+
+
+# 比較表的指標：(標題, 取值, 數值格式, 差異格式)
+COMPARE_METRICS = [
+    ('RTF', lambda s: s['rtf'], '{:.3f}', '{:+.3f}'),
+    ('CER', lambda s: s['cer'], '{:.1%}', '{:+.1%}'),
+    ('延遲p50', lambda s: s['latency'].get('p50'), '{:.2f}', '{:+.2f}'),
+    ('延遲p95', lambda s: s['latency'].get('p95'), '{:.2f}', '{:+.2f}'),
+    ('斷句p50', lambda s: s['endpoint_delay'].get('p50'), '{:.2f}', '{:+.2f}'),
+    ('回應p95', lambda s: s['response_delay'].get('p95'), '{:.2f}', '{:+.2f}'),
+]
+
+
+def compare_runs(paths: list):
+    """
+    比較多次測試的結果：依設定名稱對齊成一張表，
+    每次測試一欄，之後的每次測試再附一欄與第一次的差異
+    """
+    runs = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            run = json.load(f)
+        runs.append((Path(path).stem, {result['config']: result['summary'] for result in run['results']}))
+        print(f"📄 {Path(path).name}（{run.get('created', '?')}，{run.get('corpus', '?')}）")
+
+    configs = []
+    for _, summaries in runs:
+        configs.extend(name for name in summaries if name not in configs)
+
+    base_name, base = runs[0]
+    header = f"{'設定':<30}{'指標':<10}{base_name[:12]:>14}"
+    for name, _ in runs[1:]:
+        header += f"{name[:12]:>14}{'差異':>10}"
+    width = max(90, len(header) + 4)
+
+    print("\n" + "=" * width)
+    print(header)
+    for config in configs:
+        print("-" * width)
+        for index, (label, getter, fmt, delta_fmt) in enumerate(COMPARE_METRICS):
+            base_value = getter(base[config]) if config in base else None
+            line = f"{config if index == 0 else '':<30}{label:<10}"
+            line += f"{fmt.format(base_value) if base_value is not None else '-':>14}"
+            for _, summaries in runs[1:]:
+                value = getter(summaries[config]) if config in summaries else None
+                delta = value - base_value if value is not None and base_value is not None else None
+                line += f"{fmt.format(value) if value is not None else '-':>14}"
+                line += f"{delta_fmt.format(delta) if delta is not None else '-':>10}"
+            print(line)
+    print("=" * width)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='STT 基準測試（RTF / 延遲 / CER）')
+    parser.add_argument('folder', nargs='?', help='WAV 語料資料夾')
+    parser.add_argument('--config', action='append', default=[],
+                        help='引擎設定，例如 whisper:model=base,pause=1.0（可重複）')
+    parser.add_argument('--references', help='參考逐字稿 JSONL')
+    parser.add_argument('--output', help='結果 JSON 路徑')
+    parser.add_argument('--compare', nargs='+',
+                        help='比較既有的結果 JSON（依設定名稱對齊，列出與第一個檔案的差異）')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_runs(args.compare)
+        return
+
+    if not args.folder:
+        parser.error('請指定 WAV 語料資料夾')
+
+    folder = Path(args.folder)
+    corpus = load_corpus(folder, Path(args.references) if args.references else None)
+    if not corpus:
+        print("❌ 找不到可用的音檔")
+        return
+
+    configs = [parse_config(spec) for spec in (args.config or ['whisper'])]
+    print(f"📂 語料: {folder}（{len(corpus)} 句）")
+
+    results = [run_config(config, corpus) for config in configs]
+    print_summary(results)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        output = Path(os.getenv('DATA_DIR', './data')) / 'benchmarks' / \
+                 f"stt_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created': datetime.now().isoformat(),
+            'corpus': str(folder),
+            'language': os.getenv('STT_LANGUAGE', 'zh-TW'),
+            'results': results
+        }, f, ensure_ascii=False, indent=2)
+
+    print(f"\n💾 結果已儲存: {output}")
+
+
+if __name__ == "__main__":
+    main()
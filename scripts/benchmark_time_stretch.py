@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+語速調整基準測試
+比較向量化 WSOLA（src/voice/time_stretch.py）與 pydub AudioSegment.speedup
+在同一段音訊上的耗時，並輸出兩者的結果方便試聽
+
+預設以 20 秒的合成語音（帶抖動的諧波）測試；也可用 --input 指定 WAV 檔
+
+用法：
+    python scripts/benchmark_time_stretch.py
+    python scripts/benchmark_time_stretch.py --input data/audio/sample.wav --rate 1.3 --output data/benchmarks
+"""
+
+import sys
+import os
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from pydub import AudioSegment
+
+# 將 src 目錄加入 Python 路徑
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.voice import AudioFrame
+from src.voice.time_stretch import time_stretch
+
+
+def synthetic_voice(seconds: float, sample_rate: int) -> np.ndarray:
+    """產生類似人聲的測試訊號（基頻 150~250Hz 緩慢變化 + 諧波 + 音節包絡）"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 200 + 50 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    signal = sum(np.sin(k * phase) / k for k in range(1, 10))
+    envelope = 0.3 + 0.7 * np.abs(np.sin(2 * np.pi * 2.5 * t))
+    return (6000 * signal * envelope).astype(np.int16)
+
+
+def measure(funcs, repeat: int):
+    """
+    輪流執行各個方法（機器負載的起伏對兩邊影響相同）
+
+    Returns:
+        (各方法最後一次結果, 各方法每一輪的耗時)
+    """
+    results = [None] * len(funcs)
+    timings = [[] for _ in funcs]
+    for _ in range(repeat):
+        for i, func in enumerate(funcs):
+            start = time.perf_counter()
+            results[i] = func()
+            timings[i].append(time.perf_counter() - start)
+    return results, [np.array(t) for t in timings]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='語速調整基準測試（WSOLA vs pydub）')
+    parser.add_argument('--input', help='測試用 WAV 檔（預設使用合成訊號）')
+    parser.add_argument('--seconds', type=float, default=20.0, help='合成訊號長度（秒）')
+    parser.add_argument('--sample-rate', type=int, default=24000, help='合成訊號取樣率（gTTS 為 24k）')
+    parser.add_argument('--rate', type=float, default=float(os.getenv('TTS_SPEED', '1.25')),
+                        help='語速倍率')
+    parser.add_argument('--repeat', type=int, default=11, help='重複次數（取中位數）')
+    parser.add_argument('--output', help='輸出試聽檔的目錄')
+    args = parser.parse_args()
+
+    if args.input:
+        frame = AudioFrame.from_wav_bytes(Path(args.input).read_bytes())
+        samples, sample_rate = frame.samples, frame.sample_rate
+    else:
+        sample_rate = args.sample_rate
+        samples = synthetic_voice(args.seconds, sample_rate)
+
+    duration = len(samples) / sample_rate
+    segment = AudioSegment(samples.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+
+    print(f"🎧 音訊長度: {duration:.1f}s @ {sample_rate}Hz，語速 x{args.rate}")
+
+    # 先各跑一次暖身（載入、配置記憶體）
+    time_stretch(samples, sample_rate, args.rate)
+
+    (stretched, sped_up), (wsola_times, pydub_times) = measure([
+        lambda: time_stretch(samples, sample_rate, args.rate),
+        lambda: segment.speedup(playback_speed=args.rate, chunk_size=150, crossfade=25)
+    ], args.repeat)
+    wsola_time = float(np.median(wsola_times))
+    pydub_time = float(np.median(pydub_times))
+    ratios = pydub_times / wsola_times
+
+    print(f"\n{'方法':<12} {'耗時':>10} {'RTF':>8} {'輸出長度':>10}")
+    print("-" * 44)
+    print(f"{'WSOLA':<12} {wsola_time * 1000:>8.1f}ms {wsola_time / duration:>8.4f} "
+          f"{len(stretched) / sample_rate:>9.2f}s")
+    print(f"{'pydub':<12} {pydub_time * 1000:>8.1f}ms {pydub_time / duration:>8.4f} "
+          f"{len(sped_up) / 1000:>9.2f}s")
+    # 同一輪的比值（單核心或忙碌的機器上起伏很大，一併列出範圍）
+    print(f"\n⚡ 加速比: {np.median(ratios):.1f}x（每輪 {ratios.min():.1f}x ~ {ratios.max():.1f}x）")
+
+    if args.output:
+        output_dir = Path(args.output)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        wsola_file = output_dir / 'time_stretch_wsola.wav'
+        pydub_file = output_dir / 'time_stretch_pydub.wav'
+        wsola_file.write_bytes(AudioFrame(stretched, sample_rate).to_wav_bytes())
+        sped_up.export(pydub_file, format='wav')
+        print(f"💾 試聽檔: {wsola_file}、{pydub_file}")
+
+
+if __name__ == '__main__':
+    main()
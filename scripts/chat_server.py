@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+多人對話伺服器
+一台主機（例如家裡的電腦）載入模型一次，家裡的每台機器人透過 HTTP / WebSocket 對話，
+各自保有自己的對話歷史（API 見 src/server/chat_server.py）
+
+用法：
+    python scripts/chat_server.py
+    python scripts/chat_server.py --host 0.0.0.0 --port 8765
+
+    curl -s localhost:8765/chat -d '{"session_id": "robot-1", "message": "3 加 5 等於多少？"}'
+    curl -sN localhost:8765/chat -d '{"session_id": "robot-1", "message": "為什麼天空是藍色的？", "stream": true}'
+    curl -s localhost:8765/metrics
+"""
+
+import sys
+import os
+import json
+import argparse
+
+# 將 src 目錄加入 Python 路徑
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.voice import ChatBot
+from src.server import create_server
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多人對話伺服器（HTTP / SSE / WebSocket）')
+    parser.add_argument('--host', help='監聽位址（預設 SERVER_HOST，只接受本機連線）')
+    parser.add_argument('--port', type=int, help='連接埠（預設 SERVER_PORT）')
+    args = parser.parse_args()
+
+    print("🔧 正在初始化系統...")
+    bot = ChatBot()
+    server = create_server(bot, args.host, args.port)
+    service = server.service
+    host, port = server.server_address[:2]
+
+    print(f"✅ 對話伺服器啟動: http://{host}:{port}")
+    print(f"   同時生成上限: {service.admission.max_active}，排隊上限: {service.admission.max_queue}")
+    print(f"   session 上限: {service.sessions.max_sessions}，"
+          f"每個 session 每分鐘 {service.sessions.rate_per_minute:g} 題")
+    print("   按 Ctrl+C 停止\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 伺服器停止")
+    finally:
+        server.server_close()
+        print("📊 統計:")
+        print(json.dumps(service.metrics_snapshot(), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,611 @@
+#!/usr/bin/env python3
+"""
+無頭語音對話模擬
+不需要麥克風、喇叭和真人：依腳本把小朋友的問題（WAV 或合成語音）送進收音路徑，
+跑完整的 VoiceSession（聆聽 → 對話 → 分句 → 合成 → 播放），
+語音輸出到靜音輸出，最後列出每一輪的延遲拆解（取自延遲追蹤）
+
+腳本為 JSON：
+    {
+      "turns": [
+        {"text": "3 加 5 等於多少？", "pause": 0.5},
+        {"wav": "data/sim/q2.wav", "text": "為什麼天空是藍色的？"},
+        {"text": "那晚上呢？", "barge_in_after": 1.2},
+        {"silence": true, "pause": 2.0}
+      ]
+    }
+
+- text：參考逐字稿（模擬 STT 直接回傳；沒有 wav 時用 TTS 合成小朋友的聲音）
+- pause：開始聆聽後多久開口（秒）
+- barge_in_after：在上一個回答開始播放後幾秒插話（走 BargeInDetector 的收音路徑）
+- silence：這一輪不說話（等到 --listen-timeout 逾時，測試「沒有聽到聲音」）
+
+每一輪的語音都混進模擬麥克風，由能量 VAD 切出語句後才辨識（和真的麥克風一樣要等說完）；
+腳本結束後自動說「再見」
+
+本地替身（預設，CI 不需要網路與模型）：
+    --llm scripted   固定回答，依 --first-token-ms / --token-ms 模擬生成速度
+    --tts tone       依字數產生音調，依 --tts-ms-per-char 模擬合成時間
+    --stt script     直接回傳腳本中的逐字稿
+也可以換成真正的元件：--llm real、--tts espeak|piper|gtts、--stt whisper
+
+用法：
+    python scripts/simulate_voice_session.py
+    python scripts/simulate_voice_session.py data/sim/scenario.json --report data/sim/report.json
+    python scripts/simulate_voice_session.py --max-ttfa-ms 800     # 超過門檻時結束碼為 1（CI 回歸測試）
+    python scripts/simulate_voice_session.py --prefetch                # 追問預先生成，報告命中率
+"""
+
+import sys
+import os
+import copy
+import json
+import time
+import wave
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+# 將 src 目錄加入 Python 路徑
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 預設腳本：一般提問、插話、沒有聲音
+DEFAULT_SCENARIO = {
+    'turns': [
+        {'text': '3 加 5 等於多少？', 'pause': 0.3},
+        {'text': '為什麼天空是藍色的？', 'pause': 0.5},
+        {'text': '為什麼？', 'pause': 0.5},
+        {'text': '那晚上為什麼是黑的？', 'barge_in_after': 1.0},
+        {'silence': True, 'pause': 1.0},
+        {'text': '謝謝你！', 'pause': 0.3}
+    ]
+}
+
+SCRIPTED_REPLY = "這是一個很好的問題！我們一起來想一想。先想想看你已經知道什麼，再一步一步找出答案。你覺得呢？"
+
+
+def read_wav(path: Path):
+    """讀取單聲道 16-bit WAV"""
+    from src.voice import AudioFrame
+
+    with wave.open(str(path), 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"只支援 16-bit WAV: {path}")
+        data = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        if wav.getnchannels() > 1:
+            data = data.reshape(-1, wav.getnchannels())[:, 0].copy()
+        return AudioFrame(data, wav.getframerate())
+
+
+def write_wav(path: Path, frames: list, sample_rate: int):
+    """把收集到的輸出寫成 WAV"""
+    samples = np.concatenate([f.samples for f in frames]) if frames else np.zeros(0, np.int16)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+
+
+# === 本地替身 ===
+
+def register_tone_engine(ms_per_char: float, seconds_per_char: float):
+    """註冊 'tone' TTS 引擎：依字數產生音調，合成時間可調"""
+    from src.voice import AudioFrame
+    from src.voice.tts_engines import ENGINES, TTSEngine
+
+    class ToneEngine(TTSEngine):
+        name = 'tone'
+        rate = 24000
+
+        def synthesize(self, text: str, language: str) -> AudioFrame:
+            time.sleep(len(text) * ms_per_char / 1000)
+            return AudioFrame(self._tone(text), self.rate)
+
+        def synthesize_stream(self, text: str, language: str) -> Iterator[AudioFrame]:
+            # 和 Piper 一樣每 250ms 交出一段，合成時間平均分攤到各段
+            samples = self._tone(text)
+            chunk = self.rate // 4
+            count = -(-len(samples) // chunk)
+            for i in range(0, len(samples), chunk):
+                time.sleep(len(text) * ms_per_char / 1000 / count)
+                yield AudioFrame(samples[i:i + chunk], self.rate, i)
+
+        def _tone(self, text: str) -> np.ndarray:
+            length = max(1, int(len(text) * seconds_per_char * self.rate))
+            t = np.arange(length) / self.rate
+            # 200Hz 基頻加上每 0.25 秒起伏一次的包絡，聽起來（對 VAD 來說）像一句話
+            envelope = 0.5 + 0.5 * np.abs(np.sin(np.pi * 4 * t))
+            return (6000 * envelope * np.sin(2 * np.pi * 200 * t)).astype(np.int16)
+
+    ENGINES['tone'] = ToneEngine
+
+
+class ScriptedBot:
+    """固定回答的 ChatBot 替身（依設定的速度逐字交出）"""
+
+    backend = 'scripted'
+    model_name = 'scripted'
+
+    def __init__(self, reply: str = SCRIPTED_REPLY, first_token_ms: float = 300,
+                 token_ms: float = 30, chars_per_token: int = 2):
+        self.reply = reply
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.chars_per_token = chars_per_token
+        self.history = []
+
+    def chat_stream(self, user_message: str, verbose: bool = False, track: bool = True) -> Iterator[str]:
+        from src.runtime import tracer
+
+        parts = []
+        try:
+            with tracer.span('llm.scripted'):
+                time.sleep(self.first_token_ms / 1000)
+                for i in range(0, len(self.reply), self.chars_per_token):
+                    if i:
+                        time.sleep(self.token_ms / 1000)
+                    tracer.mark('first_token')
+                    parts.append(self.reply[i:i + self.chars_per_token])
+                    yield parts[-1]
+        finally:
+            self.history += [
+                {'role': 'user', 'content': user_message},
+                {'role': 'assistant', 'content': ''.join(parts)}
+            ]
+
+    def chat(self, user_message: str, verbose: bool = False) -> str:
+        return ''.join(self.chat_stream(user_message, verbose))
+
+    def reset_conversation(self):
+        self.history = []
+
+    # 與 ChatBot 相同的對話狀態介面（追問預先生成使用）
+
+    def fork(self) -> 'ScriptedBot':
+        bot = copy.copy(self)
+        bot.history = []
+        return bot
+
+    def session_state(self) -> dict:
+        return {'history': self.history, 'last_agent': None, 'student_level': None, 'summary': None}
+
+    def restore_state(self, state: dict):
+        self.history = list(state['history'])
+
+    def adopt(self, state: dict, user_message: str):
+        self.restore_state(state)
+        self.history[-2] = {'role': 'user', 'content': user_message}
+
+
+class SimulatedMicrophone:
+    """
+    MicrophoneStream 的替身：依實際時間送出音框（微弱底噪），
+    需要插話時把小朋友的語音混進去
+    """
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 20):
+        from src.voice import AudioRingBuffer
+
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.buffer = AudioRingBuffer(sample_rate, 30.0)
+
+        self._subscribers = []
+        self._stages = []
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self._pending: Optional[np.ndarray] = None
+        self._rng = np.random.default_rng(0)
+
+        self.injected_at: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def subscribe(self, callback):
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def add_stage(self, stage):
+        with self._lock:
+            if stage not in self._stages:
+                self._stages.append(stage)
+
+    def remove_stage(self, stage):
+        with self._lock:
+            if stage in self._stages:
+                self._stages.remove(stage)
+
+    def inject(self, frame):
+        """下一個音框起送出這段語音"""
+        self._pending = frame.resample(self.sample_rate).samples
+        self.injected_at = time.perf_counter()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name='sim-mic')
+        self._thread.start()
+
+    def _run(self):
+        position = 0
+        next_time = time.perf_counter()
+        while self._running:
+            chunk = self._rng.normal(0, 20, self.frame_size)
+            pending = self._pending
+            if pending is not None:
+                speech = pending[position:position + self.frame_size]
+                chunk[:len(speech)] += speech
+                position += self.frame_size
+                if position >= len(pending):
+                    self._pending, position = None, 0
+
+            frame = self.buffer.write(np.clip(chunk, -32768, 32767).astype(np.int16))
+            with self._lock:
+                stages, subscribers = list(self._stages), list(self._subscribers)
+            for stage in stages:
+                frame = stage(frame)
+            for callback in subscribers:
+                callback(frame)
+
+            next_time += self.frame_ms / 1000
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+
+    def stop(self):
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+
+class SimulatedSTT:
+    """
+    SpeechToText 的替身：依腳本「聽到」小朋友的話
+
+    聆聽時把這一輪的語音送進模擬麥克風，以能量 VAD 從麥克風音框切出語句；
+    辨識時預設直接回傳逐字稿，指定 recognizer（例如 Whisper）時對切出來的音訊做真正的辨識
+    """
+
+    def __init__(self, turns: List[dict], utterances: list, mic: 'SimulatedMicrophone', recognizer=None):
+        self.turns = turns
+        self.utterances = utterances
+        self.mic = mic
+        self.recognizer = recognizer
+        self.index = 0
+        self.barge_in_index: Optional[int] = None
+
+    def next_barge_in(self) -> Optional[int]:
+        """下一輪如果是插話，回傳它的索引"""
+        if self.index < len(self.turns) and 'barge_in_after' in self.turns[self.index]:
+            return self.index
+        return None
+
+    def listen_from_microphone(self, timeout: int = 5, phrase_time_limit: int = 10) -> str:
+        """
+        和 SpeechToText 一樣從麥克風聆聽一句：timeout 秒內沒有開口就回傳空字串，
+        開口後等 VAD 判定說完（最長 phrase_time_limit 秒）才辨識
+        """
+        from src.runtime import tracer
+        from src.voice import AudioFrame, EnergyVAD
+
+        if self.index >= len(self.turns):
+            return '再見'
+
+        index = self.index
+        turn = self.turns[index]
+        self.index += 1
+
+        vad = EnergyVAD(
+            sample_rate=self.mic.sample_rate,
+            frame_ms=self.mic.frame_ms,
+            max_segment_ms=int(phrase_time_limit * 1000),
+            source=self.mic.buffer
+        )
+        state = {'injected': False, 'frame': None, 'since': time.perf_counter()}
+        done = threading.Event()
+
+        def on_frame(frame):
+            if done.is_set():
+                return
+            segment = vad.process(frame)
+            if segment is not None and state['injected']:
+                # 環形緩衝區會被覆寫，交出去前先複製
+                state['frame'] = AudioFrame(segment.samples.copy(), segment.sample_rate, segment.start_index)
+                done.set()
+            elif not vad.in_speech and time.perf_counter() - state['since'] > timeout:
+                done.set()
+
+        owns_mic = not self.mic.is_running
+        self.mic.subscribe(on_frame)
+        self.mic.start()
+        try:
+            with tracer.span('stt.listen'):
+                if not done.wait(turn.get('pause', 0.0)) and not turn.get('silence'):
+                    state['injected'], state['since'] = True, time.perf_counter()
+                    self.mic.inject(self.utterances[index])
+                    # 插話反應只量 BargeInDetector 收到的語音
+                    self.mic.injected_at = None
+                done.wait()
+        finally:
+            self.mic.unsubscribe(on_frame)
+            if owns_mic:
+                self.mic.stop()
+
+        if state['frame'] is None:
+            print("⏱️  沒有聽到聲音，超時了")
+            return ''
+        return self._recognize(index, state['frame'])
+
+    def recognize_frame(self, frame) -> str:
+        """插話的那一句（BargeInDetector 收到的音訊）"""
+        index = self.barge_in_index
+        if index is None:
+            raise ValueError('不是腳本安排的插話（可能是底噪誤觸發）')
+        self.barge_in_index = None
+        self.index = max(self.index, index + 1)
+        return self._recognize(index, frame)
+
+    def _recognize(self, index: int, frame=None) -> str:
+        from src.runtime import tracer
+
+        if self.recognizer is not None:
+            return self.recognizer.recognize_frame(frame or self.utterances[index])
+
+        tracer.mark('speech_end')
+        with tracer.span('stt.recognize', engine='script'):
+            return self.turns[index]['text']
+
+
+# === 模擬 ===
+
+def build_utterances(turns: List[dict], tts, base_dir: Path) -> list:
+    """準備每一輪小朋友的語音（WAV 或用 TTS 合成）"""
+    utterances = []
+    for turn in turns:
+        if turn.get('silence'):
+            utterances.append(None)
+        elif turn.get('wav'):
+            utterances.append(read_wav(base_dir / turn['wav']))
+        else:
+            utterances.append(tts.synthesize(turn['text']))
+    return utterances
+
+
+def run_simulation(scenario: dict, args) -> dict:
+    """執行一次模擬，回傳報告"""
+    from src.voice import (
+        TextToSpeech, SpeechToText, NullSink, PhraseBank, VoiceSession, BargeInDetector,
+        FollowUpPrefetcher
+    )
+    from src.runtime import tracer
+
+    # 腳本結束後說「再見」（同樣經過麥克風）
+    turns = scenario['turns'] + [{'text': '再見', 'pause': 0.3}]
+    base_dir = Path(scenario.get('_base_dir', '.'))
+
+    tts = TextToSpeech()
+    phrases = PhraseBank(tts)
+    phrases.preload()
+
+    if args.llm == 'real':
+        from src.voice import ChatBot
+        bot = ChatBot()
+    else:
+        bot = ScriptedBot(first_token_ms=args.first_token_ms, token_ms=args.token_ms)
+
+    sink = NullSink()
+    mic = SimulatedMicrophone()
+
+    recognizer = SpeechToText(engine='whisper') if args.stt == 'whisper' else None
+    stt = SimulatedSTT(turns, build_utterances(turns, tts, base_dir), mic, recognizer)
+
+    barge_in = BargeInDetector(
+        sample_rate=mic.sample_rate,
+        frame_ms=mic.frame_ms,
+        source=mic.buffer
+    )
+
+    session = VoiceSession(
+        bot=bot, tts=tts, stt=stt, sink=sink, phrases=phrases,
+        mic_stream=mic, barge_in=barge_in, listen_timeout=args.listen_timeout,
+        prefetcher=FollowUpPrefetcher(bot) if args.prefetch else None
+    )
+
+    summaries = []
+    outputs = []
+    barge_ins = []
+    state = {'armed': None, 'stopped': None}
+
+    def on_playback(event, handle):
+        if event == 'start':
+            outputs.append(handle.frame)
+            # 回答開始播放：排定下一輪的插話
+            index = stt.next_barge_in()
+            if index is not None and mic.is_running and state['armed'] is None:
+                state['armed'] = index
+                delay = turns[index]['barge_in_after']
+                timer = threading.Timer(delay, inject, args=(index,))
+                timer.daemon = True
+                timer.start()
+        elif handle.cancelled and mic.injected_at is not None and state['stopped'] is None:
+            state['stopped'] = time.perf_counter()
+
+    def inject(index):
+        if not mic.is_running or stt.next_barge_in() != index:
+            state['armed'] = None
+            return
+        stt.barge_in_index = index
+        mic.inject(stt.utterances[index])
+
+    def on_turn(summary):
+        if state['stopped'] is not None:
+            summary['barge_in_reaction_ms'] = round((state['stopped'] - mic.injected_at) * 1000, 1)
+            barge_ins.append(summary['barge_in_reaction_ms'])
+            state['stopped'] = None
+            mic.injected_at = None
+        state['armed'] = None
+        summaries.append(summary)
+
+    sink.subscribe(on_playback)
+    tracer.subscribe(on_turn)
+
+    started = time.perf_counter()
+    try:
+        asyncio.run(session.run())
+    finally:
+        tracer.unsubscribe(on_turn)
+        session.close()
+        sink.close()
+
+    if args.record:
+        write_wav(Path(args.record), outputs, sink.sample_rate)
+
+    prefetch = None
+    if session.prefetcher is not None:
+        prefetch = {**session.prefetcher.stats, 'hit_rate': round(session.prefetcher.hit_rate, 3)}
+
+    return {
+        'scenario': scenario.get('_name', 'default'),
+        'llm': args.llm,
+        'tts': args.tts,
+        'stt': args.stt,
+        'wall_seconds': round(time.perf_counter() - started, 2),
+        'output_seconds': round(sink.samples_played / sink.sample_rate, 2),
+        'turns': summaries,
+        'barge_in_reaction_ms': barge_ins,
+        'prefetch': prefetch
+    }
+
+
+def stage_ms(summary: dict, prefix: str) -> float:
+    return sum(s['ms'] for name, s in summary['stages'].items() if name.startswith(prefix))
+
+
+def percentile(values: list, q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def print_report(report: dict):
+    """列出每一輪的延遲拆解"""
+    print("\n" + "=" * 100)
+    print(f"📊 模擬結果（llm={report['llm']}, tts={report['tts']}, stt={report['stt']}）")
+    print("=" * 100)
+    print(f"{'輪':>3} {'結果':<10} {'辨識':>8} {'路由':>8} {'LLM':>8} {'首字':>8} "
+          f"{'合成':>8} {'首音':>8} {'插話反應':>8} {'總計':>9}")
+    print("-" * 100)
+
+    for s in report['turns']:
+        marks = s['marks']
+        first_token = marks.get('first_token')
+        if first_token is not None and 'speech_end' in marks:
+            first_token -= marks['speech_end']
+
+        def fmt(value):
+            return f"{value:8.0f}" if value is not None else f"{'-':>8}"
+
+        print(f"{s['turn']:>3} {s.get('outcome', ''):<10} "
+              f"{fmt(stage_ms(s, 'stt.recognize'))} {fmt(stage_ms(s, 'gateway'))} "
+              f"{fmt(stage_ms(s, 'llm'))} {fmt(first_token)} "
+              f"{fmt(stage_ms(s, 'tts'))} {fmt(s.get('time_to_first_audio_ms'))} "
+              f"{fmt(s.get('barge_in_reaction_ms'))} {s['total_ms']:9.0f}")
+
+    answered = [s['time_to_first_audio_ms'] for s in report['turns']
+                if s.get('outcome') in ('answered', 'skip', 'barge_in')
+                and s.get('time_to_first_audio_ms') is not None]
+
+    print("-" * 100)
+    print("  （單位：毫秒；首字、首音從小朋友說完開始計算）")
+    if answered:
+        print(f"  首音延遲: 平均 {np.mean(answered):.0f} / P50 {percentile(answered, 50):.0f} "
+              f"/ P90 {percentile(answered, 90):.0f} ms（{len(answered)} 輪）")
+    if report['barge_in_reaction_ms']:
+        print(f"  插話反應: {', '.join(f'{v:.0f}' for v in report['barge_in_reaction_ms'])} ms")
+    prefetch = report.get('prefetch')
+    if prefetch:
+        print(f"  預先生成: 命中 {prefetch['hits']}/{prefetch['asked']}（{prefetch['hit_rate']:.0%}），"
+              f"生成 {prefetch['prefetched']} 個，取消 {prefetch['cancelled']} 次")
+    print(f"  總時間 {report['wall_seconds']:.1f} 秒，輸出語音 {report['output_seconds']:.1f} 秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='無頭語音對話模擬（延遲基準與回歸測試）')
+    parser.add_argument('scenario', nargs='?', help='腳本 JSON（預設使用內建腳本）')
+    parser.add_argument('--llm', choices=['scripted', 'real'], default='scripted',
+                        help='scripted: 固定回答；real: 依 .env 設定的 ChatBot')
+    parser.add_argument('--tts', default='tone',
+                        help='tone（本地替身）或 TTS_ENGINES 格式的引擎清單，例如 espeak、piper,espeak')
+    parser.add_argument('--stt', choices=['script', 'whisper'], default='script',
+                        help='script: 直接回傳逐字稿；whisper: 本地 Whisper 實際辨識')
+    parser.add_argument('--first-token-ms', type=float, default=300, help='替身 LLM 的首字延遲')
+    parser.add_argument('--token-ms', type=float, default=30, help='替身 LLM 每個 token 的間隔')
+    parser.add_argument('--tts-ms-per-char', type=float, default=3, help='替身 TTS 每個字的合成時間')
+    parser.add_argument('--listen-timeout', type=int, default=3, help='聆聽逾時（秒，沒有開口就算沒有聽到）')
+    parser.add_argument('--prefetch', action='store_true', help='啟用追問預先生成（報告命中率）')
+    parser.add_argument('--cache', action='store_true', help='使用 TTS 快取（預設關閉，每次都重新合成）')
+    parser.add_argument('--record', help='把所有輸出語音存成 WAV')
+    parser.add_argument('--report', help='把報告存成 JSON')
+    parser.add_argument('--max-ttfa-ms', type=float, help='首音延遲門檻，任一輪超過時結束碼為 1')
+    args = parser.parse_args()
+
+    if args.scenario:
+        path = Path(args.scenario)
+        with open(path, 'r', encoding='utf-8') as f:
+            scenario = json.load(f)
+        scenario['_base_dir'] = str(path.parent)
+        scenario['_name'] = path.name
+    else:
+        scenario = DEFAULT_SCENARIO
+
+    # 模擬產生的語音檔、追蹤檔放在暫存目錄，不弄亂 data/
+    workdir = tempfile.mkdtemp(prefix='voice_sim_')
+    os.environ.setdefault('TRACE_DIR', os.path.join(workdir, 'traces'))
+    os.environ['TRACE'] = 'true'
+    os.environ['AUDIO_SPOOL_KEEP'] = 'false'
+    os.environ['TTS_CACHE'] = 'true' if args.cache else 'false'
+    os.environ['TTS_ENGINES'] = args.tts
+    os.environ['DATA_DIR'] = workdir
+    if args.tts == 'tone':
+        register_tone_engine(args.tts_ms_per_char, seconds_per_char=0.2)
+
+    report = run_simulation(scenario, args)
+    print_report(report)
+
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 報告已儲存: {args.report}")
+
+    if args.max_ttfa_ms is not None:
+        slow = [s for s in report['turns']
+                if (s.get('time_to_first_audio_ms') or 0) > args.max_ttfa_ms
+                and s.get('outcome') in ('answered', 'skip', 'barge_in')]
+        if slow:
+            print(f"\n❌ {len(slow)} 輪首音延遲超過 {args.max_ttfa_ms:.0f} ms")
+            sys.exit(1)
+        print(f"\n✅ 首音延遲皆在 {args.max_ttfa_ms:.0f} ms 以內")
+
+
+if __name__ == '__main__':
+    main()
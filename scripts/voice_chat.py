@@ -4,19 +4,23 @@
 使用麥克風輸入 + 喇叭輸出
 真正的語音對話體驗！
 支援按空白鍵跳過、串流播放
+（對話流程見 src/voice/session.py）
 """
 
 import sys
 import os
-import time
+import asyncio
 import threading
-import subprocess
-import select
 
 # 將 src 目錄加入 Python 路徑
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.voice import ChatBot, TextToSpeech, SpeechToText
+from src.voice import (
+    ChatBot, TextToSpeech, SpeechToText,
+    KeywordSpotter, MicrophoneStream, EchoCanceller, load_phrase_list, create_sink,
+    PhraseBank, VoiceSession, BargeInDetector, FollowUpPrefetcher, AttentionGate, GatedListener
+)
+from src.runtime import SessionSnapshot, governor
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -29,189 +33,111 @@ class VoiceChat:
         """初始化語音對話系統"""
         print("\n🔧 正在初始化系統...")
         
-        # 初始化各個模組
-        self.bot = ChatBot()
+        # 初始化各個模組（TTS 先建立，固定語句在載入模型期間於背景合成）
         self.tts = TextToSpeech()
-        self.stt = SpeechToText()
+        self.phrases = PhraseBank(self.tts)
+        self.phrases.preload()
         
-        # 控制標記
-        self.skip_requested = False
-        self.is_speaking = False
-        self.audio_process = None
-        
-        print("✅ 系統初始化完成！\n")
-    
-    def check_skip_key(self):
-        """檢查是否按下空白鍵（非阻塞）"""
-        if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
-            key = sys.stdin.read(1)
-            if key == ' ':
-                return True
-        return False
-    
-    def speak_streaming(self, text: str):
-        """
-        串流模式說話（邊顯示邊播放）
-        
-        Args:
-            text: 要說的文字
-        """
-        print("🤖 小助手: ", end='', flush=True)
-        
-        # 將文字分句
-        sentences = self._split_into_sentences(text)
-        
-        # 重置跳過標記
-        self.skip_requested = False
-        self.is_speaking = True
-        
-        # 啟動背景語音監聽
-        self.listen_for_skip_command()
-        
-        for i, sentence in enumerate(sentences):
-            if self.skip_requested:
-                print("\n⏭️  已跳過")
-                break
-            
-            # 顯示文字
-            print(sentence, end='', flush=True)
-            
-            # 同時生成並播放語音
-            audio_file = self.tts.speak(sentence, play=False)
-            
-            if audio_file and not self.skip_requested:
-                self._play_audio_with_skip(audio_file)
-            
-            # 短暫停頓
-            if i < len(sentences) - 1 and not self.skip_requested:
-                time.sleep(0.3)
-        
-        print()  # 換行
-        self.is_speaking = False
-    
-    def _split_into_sentences(self, text: str) -> list:
-        """將文字分割成句子"""
-        import re
-        
-        # 按句號、問號、驚嘆號分割
-        sentences = re.split(r'([。！？!?.]+)', text)
-        
-        # 重新組合（標點符號和前面的句子合併）
-        result = []
-        for i in range(0, len(sentences)-1, 2):
-            if i+1 < len(sentences):
-                result.append(sentences[i] + sentences[i+1])
-            else:
-                result.append(sentences[i])
-        
-        # 處理剩餘內容
-        if len(sentences) % 2 == 1 and sentences[-1]:
-            result.append(sentences[-1])
-        
-        return [s.strip() for s in result if s.strip()]
-    
-    def listen_for_skip_command(self):
-        """在背景監聽「跳過」或「下一個」指令"""
-        import threading
+        self.bot = ChatBot()
+        self.stt = SpeechToText()
         
-        def background_listen():
-            while self.is_speaking:
-                try:
-                    # 短時間錄音檢測
-                    text = self.stt.listen_from_microphone(timeout=1, phrase_time_limit=2)
-                    
-                    if text and any(word in text for word in ['跳過', '下一個', 'skip', 'next']):
-                        print(f"\n🎤 聽到指令: {text}")
-                        self.skip_requested = True
-                        break
-                except:
-                    pass
+        # 接續上一次的對話（重新啟動或當機後不用從頭說起）
+        if os.getenv('SNAPSHOT', 'true').lower() == 'true':
+            snapshot = SessionSnapshot.resume()
+            self.bot.attach_snapshot(snapshot)
+            if snapshot.restored:
+                turns = len(snapshot.state['history']) // 2
+                print(f"♻️  已接續上次的對話（{turns} 輪，{snapshot.load_ms:.1f}ms）")
+        
+        # 共享麥克風串流（播放期間才開啟）
+        self.mic_stream = MicrophoneStream()
+        
+        # 本地關鍵字偵測（有錄製樣板時取代背景 Google STT）
+        self.keyword_spotter = KeywordSpotter(
+            sample_rate=self.mic_stream.sample_rate,
+            frame_ms=self.mic_stream.frame_ms,
+            source=self.mic_stream.buffer
+        )
         
-        # 在背景線程中監聽
-        listener_thread = threading.Thread(target=background_listen, daemon=True)
-        listener_thread.start()
-    
-    def _play_audio_with_skip(self, audio_file: str):
-        """播放音訊（可被跳過 - 支援空白鍵和語音指令）"""
-        try:
-            self.audio_process = subprocess.Popen(
-                ['afplay', audio_file],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
+        # 回音消除：以播放中的語音為參考，避免聽到自己的聲音而誤觸發
+        self.echo_canceller = EchoCanceller(sample_rate=self.keyword_spotter.sample_rate)
+        self.echo_canceller.gate(self.keyword_spotter.vad)
+        
+        # 插話偵測：播放中小朋友一開口就停止，那一句直接當作下一個問題
+        self.barge_in = None
+        if os.getenv('BARGE_IN', 'true').lower() == 'true':
+            self.barge_in = BargeInDetector(
+                sample_rate=self.mic_stream.sample_rate,
+                frame_ms=self.mic_stream.frame_ms,
+                source=self.mic_stream.buffer
+            )
+            self.echo_canceller.gate(self.barge_in.vad)
+        
+        # 追問預先生成：念回答的空檔先把「為什麼？」等追問的回答準備好
+        self.prefetcher = None
+        if os.getenv('PREFETCH', 'false').lower() == 'true':
+            self.prefetcher = FollowUpPrefetcher(self.bot)
+        
+        # 視覺追蹤（背景執行；對話進行中由資源調度器降低幀率、暫停姿勢模型）
+        # VISION_PROCESS=true 時攝像頭與追蹤在各自的子行程，不和音訊搶 GIL
+        self.tracker = None
+        if os.getenv('VISION_TRACKING', 'false').lower() == 'true':
+            try:
+                if os.getenv('VISION_PROCESS', 'true').lower() == 'true':
+                    from src.vision import VisionProcesses
+                    self.tracker = VisionProcesses()
+                else:
+                    from src.vision import KidTrackerLite
+                    self.tracker = KidTrackerLite()
+                self.tracker.start_background()
+                if os.getenv('TRACKING_TARGET'):
+                    self.tracker.set_target(os.getenv('TRACKING_TARGET'))
+            except Exception as e:
+                print(f"⚠️  無法啟動視覺追蹤: {e}")
+                self.tracker = None
+        
+        # 注意力閘門：只辨識小朋友面對機器人時說的話（電視、旁人聊天不送去辨識與回答）
+        self.attention = None
+        if self.tracker is not None and os.getenv('ATTENTION_GATE', 'true').lower() == 'true':
+            require_face = None
+            if not os.getenv('TRACKING_TARGET'):
+                print("💡 沒有設定 TRACKING_TARGET，注意力閘門只看有沒有人在範圍內")
+                require_face = False
+            self.attention = GatedListener(
+                AttentionGate(self.tracker, require_face=require_face),
+                sample_rate=self.mic_stream.sample_rate,
+                frame_ms=self.mic_stream.frame_ms,
+                source=self.mic_stream.buffer
             )
-            
-            # 等待播放完成或被跳過
-            while self.audio_process.poll() is None:
-                if self.skip_requested:
-                    self.audio_process.terminate()
-                    self.audio_process.wait()
-                    break
-                
-                # 檢查空白鍵
-                if self.check_skip_key():
-                    print("\n⌨️  空白鍵")
-                    self.skip_requested = True
-                    self.audio_process.terminate()
-                    self.audio_process.wait()
-                    break
-                
-                time.sleep(0.05)
-            
-        except Exception as e:
-            print(f"播放錯誤: {e}")
-        finally:
-            self.audio_process = None
-    
-    def speak(self, text: str):
-        """
-        普通模式說話（一次性顯示和播放）
-        
-        Args:
-            text: 要說的文字
-        """
-        print(f"🤖 小助手: {text}")
-        
-        # 重置跳過標記
-        self.skip_requested = False
-        self.is_speaking = True
-        
-        # 生成語音
-        audio_file = self.tts.speak(text, play=False)
-        
-        if audio_file:
-            print("💡 按空白鍵可跳過")
-            self._play_audio_with_skip(audio_file)
-        
-        self.is_speaking = False
-    
-    def listen(self, timeout: int = 10) -> str:
-        """
-        聆聽（STT）
-        
-        Args:
-            timeout: 超時時間（秒）
-            
-        Returns:
-            識別出的文字
-        """
-        # 重置跳過標記
-        self.skip_requested = False
         
-        # 從麥克風錄音並轉文字
-        text = self.stt.listen_from_microphone(
-            timeout=timeout,
-            phrase_time_limit=15
+        # 長駐的音訊輸出（播放佇列 + 完成事件，跳過時立即靜音）
+        self.sink = create_sink()
+        
+        # 事件驅動的對話流程：聆聽、對話、合成、播放都是 asyncio task
+        self.session = VoiceSession(
+            bot=self.bot,
+            tts=self.tts,
+            stt=self.stt,
+            sink=self.sink,
+            phrases=self.phrases,
+            mic_stream=self.mic_stream,
+            keyword_spotter=self.keyword_spotter,
+            echo_canceller=self.echo_canceller,
+            barge_in=self.barge_in,
+            prefetcher=self.prefetcher,
+            attention=self.attention
         )
         
-        if text:
-            print(f"👦 你說: {text}")
+        # 背景預熱常用句子的語音快取
+        preseed_file = os.getenv('TTS_PRESEED_FILE')
+        if preseed_file and os.path.exists(preseed_file):
+            threading.Thread(
+                target=self.tts.preseed_cache,
+                args=(list(load_phrase_list(preseed_file)),),
+                daemon=True
+            ).start()
         
-        return text
-    
-    def greet(self):
-        """打招呼"""
-        greeting = "你好！我是陪讀小助手。你可以直接用說的問我問題喔！"
-        self.speak(greeting)
+        print("✅ 系統初始化完成！\n")
     
     def run(self):
         """執行語音對話主循環"""
@@ -224,71 +150,21 @@ class VoiceChat:
         print("  • 聽到「請說話」後開始提問")
         print("  • 說完後會自動識別並回答")
         print("  • 按【空白鍵】或說「跳過」「下一個」可跳過回答")
+        print("  • 回答時直接開口問下一個問題也可以（插話）")
         print("  • 說「退出」或「結束」可以結束對話")
         print("  • 說「重置」可以清除對話歷史")
         print("=" * 70)
         print()
         
-        # 打招呼
-        self.greet()
-        
-        # 主對話循環
-        conversation_count = 0
-        
-        # 設定終端為非阻塞模式（Mac/Linux）
         try:
-            import termios
-            import tty
-            old_settings = termios.tcgetattr(sys.stdin)
-            tty.setcbreak(sys.stdin.fileno())
-        except:
-            old_settings = None
-        
-        try:
-            while True:
-                print("\n" + "-" * 70)
-                
-                # 聆聽使用者輸入
-                user_input = self.listen(timeout=30)
-                
-                # 檢查是否有輸入
-                if not user_input:
-                    print("⏱️  沒有聽到聲音，請再試一次")
-                    time.sleep(1)
-                    continue
-                
-                # 檢查結束指令
-                if any(word in user_input for word in ['退出', '結束', '再見', 'bye', 'quit', 'exit']):
-                    farewell = "再見！期待下次再聊！"
-                    self.speak(farewell)
-                    break
-                
-                # 檢查重置指令
-                if '重置' in user_input or 'reset' in user_input.lower():
-                    self.bot.reset_conversation()
-                    response = "好的，我們重新開始吧！"
-                    self.speak(response)
-                    continue
-                
-                # 對話
-                print("🤔 正在思考...")
-                response = self.bot.chat(user_input)
-                
-                print()
-                
-                # 使用串流模式播放（邊顯示邊播放）
-                self.speak_streaming(response)
-                
-                conversation_count += 1
-                
-                # 每5輪對話提示一次
-                if conversation_count % 5 == 0:
-                    print(f"\n💡 提示: 已經聊了 {conversation_count} 輪了！")
-                
+            asyncio.run(self.session.run())
+            
         except KeyboardInterrupt:
             print("\n\n⏸️  對話中斷")
-            farewell = "掰掰！"
-            self.speak(farewell)
+            print(f"🤖 小助手: {self.phrases.text('interrupted')}")
+            frame = self.phrases.get('interrupted')
+            if frame is not None:
+                self.sink.play(frame).wait(timeout=5)
         
         except Exception as e:
             print(f"\n❌ 發生錯誤: {e}")
@@ -296,18 +172,34 @@ class VoiceChat:
             traceback.print_exc()
         
         finally:
-            # 恢復終端設定
-            if old_settings:
-                try:
-                    termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_settings)
-                except:
-                    pass
+            self.session.close()
+            self.sink.close()
+            if self.tracker is not None:
+                self.tracker.stop_background()
+            if self.bot.snapshot is not None:
+                self.bot.snapshot.close()
         
         # 顯示統計
         print(f"\n📊 本次對話統計:")
-        print(f"  • 對話輪數: {conversation_count}")
+        print(f"  • 對話輪數: {self.session.turns}")
         print(f"  • 使用後端: {self.bot.backend}")
         print(f"  • 使用模型: {self.bot.model_name}")
+        if self.tracker is not None:
+            seconds = governor.budgets()['level_seconds']
+            print(f"  • 資源調度: 對話 {seconds['heavy']:.0f} 秒 / 合成 {seconds['light']:.0f} 秒"
+                  f" / 閒置 {seconds['idle']:.0f} 秒")
+            if hasattr(self.tracker, 'status'):
+                restarts = {name: s['restarts'] for name, s in self.tracker.status().items() if s['restarts']}
+                if restarts:
+                    print(f"  • 子行程重新啟動: {restarts}")
+        if self.attention is not None:
+            stats = self.attention.stats
+            print(f"  • 注意力閘門: 辨識 {stats['passed']} 句，略過 {stats['suppressed']} 句"
+                  f"（補回 {stats['recovered']} 句）")
+        if self.prefetcher is not None:
+            stats = self.prefetcher.stats
+            print(f"  • 預先生成命中: {stats['hits']}/{stats['asked']}"
+                  f"（{self.prefetcher.hit_rate:.0%}，生成 {stats['prefetched']} 個，取消 {stats['cancelled']} 次）")
 
 
 def test_audio_devices():
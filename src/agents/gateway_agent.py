@@ -8,6 +8,11 @@ import json
 from typing import Dict, Any, List
 from dotenv import load_dotenv
 
+try:
+    from ..runtime.tracing import tracer
+except ImportError:  # 以頂層套件 agents 匯入時
+    from runtime.tracing import tracer
+
 load_dotenv()
 
 
@@ -79,10 +84,12 @@ class GatewayAgent:
         ]
         
         try:
-            response = self.llm_client.chat(
-                model=self.model_name,
-                messages=messages
-            )
+            with tracer.span('gateway.route', model=self.model_name) as span:
+                response = self.llm_client.chat(
+                    model=self.model_name,
+                    messages=messages
+                )
+                span.ollama(response)
             
             result = response['message']['content'].strip()
             
@@ -4,7 +4,7 @@ Multi-Agent 協調器
 """
 
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
 from dotenv import load_dotenv
 
 from .gateway_agent import GatewayAgent
@@ -40,28 +40,86 @@ class MultiAgentOrchestrator:
             'companion': CompanionAgent(llm_client, self.model_name)
         }
         
-        # 對話上下文
-        self.context = {
+        # 對話上下文（預設；多個對話共用同一個協調器時，各自傳入自己的 context）
+        self.context = self.new_context()
+        
+        print("✅ Multi-Agent 系統已初始化")
+        print(f"   可用 Agents: {', '.join(self.agents.keys())}")
+    
+    @staticmethod
+    def new_context() -> Dict[str, Any]:
+        """建立空的對話上下文"""
+        return {
             'history': [],
             'student_level': 'elementary',  # elementary, intermediate, advanced
             'last_agent': None
         }
-        
-        print("✅ Multi-Agent 系統已初始化")
-        print(f"   可用 Agents: {', '.join(self.agents.keys())}")
     
-    def process_question(self, question: str, verbose: bool = False) -> str:
+    def process_question(self, question: str, verbose: bool = False,
+                         context: Dict[str, Any] = None) -> str:
         """
         處理學生問題
         
         Args:
             question: 學生問題
             verbose: 是否顯示詳細過程
+            context: 對話上下文（預設使用 self.context）
             
         Returns:
             最終回應
         """
-        # 步驟 1: 路由決策
+        context = self.context if context is None else context
+        
+        # 步驟 1 & 2: 路由並取得專業 Agent
+        target_agent_name = self._route(question, verbose)
+        target_agent = self.agents[target_agent_name]
+        
+        # 呼叫 Agent 處理
+        response = target_agent.process(question, context)
+        
+        if verbose:
+            print(f"   回應長度: {len(response)} 字")
+        
+        # 步驟 3: 記錄對話歷史
+        self._record(question, response, target_agent_name, context)
+        
+        if verbose:
+            print(f"\n✅ 處理完成")
+        
+        return response
+    
+    def process_question_stream(self, question: str, verbose: bool = False,
+                                context: Dict[str, Any] = None) -> Iterator[str]:
+        """
+        串流處理學生問題（路由完成後，專業 Agent 邊生成邊交出文字）
+        
+        中途停止（例如小朋友說「跳過」）時，已經生成的部分仍會記入對話歷史
+        
+        Args:
+            question: 學生問題
+            verbose: 是否顯示詳細過程
+            context: 對話上下文（預設使用 self.context）
+            
+        Yields:
+            回應內容片段
+        """
+        context = self.context if context is None else context
+        target_agent_name = self._route(question, verbose)
+        target_agent = self.agents[target_agent_name]
+        
+        parts = []
+        try:
+            for chunk in target_agent.process_stream(question, context):
+                parts.append(chunk)
+                yield chunk
+        finally:
+            response = ''.join(parts)
+            if verbose:
+                print(f"   回應長度: {len(response)} 字")
+            self._record(question, response, target_agent_name, context)
+    
+    def _route(self, question: str, verbose: bool = False) -> str:
+        """路由決策，回傳要使用的 Agent 名稱"""
         routing_result = self.gateway.route_question(question)
         target_agent_name = routing_result['agent']
         confidence = routing_result['confidence']
@@ -74,44 +132,34 @@ class MultiAgentOrchestrator:
             print(f"   信心度: {confidence:.2%}")
             print(f"   推理: {routing_result.get('reasoning', 'N/A')}")
         
-        # 步驟 2: 呼叫專業 Agent
         if target_agent_name not in self.agents:
             if verbose:
                 print(f"   ⚠️  Agent 不存在，使用後備: companion")
             target_agent_name = 'companion'  # 後備
         
-        target_agent = self.agents[target_agent_name]
-        
         if verbose:
             print(f"\n🤖 [{target_agent_name}] 正在處理...")
             print(f"   Agent 描述: {self._get_agent_description(target_agent_name)}")
         
-        # 呼叫 Agent 處理
-        response = target_agent.process(question, self.context)
-        
-        if verbose:
-            print(f"   回應長度: {len(response)} 字")
-        
-        # 步驟 3: 記錄對話歷史
-        self.context['history'].append({
+        return target_agent_name
+    
+    def _record(self, question: str, response: str, agent_name: str,
+                context: Dict[str, Any]):
+        """記錄對話歷史"""
+        context['history'].append({
             'role': 'user',
             'content': question
         })
-        self.context['history'].append({
+        context['history'].append({
             'role': 'assistant',
             'content': response
         })
         
         # 限制歷史長度（保留最近 10 輪對話）
-        if len(self.context['history']) > 20:
-            self.context['history'] = self.context['history'][-20:]
-        
-        self.context['last_agent'] = target_agent_name
+        if len(context['history']) > 20:
+            context['history'] = context['history'][-20:]
         
-        if verbose:
-            print(f"\n✅ 處理完成")
-        
-        return response
+        context['last_agent'] = agent_name
     
     def _get_question_type(self, question: str) -> str:
         """分析問題類型"""
@@ -151,11 +199,7 @@ class MultiAgentOrchestrator:
     
     def reset_context(self):
         """重置對話上下文"""
-        self.context = {
-            'history': [],
-            'student_level': 'elementary',
-            'last_agent': None
-        }
+        self.context = self.new_context()
         print("✅ 對話上下文已清除")
     
     def get_stats(self) -> Dict[str, Any]:
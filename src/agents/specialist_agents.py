@@ -4,7 +4,12 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
+
+try:
+    from ..runtime.tracing import tracer
+except ImportError:  # 以頂層套件 agents 匯入時
+    from runtime.tracing import tracer
 
 
 class BaseAgent(ABC):
@@ -34,17 +39,65 @@ class BaseAgent(ABC):
         """
         pass
     
+    def process_stream(self, question: str, context: Dict[str, Any] = None) -> Iterator[str]:
+        """
+        串流處理問題（邊生成邊交出文字）
+        
+        Args:
+            question: 學生問題
+            context: 上下文資訊（對話歷史、學生程度等）
+            
+        Yields:
+            回應內容片段
+        """
+        messages = [
+            {'role': 'system', 'content': self.get_system_prompt()},
+            {'role': 'user', 'content': question}
+        ]
+        
+        if context and 'history' in context:
+            messages = [messages[0]] + context['history'] + [messages[1]]
+        
+        yield from self._call_llm_stream(messages)
+    
     def _call_llm(self, messages: list) -> str:
         """呼叫 LLM"""
         try:
-            response = self.llm_client.chat(
-                model=self.model_name,
-                messages=messages
-            )
+            with tracer.span(f'llm.{self.agent_name}', model=self.model_name) as span:
+                response = self.llm_client.chat(
+                    model=self.model_name,
+                    messages=messages
+                )
+                span.ollama(response)
             return response['message']['content']
         except Exception as e:
             print(f"{self.agent_name} 錯誤: {e}")
             return "抱歉，我現在無法回答這個問題。"
+    
+    def _call_llm_stream(self, messages: list) -> Iterator[str]:
+        """串流呼叫 LLM（已經交出部分內容後才出錯就直接結束）"""
+        produced = False
+        span = tracer.span(f'llm.{self.agent_name}', model=self.model_name, stream=True)
+        try:
+            for chunk in self.llm_client.chat(
+                model=self.model_name,
+                messages=messages,
+                stream=True
+            ):
+                content = chunk['message']['content']
+                if chunk.get('done'):
+                    span.ollama(chunk)
+                if content:
+                    if not produced:
+                        tracer.mark('first_token')
+                    produced = True
+                    yield content
+        except Exception as e:
+            print(f"{self.agent_name} 錯誤: {e}")
+            if not produced:
+                yield "抱歉，我現在無法回答這個問題。"
+        finally:
+            span.finish()
 
 
 class MathTutorAgent(BaseAgent):
@@ -0,0 +1,21 @@
+"""
+執行期工具模組
+延遲追蹤、對話快照、資源調度、子行程監督等跨語音、Agents 共用的基礎設施
+"""
+
+from .tracing import Tracer, Span, tracer
+from .snapshot import SessionSnapshot
+from .governor import ResourceGovernor, governor
+from .frames import FrameRing
+from .supervisor import Supervisor
+
+__all__ = [
+    'Tracer',
+    'Span',
+    'tracer',
+    'SessionSnapshot',
+    'ResourceGovernor',
+    'governor',
+    'FrameRing',
+    'Supervisor'
+]
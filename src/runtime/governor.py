@@ -0,0 +1,239 @@
+"""
+資源調度模組
+視覺追蹤（每幀三個 MediaPipe 模型）、本地 LLM、STT / TTS 在只有 CPU 的機器人上搶同一組核心。
+調度器以簡單的優先順序協調：對話優先
+
+- heavy：LLM 回答或語音辨識進行中 → 視覺降到 VISION_BUSY_FPS，暫停姿勢模型，只留一個核心
+- light：只有語音合成 → 視覺幀率減半，核心分一半
+- idle：都沒有 → 視覺恢復 VISION_FPS 與全部核心
+
+各子系統用 governor.busy('llm') / @governor.track('stt') 回報自己正在工作，
+視覺迴圈每一幀讀 governor.budget('vision') 決定要跑哪些模型、等多久。
+工作結束後先等 GOVERNOR_IDLE_MS 才把資源還給視覺（句子之間、路由到回答之間的短暫空檔不會來回切換）
+"""
+
+import os
+import time
+import inspect
+import threading
+import functools
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SUBSYSTEMS = ('vision', 'llm', 'stt', 'tts')
+
+# 對話中的重負載（模型推論）
+HEAVY = ('llm', 'stt')
+LIGHT = ('tts',)
+
+LEVELS = ('idle', 'light', 'heavy')
+
+
+class ResourceGovernor:
+    """跨子系統的 CPU 資源調度"""
+
+    def __init__(self, cores: int = None, enabled: bool = None):
+        """
+        Args:
+            cores: 可分配的核心數，預設讀取 GOVERNOR_CORES（0 表示全部）
+            enabled: 是否啟用，預設讀取 GOVERNOR（預設開啟）
+        """
+        self.enabled = enabled if enabled is not None else \
+                       os.getenv('GOVERNOR', 'true').lower() == 'true'
+        self.cores = cores or int(os.getenv('GOVERNOR_CORES', '0')) or os.cpu_count() or 1
+        self.vision_fps = float(os.getenv('VISION_FPS', '15'))
+        self.vision_busy_fps = float(os.getenv('VISION_BUSY_FPS', '3'))
+        self.idle_delay = float(os.getenv('GOVERNOR_IDLE_MS', '800')) / 1000
+
+        self.level = 'idle'
+        self._active: Dict[str, int] = {name: 0 for name in SUBSYSTEMS}
+        self._lock = threading.Lock()
+        self._timer: threading.Timer = None
+        self._listeners: List[Callable[[str, dict], None]] = []
+        self._since = time.monotonic()
+        self._level_seconds: Dict[str, float] = {level: 0.0 for level in LEVELS}
+        self._followed = None    # 跟隨其他行程決定的等級（多行程模式）
+
+    # === 回報工作 ===
+
+    def acquire(self, subsystem: str):
+        """子系統開始工作"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._active[subsystem] += 1
+        self._update()
+
+    def release(self, subsystem: str):
+        """子系統結束工作"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._active[subsystem] = max(0, self._active[subsystem] - 1)
+        self._update()
+
+    @contextmanager
+    def busy(self, subsystem: str):
+        """
+        在這段期間標記子系統正在工作
+
+        Args:
+            subsystem: 'llm' / 'stt' / 'tts' / 'vision'
+        """
+        self.acquire(subsystem)
+        try:
+            yield
+        finally:
+            self.release(subsystem)
+
+    def track(self, subsystem: str):
+        """
+        裝飾器版的 busy()；generator 函式從開始迭代到結束（或關閉）都算在工作
+        """
+        def decorator(func):
+            if inspect.isgeneratorfunction(func):
+                @functools.wraps(func)
+                def generator(*args, **kwargs):
+                    with self.busy(subsystem):
+                        yield from func(*args, **kwargs)
+                return generator
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.busy(subsystem):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # === 預算 ===
+
+    def _target_level(self) -> str:
+        """需持有 _lock"""
+        if any(self._active[name] for name in HEAVY):
+            return 'heavy'
+        if any(self._active[name] for name in LIGHT):
+            return 'light'
+        return 'idle'
+
+    def follow(self, level: str):
+        """
+        直接採用另一個行程決定的等級（視覺在子行程執行時，跟隨對話所在的主行程）；
+        之後本行程的工作回報只計數，不再改變等級
+
+        Args:
+            level: 'idle' / 'light' / 'heavy'
+        """
+        with self._lock:
+            self._followed = level
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            changed = self._set_level(level)
+        if changed:
+            self._notify()
+
+    def _update(self):
+        """重新決定等級：升級立即生效，降級等 idle_delay 之後（期間又有工作就取消）"""
+        if self._followed is not None:
+            return
+        with self._lock:
+            target = self._target_level()
+            if LEVELS.index(target) >= LEVELS.index(self.level):
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                changed = self._set_level(target)
+            else:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.idle_delay, self._relax)
+                    self._timer.daemon = True
+                    self._timer.start()
+                changed = False
+        if changed:
+            self._notify()
+
+    def _relax(self):
+        with self._lock:
+            self._timer = None
+            changed = self._set_level(self._target_level())
+        if changed:
+            self._notify()
+
+    def _set_level(self, level: str) -> bool:
+        """需持有 _lock"""
+        if level == self.level:
+            return False
+        now = time.monotonic()
+        self._level_seconds[self.level] += now - self._since
+        self._since = now
+        self.level = level
+        return True
+
+    def budget(self, subsystem: str) -> dict:
+        """
+        子系統目前的預算
+
+        Returns:
+            cores（建議使用的執行緒數）；視覺另有 fps（幀率上限）、pose（是否跑姿勢模型）
+        """
+        level = self.level if self.enabled else 'idle'
+        cores = self.cores
+        if subsystem == 'vision':
+            if level == 'heavy':
+                return {'cores': 1, 'fps': self.vision_busy_fps, 'pose': False}
+            if level == 'light':
+                return {'cores': max(1, cores // 2), 'fps': self.vision_fps / 2, 'pose': True}
+            return {'cores': cores, 'fps': self.vision_fps, 'pose': True}
+
+        if level == 'heavy':
+            return {'cores': max(1, cores - 1)}
+        if level == 'light':
+            return {'cores': max(1, cores - cores // 2)}
+        return {'cores': cores}
+
+    def budgets(self) -> dict:
+        """所有子系統目前的預算與工作數"""
+        with self._lock:
+            active = dict(self._active)
+            seconds = dict(self._level_seconds)
+            seconds[self.level] += time.monotonic() - self._since
+        return {
+            'level': self.level if self.enabled else 'idle',
+            'cores': self.cores,
+            'subsystems': {
+                name: {**self.budget(name), 'active': active[name]} for name in SUBSYSTEMS
+            },
+            'level_seconds': {level: round(value, 1) for level, value in seconds.items()}
+        }
+
+    def frame_interval(self) -> float:
+        """視覺每幀最少間隔（秒）"""
+        fps = self.budget('vision')['fps']
+        return 1.0 / fps if fps > 0 else 0.0
+
+    # === 通知 ===
+
+    def subscribe(self, callback: Callable[[str, dict], None]):
+        """等級改變時呼叫 callback(level, budgets)（在觸發改變的執行緒上）"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self):
+        budgets = self.budgets()
+        for callback in list(self._listeners):
+            try:
+                callback(budgets['level'], budgets)
+            except Exception as e:
+                print(f"⚠️  資源調度通知錯誤: {e}")
+
+
+# 全域調度器（語音、視覺各模組共用）
+governor = ResourceGovernor()
@@ -0,0 +1,263 @@
+"""
+對話快照模組
+程式重新啟動（或當機）後接續上一次的對話，小朋友不用把剛剛說的話再說一遍
+
+每個對話一個 JSONL 檔（{DATA_DIR}/sessions/<session>.jsonl），只會往後附加：
+- snap：完整狀態（檔案開頭，以及記錄太多行時壓縮重寫）
+- turn：這一輪新增的兩則訊息與 last_agent / student_level / summary
+- reset：清除對話
+
+每輪都會 flush 到作業系統（程式當掉不會遺失）；fsync 則合併起來，
+最多每 SNAPSHOT_FSYNC_SECONDS 秒一次（斷電最多遺失這段時間的對話）。
+檔案很小（壓縮後只有最近 20 則訊息），恢復只需要讀一個檔案，通常在幾毫秒內完成
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 保留的訊息數（與協調器的歷史長度一致：最近 10 輪）
+MAX_HISTORY = 20
+
+# 記錄超過這麼多行就壓縮成一行完整狀態
+COMPACT_RECORDS = 64
+
+
+def _default_directory() -> Path:
+    return Path(os.getenv('SNAPSHOT_DIR', str(Path(os.getenv('DATA_DIR', './data')) / 'sessions')))
+
+
+def empty_state() -> dict:
+    """空的對話狀態"""
+    return {
+        'history': [],
+        'last_agent': None,
+        'student_level': None,
+        'summary': None
+    }
+
+
+class SessionSnapshot:
+    """一個對話的快照檔"""
+
+    def __init__(self, path: Path, fsync_seconds: float = None):
+        """
+        Args:
+            path: 快照檔路徑（已存在時讀入狀態，之後接著寫）
+            fsync_seconds: fsync 合併間隔，預設讀取 SNAPSHOT_FSYNC_SECONDS
+        """
+        self.path = Path(path)
+        self.session_id = self.path.stem
+        self.fsync_seconds = fsync_seconds if fsync_seconds is not None else \
+                             float(os.getenv('SNAPSHOT_FSYNC_SECONDS', '2'))
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._records = 0
+        self._last_fsync = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+
+        start = time.perf_counter()
+        self.state, self._records, self._partial = self._load(self.path)
+        self.load_ms = (time.perf_counter() - start) * 1000
+
+    # === 開啟 ===
+
+    @classmethod
+    def resume(cls, directory: str = None, max_age_hours: float = None) -> 'SessionSnapshot':
+        """
+        接續最近一次的對話（太久以前的就開新的）
+
+        Args:
+            directory: 快照目錄，預設 SNAPSHOT_DIR（{DATA_DIR}/sessions）
+            max_age_hours: 超過幾小時沒說話就不接續，預設讀取 SNAPSHOT_RESUME_HOURS
+        """
+        directory = Path(directory) if directory else _default_directory()
+        max_age = 3600 * (max_age_hours if max_age_hours is not None else
+                          float(os.getenv('SNAPSHOT_RESUME_HOURS', '6')))
+
+        latest = None
+        try:
+            files = sorted(directory.glob('*.jsonl'), key=lambda p: p.stat().st_mtime, reverse=True)
+        except OSError:
+            files = []
+        if files and time.time() - files[0].stat().st_mtime <= max_age:
+            latest = files[0]
+        cls._prune(files, int(os.getenv('SNAPSHOT_KEEP', '50')))
+
+        if latest is None:
+            session_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+            latest = directory / f'{session_id}.jsonl'
+        return cls(latest)
+
+    @classmethod
+    def for_session(cls, session_id: str, directory: str = None) -> 'SessionSnapshot':
+        """
+        指定 session 的快照（對話伺服器以裝置 ID 接續）
+
+        預設放在 SNAPSHOT_DIR/server，不會被 resume() 當成最近一次的對話
+        """
+        directory = Path(directory) if directory else _default_directory() / 'server'
+        return cls(directory / f'{session_id}.jsonl')
+
+    @staticmethod
+    def _prune(files, keep: int):
+        """只保留最近的幾個快照檔"""
+        for path in files[keep:]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    @property
+    def restored(self) -> bool:
+        """是否有接續到之前的對話"""
+        return bool(self.state and self.state['history'])
+
+    # === 寫入 ===
+
+    def record_turn(self, state: dict):
+        """
+        記錄一輪對話（在回答完成後呼叫）
+
+        Args:
+            state: 目前的完整狀態（history / last_agent / student_level / summary），
+                   只有最後兩則訊息會寫進檔案
+        """
+        record = {
+            't': 'turn',
+            'ts': round(time.time(), 3),
+            'messages': state['history'][-2:],
+            'last_agent': state.get('last_agent'),
+            'student_level': state.get('student_level'),
+            'summary': state.get('summary')
+        }
+        with self._lock:
+            if self._records >= COMPACT_RECORDS:
+                self._compact(state)
+            else:
+                self._append(record)
+
+    def record_reset(self):
+        """記錄清除對話"""
+        with self._lock:
+            self._append({'t': 'reset', 'ts': round(time.time(), 3)})
+
+    def _append(self, record: dict):
+        """附加一行並 flush；fsync 合併處理。需持有 _lock"""
+        try:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if self._partial:
+                    self._file.write('\n')     # 上次當掉時寫到一半的那一行
+                    self._partial = False
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._records += 1
+        except OSError as e:
+            print(f"⚠️  無法寫入對話快照: {e}")
+            return
+
+        wait = self.fsync_seconds - (time.monotonic() - self._last_fsync)
+        if wait <= 0:
+            self._fsync()
+        elif self._timer is None:
+            self._timer = threading.Timer(wait, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _compact(self, state: dict):
+        """把整個檔案改寫成一行完整狀態。需持有 _lock"""
+        record = {
+            't': 'snap',
+            'ts': round(time.time(), 3),
+            **self._trim(state)
+        }
+        tmp = self.path.with_suffix('.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            os.replace(tmp, self.path)
+            self._records = 1
+            self._partial = False
+            self._last_fsync = time.monotonic()
+        except OSError as e:
+            print(f"⚠️  無法壓縮對話快照: {e}")
+
+    def _fsync(self):
+        """需持有 _lock"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is not None:
+            try:
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                print(f"⚠️  無法寫入對話快照: {e}")
+        self._last_fsync = time.monotonic()
+
+    def flush(self):
+        """立即 fsync"""
+        with self._lock:
+            self._fsync()
+
+    def close(self):
+        with self._lock:
+            self._fsync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # === 讀取 ===
+
+    @staticmethod
+    def _trim(state: dict) -> dict:
+        trimmed = {**empty_state(), **state}
+        trimmed['history'] = list(state['history'][-MAX_HISTORY:])
+        return trimmed
+
+    @classmethod
+    def _load(cls, path: Path):
+        """重播快照檔，回傳 (狀態, 行數, 最後一行是否不完整)；檔案不存在時狀態為 None"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None, 0, False
+        except OSError as e:
+            print(f"⚠️  無法讀取對話快照: {e}")
+            return None, 0, False
+
+        state = empty_state()
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue    # 寫到一半當掉的最後一行
+            kind = record.get('t')
+            if kind == 'snap':
+                state = cls._trim(record)
+            elif kind == 'turn':
+                state['history'] = (state['history'] + record.get('messages', []))[-MAX_HISTORY:]
+                for key in ('last_agent', 'student_level', 'summary'):
+                    state[key] = record.get(key)
+            elif kind == 'reset':
+                state = empty_state()
+        state.pop('t', None)
+        state.pop('ts', None)
+        return state, len(lines), bool(lines) and not lines[-1].endswith('\n')
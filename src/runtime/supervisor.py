@@ -0,0 +1,347 @@
+"""
+子行程監督模組
+把吃 CPU 的子系統（攝像頭、MediaPipe 追蹤）放到各自的行程，不和語音的音訊回呼搶 GIL；
+每個子行程固定在自己的 CPU 核心上，當掉時由監督者自動重新啟動
+
+- 子行程以 spawn 啟動（不繼承主行程的執行緒、PyAudio / 模型狀態）
+- 控制訊息是 (topic, payload) 的小 tuple，經由 Pipe 傳遞；影像走 FrameRing（共享記憶體）
+- 當掉後以指數退避重新啟動（SUPERVISOR_BACKOFF 起跳，最多 10 秒）；
+  SUPERVISOR_RESTART_WINDOW 秒內當掉超過 SUPERVISOR_MAX_RESTARTS 次就放棄
+- 核心足夠時，每個子行程各分一個核心（從最後一個往前），主行程保留其餘核心
+
+子行程的進入點必須是模組層級的函式：worker(channel, *args)，
+以 channel.messages() 接收控制訊息、channel.send() 回報，channel.stopped 為 True 時結束
+"""
+
+import os
+import time
+import signal
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing import connection
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_BACKOFF = 10.0
+
+
+class Channel:
+    """子行程這一端的控制管道"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.stopped = False
+
+    def send(self, topic: str, payload=None):
+        """回報給主行程（主行程已結束時標記為停止）"""
+        try:
+            self.conn.send((topic, payload))
+        except (BrokenPipeError, EOFError, OSError):
+            self.stopped = True
+
+    def messages(self, timeout: float = 0):
+        """
+        取出收到的控制訊息
+
+        Args:
+            timeout: 沒有訊息時最多等幾秒（也可當作可被停止打斷的 sleep）
+
+        Yields:
+            (topic, payload)；收到 stop 或主行程結束時不再產生，並設定 stopped
+        """
+        try:
+            while not self.stopped and self.conn.poll(timeout):
+                timeout = 0
+                topic, payload = self.conn.recv()
+                if topic == 'stop':
+                    self.stopped = True
+                    return
+                yield topic, payload
+        except (EOFError, OSError):
+            self.stopped = True
+
+
+def _bootstrap(name: str, target: Callable, conn, core: Optional[int], args: tuple):
+    """子行程進入點：固定核心後執行 target"""
+    # Ctrl+C 由主行程處理，再通知子行程停止
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if core is not None:
+        try:
+            os.sched_setaffinity(0, {core})
+        except (AttributeError, OSError):
+            pass
+
+    channel = Channel(conn)
+    try:
+        target(channel, *args)
+    finally:
+        conn.close()
+
+
+class Worker:
+    """一個受監督的子行程"""
+
+    def __init__(self, name: str, target: Callable, args: tuple = (), core: int = None,
+                 on_start: Callable[[str], None] = None):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.core = core
+        self.on_start = on_start
+
+        self.process = None
+        self.conn = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_start: Optional[float] = None   # 等待重新啟動的時間點
+        self.gave_up = False
+        self._failures = deque()
+        self._send_lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class Supervisor:
+    """啟動、監督並自動重新啟動子行程"""
+
+    def __init__(self, max_restarts: int = None, window: float = None, backoff: float = None,
+                 pin: bool = None):
+        """
+        Args:
+            max_restarts: 時間窗內最多重新啟動幾次，預設讀取 SUPERVISOR_MAX_RESTARTS
+            window: 計算重新啟動次數的時間窗（秒），預設讀取 SUPERVISOR_RESTART_WINDOW
+            backoff: 第一次重新啟動前等待的秒數（之後每次加倍），預設讀取 SUPERVISOR_BACKOFF
+            pin: 是否把每個子行程固定在各自的核心，預設讀取 SUPERVISOR_PIN
+        """
+        self.max_restarts = max_restarts if max_restarts is not None else \
+                            int(os.getenv('SUPERVISOR_MAX_RESTARTS', '5'))
+        self.window = window or float(os.getenv('SUPERVISOR_RESTART_WINDOW', '60'))
+        self.backoff = backoff if backoff is not None else float(os.getenv('SUPERVISOR_BACKOFF', '0.5'))
+        self.pin = pin if pin is not None else os.getenv('SUPERVISOR_PIN', 'true').lower() == 'true'
+
+        self.workers: Dict[str, Worker] = {}
+        self._handlers: Dict[str, List[Callable]] = {}
+        self._ctx = multiprocessing.get_context('spawn')
+        self._lock = threading.Lock()
+        self._wake_recv, self._wake_send = self._ctx.Pipe(duplex=False)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    # === 設定 ===
+
+    def add(self, name: str, target: Callable, args: tuple = (), core: int = None,
+            on_start: Callable[[str], None] = None):
+        """
+        登記一個子行程（start() 時啟動）
+
+        Args:
+            name: 名稱（send() 與訊息回呼用）
+            target: 模組層級的函式 target(channel, *args)
+            args: 傳給 target 的參數（必須可 pickle）
+            core: 指定核心，None 表示自動分配
+            on_start: 每次（重新）啟動後呼叫 on_start(name)，例如補送目前的設定
+        """
+        self.workers[name] = Worker(name, target, args, core, on_start)
+
+    def on(self, topic: str, callback: Callable[[str, object], None]):
+        """子行程送來 topic 訊息時呼叫 callback(worker_name, payload)（在監督執行緒上）"""
+        self._handlers.setdefault(topic, []).append(callback)
+
+    def send(self, name: str, topic: str, payload=None) -> bool:
+        """送控制訊息給子行程；子行程不在執行時回傳 False"""
+        worker = self.workers.get(name)
+        if worker is None or worker.conn is None:
+            return False
+        try:
+            with worker._send_lock:
+                worker.conn.send((topic, payload))
+            return True
+        except (BrokenPipeError, EOFError, OSError):
+            return False
+
+    # === 啟動與停止 ===
+
+    def start(self):
+        """分配核心、啟動所有子行程與監督執行緒"""
+        self._assign_cores()
+        with self._lock:
+            for worker in self.workers.values():
+                self._spawn(worker)
+        self._thread = threading.Thread(target=self._monitor, name='supervisor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 3.0):
+        """通知所有子行程停止，逾時未結束就強制終止"""
+        self._stopping.set()
+        self._wake_send.send(None)
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+        for worker in self.workers.values():
+            if worker.alive:
+                self.send(worker.name, 'stop')
+        deadline = time.monotonic() + timeout
+        for worker in self.workers.values():
+            if worker.process is None:
+                continue
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                print(f"⚠️  {worker.name} 沒有回應，強制結束")
+                worker.process.terminate()
+                worker.process.join(1)
+            if worker.conn is not None:
+                worker.conn.close()
+                worker.conn = None
+
+    def _assign_cores(self):
+        """每個子行程一個核心（從最後一個往前），主行程（語音、對話）保留其餘核心"""
+        if not self.pin or not hasattr(os, 'sched_getaffinity'):
+            return
+        available = sorted(os.sched_getaffinity(0))
+        unassigned = [w for w in self.workers.values() if w.core is None]
+        free = [core for core in available if core not in {w.core for w in self.workers.values()}]
+        if len(free) <= len(unassigned):
+            print(f"💡 只有 {len(available)} 個核心，子行程不固定核心")
+            return
+
+        for worker in unassigned:
+            worker.core = free.pop()
+        self._pin_self(set(free))
+
+    @staticmethod
+    def _pin_self(cores: set):
+        """把主行程的所有執行緒固定在剩下的核心"""
+        try:
+            for tid in os.listdir('/proc/self/task'):
+                os.sched_setaffinity(int(tid), cores)
+        except (AttributeError, OSError, ValueError):
+            pass
+
+    def _spawn(self, worker: Worker):
+        """啟動（或重新啟動）子行程。需持有 _lock"""
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_bootstrap,
+            args=(worker.name, worker.target, child_conn, worker.core, worker.args),
+            name=f'robot-{worker.name}',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+
+        worker.process = process
+        worker.conn = parent_conn
+        worker.started_at = time.monotonic()
+        worker.next_start = None
+        core = f"，核心 {worker.core}" if worker.core is not None else ''
+        print(f"🚀 {worker.name} 已啟動（pid {process.pid}{core}）")
+
+        if worker.on_start is not None:
+            try:
+                worker.on_start(worker.name)
+            except Exception as e:
+                print(f"⚠️  {worker.name} 啟動回呼錯誤: {e}")
+
+    # === 監督 ===
+
+    def _monitor(self):
+        while not self._stopping.is_set():
+            waitables = {self._wake_recv: None}
+            for worker in self.workers.values():
+                if worker.conn is not None:
+                    waitables[worker.conn] = worker
+                if worker.process is not None and worker.next_start is None and not worker.gave_up:
+                    waitables[worker.process.sentinel] = worker
+
+            pending = [w.next_start for w in self.workers.values() if w.next_start is not None]
+            timeout = max(0.0, min(pending) - time.monotonic()) if pending else None
+
+            for ready in connection.wait(list(waitables), timeout):
+                if self._stopping.is_set():
+                    return
+                worker = waitables[ready]
+                if worker is None:
+                    self._wake_recv.recv()
+                elif ready is worker.conn:
+                    self._receive(worker)
+                else:
+                    self._exited(worker)
+
+            self._restart_due()
+
+    def _receive(self, worker: Worker):
+        try:
+            topic, payload = worker.conn.recv()
+        except (EOFError, OSError):
+            # 管道斷了，等 sentinel 處理行程結束
+            worker.conn.close()
+            worker.conn = None
+            return
+        for callback in self._handlers.get(topic, []):
+            try:
+                callback(worker.name, payload)
+            except Exception as e:
+                print(f"⚠️  處理 {worker.name} 的 {topic} 訊息時發生錯誤: {e}")
+
+    def _exited(self, worker: Worker):
+        """子行程結束：正常結束就不管，當掉就排定重新啟動"""
+        worker.process.join(1)     # sentinel 可能比 waitpid 早一點就緒
+        code = worker.process.exitcode
+        if worker.conn is not None:
+            # 先把結束前送出的訊息處理完
+            while worker.conn is not None and worker.conn.poll():
+                self._receive(worker)
+            if worker.conn is not None:
+                worker.conn.close()
+                worker.conn = None
+
+        if code == 0:
+            print(f"✅ {worker.name} 已結束")
+            worker.gave_up = True
+            return
+
+        now = time.monotonic()
+        worker._failures.append(now)
+        while worker._failures and now - worker._failures[0] > self.window:
+            worker._failures.popleft()
+
+        if len(worker._failures) > self.max_restarts:
+            print(f"❌ {worker.name} 在 {self.window:.0f} 秒內當掉 {len(worker._failures)} 次，不再重新啟動")
+            worker.gave_up = True
+            return
+
+        delay = min(self.backoff * 2 ** (len(worker._failures) - 1), MAX_BACKOFF)
+        print(f"💥 {worker.name} 異常結束（exit {code}），{delay:.1f} 秒後重新啟動")
+        worker.next_start = now + delay
+
+    def _restart_due(self):
+        now = time.monotonic()
+        with self._lock:
+            for worker in self.workers.values():
+                if worker.next_start is not None and worker.next_start <= now and not self._stopping.is_set():
+                    worker.restarts += 1
+                    self._spawn(worker)
+
+    # === 狀態 ===
+
+    def status(self) -> Dict[str, dict]:
+        """各子行程的狀態"""
+        now = time.monotonic()
+        return {
+            worker.name: {
+                'pid': worker.process.pid if worker.process is not None else None,
+                'core': worker.core,
+                'alive': worker.alive,
+                'restarts': worker.restarts,
+                'uptime_s': round(now - worker.started_at, 1) if worker.alive else 0.0,
+                'gave_up': worker.gave_up
+            }
+            for worker in self.workers.values()
+        }
@@ -0,0 +1,420 @@
+"""
+延遲追蹤模組
+記錄每一輪對話各階段（聆聽、辨識、路由、LLM、合成、播放）花了多少時間，
+輸出兩種格式到 {DATA_DIR}/traces：
+
+- turns_<session>.jsonl：每輪一行摘要（各階段耗時、首音延遲、Ollama 的 eval / prompt_eval 時間）
+- trace_<session>.json：Chrome trace 事件，可直接拖進 chrome://tracing 或 ui.perfetto.dev
+
+span 只在記憶體裡累積，每輪結束時才一次寫檔；關閉追蹤（TRACE=false）時
+span() 回傳共用的空物件，幾乎沒有額外負擔
+
+機器人可能一開就是好幾天：單一檔案超過 TRACE_MAX_MB 就換下一個分段（_1、_2…），
+整個目錄超過 TRACE_KEEP_MB 時從最舊的檔案開始刪除
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Ollama 回應中的統計欄位（時間單位為奈秒）
+OLLAMA_DURATIONS = ('total_duration', 'load_duration', 'prompt_eval_duration', 'eval_duration')
+OLLAMA_COUNTS = ('prompt_eval_count', 'eval_count')
+
+# 不在對話輪次中（例如批次轉錄）時，累積這麼多事件就先寫出
+MAX_PENDING_EVENTS = 2000
+
+
+def _field(response, key: str):
+    """從 Ollama 回應（dict 或物件）取欄位"""
+    try:
+        return response[key]
+    except (KeyError, TypeError, IndexError):
+        return getattr(response, key, None)
+
+
+class Span:
+    """一段計時區間（可當 context manager，或手動呼叫 finish()）"""
+
+    __slots__ = ('tracer', 'name', 'args', 'start', 'end', 'tid', 'turn')
+
+    def __init__(self, tracer: 'Tracer', name: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.tid = threading.get_ident()
+        self.turn = tracer._turn
+        self.end = None
+        self.start = time.perf_counter_ns()
+
+    def set(self, **args):
+        """附加資訊（例如引擎名稱、字數）"""
+        self.args.update(args)
+
+    def ollama(self, response):
+        """記錄 Ollama 回應中的 prompt_eval / eval 統計（毫秒）"""
+        for key in OLLAMA_DURATIONS:
+            value = _field(response, key)
+            if value:
+                self.args[f"ollama_{key.replace('_duration', '')}_ms"] = value / 1e6
+        for key in OLLAMA_COUNTS:
+            value = _field(response, key)
+            if value:
+                self.args[f'ollama_{key}'] = value
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter_ns()
+            self.tracer._record(self)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter_ns()
+        return (end - self.start) / 1e6
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None and exc_type is not GeneratorExit:
+            self.args['error'] = exc_type.__name__
+        self.finish()
+
+
+class _NullSpan:
+    """關閉追蹤時使用的空 span"""
+
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def ollama(self, response):
+        pass
+
+    def finish(self):
+        pass
+
+    duration_ms = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Turn:
+    """一輪對話"""
+
+    __slots__ = ('index', 'start', 'wall_time', 'spans', 'marks', 'args')
+
+    def __init__(self, index: int, args: Dict[str, Any]):
+        self.index = index
+        self.start = time.perf_counter_ns()
+        self.wall_time = datetime.now()
+        self.spans: List[Span] = []
+        self.marks: Dict[str, float] = {}
+        self.args = args
+
+
+class Tracer:
+    """每輪對話的 span 追蹤器"""
+
+    def __init__(self, directory: str = None, enabled: bool = None):
+        """
+        Args:
+            directory: 輸出目錄，預設 {DATA_DIR}/traces
+            enabled: 是否啟用，預設讀取 TRACE（預設開啟）
+        """
+        self.enabled = enabled if enabled is not None else \
+                       os.getenv('TRACE', 'true').lower() == 'true'
+        self.directory = Path(directory or os.getenv(
+            'TRACE_DIR', str(Path(os.getenv('DATA_DIR', './data')) / 'traces')
+        ))
+        self.session_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.max_bytes = int(float(os.getenv('TRACE_MAX_MB', '20')) * 1024 * 1024)
+        self.keep_bytes = int(float(os.getenv('TRACE_KEEP_MB', '200')) * 1024 * 1024)
+        self._part = 0
+        self._pruned = False
+
+        self._lock = threading.Lock()
+        self._turn: Optional[Turn] = None
+        self._turn_count = 0
+        self._origin = time.perf_counter_ns()
+        self._events: List[dict] = []      # 尚未寫出的 Chrome trace 事件
+        self._threads: Dict[int, str] = {}
+        self._listeners: List[Callable[[dict], None]] = []
+        self._chrome_started = False
+        self._local = threading.local()
+
+        atexit.register(self.flush)
+
+    # === 記錄 ===
+
+    def span(self, name: str, **args) -> Span:
+        """
+        開始一個 span
+
+        Args:
+            name: 階段名稱（例如 'stt.recognize'、'llm.MathTutorAgent'）
+            **args: 附加資訊
+        """
+        if not self.enabled or getattr(self._local, 'paused', False):
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def mark(self, name: str, at: Optional[int] = None, **args):
+        """
+        記錄一個時間點（每輪只記第一次，例如 'first_audio'）
+
+        Args:
+            at: 發生的時間（time.perf_counter_ns()），預設為現在；可以早於這一輪開始
+        """
+        if not self.enabled or getattr(self._local, 'paused', False):
+            return
+
+        now = at if at is not None else time.perf_counter_ns()
+        with self._lock:
+            turn = self._turn
+            if turn is not None:
+                if name in turn.marks:
+                    return
+                turn.marks[name] = (now - turn.start) / 1e6
+            self._events.append({
+                'name': name, 'ph': 'i', 's': 'p',
+                'ts': (now - self._origin) / 1000,
+                'pid': os.getpid(), 'tid': self._thread_id(),
+                'args': args
+            })
+
+    @contextmanager
+    def paused(self):
+        """在目前的執行緒暫停追蹤（背景工作不算進對話延遲，例如預先生成追問的回答）"""
+        self._local.paused = True
+        try:
+            yield
+        finally:
+            self._local.paused = False
+
+    def begin_turn(self, **args):
+        """開始新的一輪（上一輪還沒結束就先結束它）"""
+        if not self.enabled:
+            return
+        if self._turn is not None:
+            self.end_turn()
+        with self._lock:
+            self._turn_count += 1
+            self._turn = Turn(self._turn_count, args)
+
+    def end_turn(self, **args) -> Optional[dict]:
+        """
+        結束目前這一輪並寫檔
+
+        Returns:
+            這一輪的摘要（沒有進行中的一輪時為 None）
+        """
+        with self._lock:
+            turn, self._turn = self._turn, None
+        if turn is None:
+            return None
+
+        turn.args.update(args)
+        summary = self.summarize(turn)
+        self._write(summary)
+
+        for callback in list(self._listeners):
+            try:
+                callback(summary)
+            except Exception as e:
+                print(f"⚠️  追蹤事件處理錯誤: {e}")
+        return summary
+
+    def subscribe(self, callback: Callable[[dict], None]):
+        """每輪結束時呼叫 callback(summary)"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _record(self, span: Span):
+        """span 結束（任何執行緒）"""
+        with self._lock:
+            if span.turn is not None:
+                span.turn.spans.append(span)
+            self._events.append({
+                'name': span.name, 'ph': 'X',
+                'ts': (span.start - self._origin) / 1000,
+                'dur': (span.end - span.start) / 1000,
+                'pid': os.getpid(), 'tid': self._thread_id(span.tid),
+                'args': span.args
+            })
+            overflow = self._turn is None and len(self._events) >= MAX_PENDING_EVENTS
+
+        if overflow:
+            self.flush()
+
+    def _thread_id(self, tid: int = None) -> int:
+        """登記執行緒名稱（Chrome trace 以名稱顯示每一列）；需持有 _lock"""
+        tid = tid or threading.get_ident()
+        if tid not in self._threads:
+            name = next((t.name for t in threading.enumerate() if t.ident == tid), str(tid))
+            self._threads[tid] = name
+            self._events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+                'args': {'name': name}
+            })
+        return tid
+
+    # === 摘要與輸出 ===
+
+    @staticmethod
+    def summarize(turn: Turn) -> dict:
+        """整理一輪的各階段耗時"""
+        stages: Dict[str, dict] = {}
+        ollama: Dict[str, float] = {}
+
+        for span in turn.spans:
+            stage = stages.setdefault(span.name, {'ms': 0.0, 'count': 0})
+            stage['ms'] += (span.end - span.start) / 1e6
+            stage['count'] += 1
+            for key, value in span.args.items():
+                if key.startswith('ollama_'):
+                    ollama[key[7:]] = ollama.get(key[7:], 0) + value
+
+        for stage in stages.values():
+            stage['ms'] = round(stage['ms'], 2)
+
+        # 首音延遲：從小朋友說完（開始辨識）到第一段語音開始播放；
+        # 沒有辨識的一輪（沒聽到、打字輸入、語音指令）沒有起點，不算首音延遲
+        first_audio = turn.marks.get('first_audio')
+        speech_end = turn.marks.get('speech_end')
+        ttfa = None
+        if first_audio is not None and speech_end is not None:
+            ttfa = round(first_audio - speech_end, 2)
+
+        return {
+            'turn': turn.index,
+            'started_at': turn.wall_time.isoformat(timespec='milliseconds'),
+            'total_ms': round((time.perf_counter_ns() - turn.start) / 1e6, 2),
+            'time_to_first_audio_ms': ttfa,
+            'stages': stages,
+            'marks': {name: round(ms, 2) for name, ms in turn.marks.items()},
+            'ollama': {key: round(value, 2) for key, value in ollama.items()},
+            **turn.args
+        }
+
+    def _path(self, prefix: str, suffix: str) -> Path:
+        part = f'_{self._part}' if self._part else ''
+        return self.directory / f'{prefix}_{self.session_id}{part}{suffix}'
+
+    def _rotate_if_full(self):
+        """目前的分段太大就換下一個，並清掉超出總量的舊檔"""
+        if not self._pruned:
+            self._pruned = True
+            self._prune()
+
+        full = False
+        for path in (self._path('turns', '.jsonl'), self._path('trace', '.json')):
+            try:
+                full = full or path.stat().st_size >= self.max_bytes
+            except FileNotFoundError:
+                pass
+        if full:
+            self._part += 1
+            self._chrome_started = False
+            self._prune()
+
+    def _prune(self):
+        """目錄超過 keep_bytes 時從最舊的追蹤檔開始刪（目前的分段不刪）"""
+        current = {self._path('turns', '.jsonl'), self._path('trace', '.json')}
+        try:
+            files = [p for p in self.directory.glob('*') if p.name.startswith(('turns_', 'trace_'))]
+            files = sorted(((p.stat().st_mtime, p.stat().st_size, p) for p in files), key=lambda f: f[0])
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.keep_bytes:
+                break
+            if path in current:
+                continue
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def _write(self, summary: dict):
+        """附加一行摘要，並把累積的 Chrome trace 事件寫出"""
+        with self._lock:
+            events, self._events = self._events, []
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._rotate_if_full()
+            with open(self._path('turns', '.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+            self._write_events(events)
+        except OSError as e:
+            print(f"⚠️  無法寫入追蹤檔: {e}")
+
+    def _write_events(self, events: List[dict]):
+        """
+        以 JSON Array 格式附加事件
+
+        結尾的 ] 可以省略（Chrome / Perfetto 都接受），程式中途結束檔案仍然可以開啟
+        """
+        if not events:
+            return
+        if not self._chrome_started and self._part:
+            # 新的分段也要有執行緒名稱，單獨開啟時才看得懂
+            with self._lock:
+                threads = dict(self._threads)
+            events = [
+                {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+                for tid, name in threads.items()
+            ] + [event for event in events if event.get('ph') != 'M']
+        lines = ''.join(json.dumps(event, ensure_ascii=False) + ',\n' for event in events)
+        with open(self._path('trace', '.json'), 'a', encoding='utf-8') as f:
+            if not self._chrome_started:
+                f.write('[\n')
+                self._chrome_started = True
+            f.write(lines)
+
+    def flush(self):
+        """結束進行中的一輪，並寫出還沒寫的事件（程式結束時自動呼叫）"""
+        if not self.enabled:
+            return
+        if self._turn is not None:
+            self.end_turn()
+            return
+
+        with self._lock:
+            events, self._events = self._events, []
+        try:
+            if events:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._rotate_if_full()
+                self._write_events(events)
+        except OSError as e:
+            print(f"⚠️  無法寫入追蹤檔: {e}")
+
+
+# 全域追蹤器（語音、Agents 各模組共用）
+tracer = Tracer()
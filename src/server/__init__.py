@@ -0,0 +1,22 @@
+"""
+對話伺服器模組
+一台主機以 HTTP / WebSocket 服務多台機器人，共用模型連線與 Multi-Agent 協調器
+"""
+
+from .chat_server import (
+    ChatServer,
+    ChatService,
+    SessionManager,
+    AdmissionController,
+    Rejected,
+    create_server
+)
+
+__all__ = [
+    'ChatServer',
+    'ChatService',
+    'SessionManager',
+    'AdmissionController',
+    'Rejected',
+    'create_server'
+]
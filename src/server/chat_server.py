@@ -0,0 +1,739 @@
+"""
+多人對話伺服器
+一台主機服務家裡好幾台機器人：所有對話共用同一個模型連線與 Multi-Agent 協調器
+（只載入、暖機一次），每個 session 有自己的對話歷史與上下文（ChatBot.fork()）
+
+HTTP API（JSON）：
+    GET    /health                   健康檢查
+    GET    /metrics                  併發與延遲統計
+    POST   /sessions                 建立 session {"session_id": 可省略}
+    GET    /sessions/<id>            session 狀態
+    POST   /sessions/<id>/reset      清除對話歷史
+    DELETE /sessions/<id>            結束 session
+    POST   /chat                     {"session_id": ..., "message": ..., "stream": false}
+                                     stream 為 true（或 Accept: text/event-stream）時以 SSE 邊生成邊回傳；
+                                     省略 session_id 是一次性問答（回答完就結束，不佔 session 名額）
+    GET    /ws?session_id=...        WebSocket：送 {"message": ...}（或純文字），
+                                     收到 token / done / error 訊息；省略 session_id 時連線關閉就結束
+
+負載控制：
+- 准入控制：同時生成的回答最多 SERVER_MAX_ACTIVE 個（對齊 OLLAMA_NUM_PARALLEL，
+  超過只會讓每個人都變慢），其餘依先來後到排隊，排隊已滿或等太久回 503
+- 每個 session 的速率限制（token bucket），超過回 429
+- 同一個 session 同時只處理一個問題，上一題還沒答完回 409
+
+裝置自己指定 session_id 時會保存對話快照（SNAPSHOT_DIR/server），伺服器重新啟動後接續
+"""
+
+import os
+import re
+import json
+import time
+import secrets
+import threading
+from collections import deque
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlsplit, parse_qs
+
+from dotenv import load_dotenv
+
+from .websocket import WebSocket, accept_key
+
+try:
+    from ..runtime.snapshot import SessionSnapshot
+    from ..runtime.governor import governor
+except ImportError:
+    from runtime.snapshot import SessionSnapshot
+    from runtime.governor import governor
+
+load_dotenv()
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# 延遲統計保留最近幾筆；吞吐量以最近幾秒計算
+LATENCY_WINDOW = 500
+THROUGHPUT_WINDOW_SECONDS = 60
+
+# 請求內容上限
+MAX_BODY_BYTES = 64 * 1024
+
+
+class Rejected(Exception):
+    """請求被拒絕（對應 HTTP 狀態碼）"""
+
+    def __init__(self, status: int, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    def to_dict(self) -> dict:
+        data = {'error': str(self), 'status': self.status}
+        if self.retry_after is not None:
+            data['retry_after'] = round(self.retry_after, 1)
+        return data
+
+
+class TokenBucket:
+    """每個 session 的速率限制"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        """
+        Args:
+            rate_per_minute: 每分鐘補充幾次（0 表示不限制）
+            burst: 最多可以連續問幾題
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """
+        取用一次
+
+        Returns:
+            0 表示可以；否則為還要等幾秒
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """准入控制：限制同時生成的數量，其餘先來後到排隊"""
+
+    def __init__(self, max_active: int = None, max_queue: int = None, timeout: float = None):
+        """
+        Args:
+            max_active: 同時生成上限，預設讀取 SERVER_MAX_ACTIVE
+            max_queue: 排隊上限，預設讀取 SERVER_MAX_QUEUE
+            timeout: 排隊最多等幾秒，預設讀取 SERVER_QUEUE_TIMEOUT
+        """
+        self.max_active = max(1, max_active or int(os.getenv('SERVER_MAX_ACTIVE', '2')))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('SERVER_MAX_QUEUE', '8'))
+        self.timeout = timeout or float(os.getenv('SERVER_QUEUE_TIMEOUT', '30'))
+
+        self.active = 0
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def acquire(self) -> float:
+        """
+        取得生成名額（必要時排隊）
+
+        Returns:
+            排隊等了幾毫秒
+
+        Raises:
+            Rejected: 排隊已滿或等候逾時（503）
+        """
+        start = time.perf_counter()
+        with self._cond:
+            if self.active < self.max_active and not self._queue:
+                self.active += 1
+                return 0.0
+            if len(self._queue) >= self.max_queue:
+                raise Rejected(HTTPStatus.SERVICE_UNAVAILABLE, "伺服器忙碌中，請稍後再試",
+                               retry_after=self.timeout / 2)
+
+            ticket = object()
+            self._queue.append(ticket)
+            deadline = time.monotonic() + self.timeout
+            while not (self._queue[0] is ticket and self.active < self.max_active):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(ticket)
+                    self._cond.notify_all()
+                    raise Rejected(HTTPStatus.SERVICE_UNAVAILABLE, "排隊逾時，請稍後再試",
+                                   retry_after=self.timeout / 2)
+                self._cond.wait(remaining)
+
+            self._queue.popleft()
+            self.active += 1
+            self._cond.notify_all()
+        return (time.perf_counter() - start) * 1000
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+
+def _percentiles(values) -> dict:
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'max': round(ordered[-1], 1)}
+
+
+class ServerMetrics:
+    """併發、拒絕次數、延遲與吞吐量統計"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {
+            'requests': 0,
+            'completed': 0,
+            'cancelled': 0,
+            'rejected_busy': 0,        # 同一 session 上一題還沒答完
+            'rejected_rate': 0,        # 超過 session 速率限制
+            'rejected_overload': 0,    # 准入控制（排隊已滿 / 逾時）
+            'rejected_sessions': 0     # session 數已滿
+        }
+        self.peak_active = 0
+        self.peak_queued = 0
+        self.queue_ms = deque(maxlen=LATENCY_WINDOW)
+        self.first_token_ms = deque(maxlen=LATENCY_WINDOW)
+        self.total_ms = deque(maxlen=LATENCY_WINDOW)
+        self._finished = deque()     # (完成時間, 字數)，計算最近的吞吐量
+        self._lock = threading.Lock()
+
+    def count(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+
+    def rejected(self, error: Rejected):
+        key = {
+            HTTPStatus.CONFLICT: 'rejected_busy',
+            HTTPStatus.TOO_MANY_REQUESTS: 'rejected_rate'
+        }.get(error.status, 'rejected_overload')
+        self.count(key)
+
+    def observe_load(self, active: int, queued: int):
+        with self._lock:
+            self.peak_active = max(self.peak_active, active)
+            self.peak_queued = max(self.peak_queued, queued)
+
+    def finish(self, queue_ms: float, first_token_ms: Optional[float], total_ms: float,
+               chars: int, completed: bool):
+        with self._lock:
+            self.counters['completed' if completed else 'cancelled'] += 1
+            self.queue_ms.append(queue_ms)
+            if first_token_ms is not None:
+                self.first_token_ms.append(first_token_ms)
+            self.total_ms.append(total_ms)
+            self._finished.append((time.monotonic(), chars))
+
+    def snapshot(self, admission: AdmissionController, sessions: int) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            while self._finished and now - self._finished[0][0] > THROUGHPUT_WINDOW_SECONDS:
+                self._finished.popleft()
+            window = min(THROUGHPUT_WINDOW_SECONDS, max(1.0, time.time() - self.started))
+            recent_chars = sum(chars for _, chars in self._finished)
+            return {
+                'uptime_s': round(time.time() - self.started, 1),
+                'sessions': sessions,
+                'active': admission.active,
+                'queued': admission.queued,
+                'max_active': admission.max_active,
+                'max_queue': admission.max_queue,
+                'peak_active': self.peak_active,
+                'peak_queued': self.peak_queued,
+                **self.counters,
+                'queue_ms': _percentiles(self.queue_ms),
+                'first_token_ms': _percentiles(self.first_token_ms),
+                'total_ms': _percentiles(self.total_ms),
+                'throughput': {
+                    'window_s': round(window, 1),
+                    'replies_per_min': round(len(self._finished) * 60 / window, 2),
+                    'chars_per_s': round(recent_chars / window, 1)
+                }
+            }
+
+
+class ChatSession:
+    """一台裝置（一個小朋友）的對話"""
+
+    def __init__(self, session_id: str, bot, bucket: TokenBucket):
+        self.id = session_id
+        self.bot = bot
+        self.bucket = bucket
+        self.lock = threading.Lock()     # 同一個 session 同時只處理一個問題
+        self.created = time.time()
+        self.last_active = time.monotonic()
+        self.turns = 0
+
+    def close(self):
+        """結束 session（對話快照留著，裝置重新連線時接續）"""
+        if self.bot.snapshot is not None:
+            self.bot.snapshot.close()
+
+    def info(self) -> dict:
+        info = {
+            'session_id': self.id,
+            'turns': self.turns,
+            'busy': self.lock.locked(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.created)),
+            'idle_s': round(time.monotonic() - self.last_active, 1)
+        }
+        if self.bot.agent_context is not None:
+            info['last_agent'] = self.bot.agent_context.get('last_agent')
+        return info
+
+
+class SessionManager:
+    """管理所有 session（共用同一個 ChatBot 後端）"""
+
+    def __init__(self, bot, max_sessions: int = None, idle_minutes: float = None,
+                 rate_per_minute: float = None, burst: int = None, snapshots: bool = None):
+        """
+        Args:
+            bot: 共用後端的 ChatBot（每個 session 用 bot.fork()）
+            max_sessions: session 上限，預設讀取 SERVER_MAX_SESSIONS
+            idle_minutes: 閒置多久自動結束，預設讀取 SERVER_SESSION_IDLE_MINUTES
+            rate_per_minute: 每個 session 每分鐘幾題，預設讀取 SERVER_RATE_PER_MINUTE
+            burst: 每個 session 最多連續幾題，預設讀取 SERVER_RATE_BURST
+            snapshots: 是否為裝置指定的 session_id 保存對話快照（重新啟動後接續），
+                       預設讀取 SNAPSHOT
+        """
+        self.bot = bot
+        self.max_sessions = max_sessions or int(os.getenv('SERVER_MAX_SESSIONS', '16'))
+        self.idle_seconds = 60 * (idle_minutes or float(os.getenv('SERVER_SESSION_IDLE_MINUTES', '30')))
+        self.rate_per_minute = rate_per_minute if rate_per_minute is not None else \
+                               float(os.getenv('SERVER_RATE_PER_MINUTE', '12'))
+        self.burst = burst or int(os.getenv('SERVER_RATE_BURST', '3'))
+        self.snapshots = snapshots if snapshots is not None else \
+                         os.getenv('SNAPSHOT', 'true').lower() == 'true'
+
+        self._sessions: Dict[str, ChatSession] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> ChatSession:
+        """
+        Raises:
+            Rejected: 找不到 session（404）
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise Rejected(HTTPStatus.NOT_FOUND, f"找不到 session: {session_id}")
+        return session
+
+    def open(self, session_id: str = None) -> ChatSession:
+        """
+        取得 session，不存在時建立（裝置可以用自己的 ID 當 session_id）
+
+        Raises:
+            Rejected: session_id 格式錯誤（400）或 session 數已滿（503）
+        """
+        if session_id is not None and not SESSION_ID_PATTERN.match(session_id):
+            raise Rejected(HTTPStatus.BAD_REQUEST, "session_id 只能包含英數字、- 和 _（最多 64 字）")
+
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None:
+                return session
+
+            self._evict_idle()
+            if len(self._sessions) >= self.max_sessions:
+                raise Rejected(HTTPStatus.SERVICE_UNAVAILABLE, "同時對話的人數已滿",
+                               retry_after=60)
+
+            bot = self.bot.fork()
+            if session_id and self.snapshots:
+                bot.attach_snapshot(SessionSnapshot.for_session(session_id))
+
+            session_id = session_id or secrets.token_urlsafe(12)
+            session = ChatSession(session_id, bot, TokenBucket(self.rate_per_minute, self.burst))
+            self._sessions[session_id] = session
+            return session
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def _evict_idle(self):
+        """結束閒置太久的 session；需持有 _lock"""
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_active > self.idle_seconds and not session.lock.locked():
+                del self._sessions[session_id]
+                session.close()
+
+
+class Reply:
+    """
+    一次回答（已通過准入控制）
+
+    迭代取得文字片段；迭代結束或中途 close() 時釋放名額，
+    已經生成的部分仍會記入該 session 的對話歷史
+    """
+
+    def __init__(self, service: 'ChatService', session: ChatSession, message: str, queue_ms: float):
+        self.service = service
+        self.session = session
+        self.queue_ms = queue_ms
+        self.parts: List[str] = []
+        self.first_token_ms = None
+        self._start = time.perf_counter()
+        self._source = session.bot.chat_stream(message)
+        self._completed = False
+        self._closed = False
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            for chunk in self._source:
+                if self.first_token_ms is None:
+                    self.first_token_ms = (time.perf_counter() - self._start) * 1000
+                self.parts.append(chunk)
+                yield chunk
+            self._completed = True
+        finally:
+            self.close()
+
+    def read(self) -> str:
+        """一次取得完整回答"""
+        for _ in self:
+            pass
+        return self.text
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._source.close()
+        finally:
+            self.session.turns += 1
+            self.session.last_active = time.monotonic()
+            self.service.admission.release()
+            self.session.lock.release()
+            self.service.metrics.finish(
+                self.queue_ms, self.first_token_ms,
+                (time.perf_counter() - self._start) * 1000,
+                len(self.text), self._completed
+            )
+
+    def stats(self) -> dict:
+        return {
+            'queue_ms': round(self.queue_ms, 1),
+            'first_token_ms': round(self.first_token_ms, 1) if self.first_token_ms is not None else None,
+            'total_ms': round((time.perf_counter() - self._start) * 1000, 1)
+        }
+
+
+class ChatService:
+    """對話服務（HTTP 與 WebSocket 共用）"""
+
+    def __init__(self, bot, sessions: SessionManager = None,
+                 admission: AdmissionController = None, metrics: ServerMetrics = None):
+        self.bot = bot
+        self.sessions = sessions or SessionManager(bot)
+        self.admission = admission or AdmissionController()
+        self.metrics = metrics or ServerMetrics()
+
+    def open_session(self, session_id: str = None) -> ChatSession:
+        """取得或建立 session（見 SessionManager.open）"""
+        try:
+            return self.sessions.open(session_id)
+        except Rejected as error:
+            if error.status == HTTPStatus.SERVICE_UNAVAILABLE:
+                self.metrics.count('rejected_sessions')
+            raise
+
+    def ask(self, session: ChatSession, message: str) -> Reply:
+        """
+        送出問題，通過檢查後回傳 Reply（呼叫端負責迭代或 close()）
+
+        Raises:
+            Rejected: 問題為空（400）、上一題還沒答完（409）、
+                      超過速率限制（429）、伺服器忙碌（503）
+        """
+        message = (message or '').strip()
+        if not message:
+            raise Rejected(HTTPStatus.BAD_REQUEST, "message 不能是空的")
+
+        self.metrics.count('requests')
+        if not session.lock.acquire(blocking=False):
+            error = Rejected(HTTPStatus.CONFLICT, "上一個問題還在回答中")
+            self.metrics.rejected(error)
+            raise error
+
+        try:
+            wait = session.bucket.take()
+            if wait:
+                raise Rejected(HTTPStatus.TOO_MANY_REQUESTS, "問太快了，休息一下再問", retry_after=wait)
+            self.metrics.observe_load(self.admission.active, self.admission.queued + 1)
+            queue_ms = self.admission.acquire()
+        except Rejected as error:
+            session.lock.release()
+            self.metrics.rejected(error)
+            raise
+
+        self.metrics.observe_load(self.admission.active, self.admission.queued)
+        try:
+            return Reply(self, session, message, queue_ms)
+        except Exception:
+            self.admission.release()
+            session.lock.release()
+            raise
+
+    def reset(self, session: ChatSession):
+        """
+        清除 session 的對話歷史
+
+        Raises:
+            Rejected: 還在回答中（409）
+        """
+        if not session.lock.acquire(blocking=False):
+            raise Rejected(HTTPStatus.CONFLICT, "上一個問題還在回答中")
+        try:
+            session.bot.reset_conversation()
+            session.turns = 0
+        finally:
+            session.lock.release()
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            **self.metrics.snapshot(self.admission, len(self.sessions)),
+            'governor': governor.budgets()
+        }
+
+
+class ChatRequestHandler(BaseHTTPRequestHandler):
+    """HTTP / SSE / WebSocket 請求處理"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'KidRobotChat/1.0'
+
+    @property
+    def service(self) -> ChatService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if os.getenv('SERVER_ACCESS_LOG', 'false').lower() == 'true':
+            super().log_message(format, *args)
+
+    # === 路由 ===
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        try:
+            if method == 'GET' and parts == ['health']:
+                self._send_json({'status': 'ok'})
+            elif method == 'GET' and parts == ['metrics']:
+                self._send_json(self.service.metrics_snapshot())
+            elif method == 'GET' and parts == ['ws']:
+                self._websocket(query.get('session_id'))
+            elif method == 'POST' and parts == ['chat']:
+                self._chat(self._read_json())
+            elif method == 'POST' and parts == ['sessions']:
+                session = self.service.open_session(self._read_json().get('session_id'))
+                self._send_json(session.info(), HTTPStatus.CREATED)
+            elif len(parts) == 2 and parts[0] == 'sessions' and method == 'GET':
+                self._send_json(self.service.sessions.get(parts[1]).info())
+            elif len(parts) == 2 and parts[0] == 'sessions' and method == 'DELETE':
+                if not self.service.sessions.close(parts[1]):
+                    raise Rejected(HTTPStatus.NOT_FOUND, f"找不到 session: {parts[1]}")
+                self._send_json({'session_id': parts[1], 'closed': True})
+            elif len(parts) == 3 and parts[0] == 'sessions' and parts[2] == 'reset' and method == 'POST':
+                session = self.service.sessions.get(parts[1])
+                self.service.reset(session)
+                self._send_json(session.info())
+            else:
+                raise Rejected(HTTPStatus.NOT_FOUND, f"沒有這個路徑: {method} {url.path}")
+        except Rejected as error:
+            self._send_json(error.to_dict(), error.status, retry_after=error.retry_after)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    # === 對話 ===
+
+    def _chat(self, body: dict):
+        # 沒有 session_id 的一次性問答：回答完（或被拒絕）就結束，不然 session 名額很快就被佔滿
+        session_id = body.get('session_id')
+        session = self.service.open_session(session_id)
+        try:
+            self._chat_reply(session, body, keep=session_id is not None)
+        finally:
+            if session_id is None:
+                self.service.sessions.close(session.id)
+
+    def _chat_reply(self, session: ChatSession, body: dict, keep: bool):
+        stream = body.get('stream')
+        if stream is None:
+            stream = 'text/event-stream' in self.headers.get('Accept', '')
+        ids = {'session_id': session.id} if keep else {}
+
+        reply = self.service.ask(session, body.get('message'))
+        if not stream:
+            try:
+                text = reply.read()
+            finally:
+                reply.close()
+            self._send_json({**ids, 'reply': text, **reply.stats()})
+            return
+
+        # SSE：邊生成邊送出，送完關閉連線
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            if keep:
+                self._send_event(ids, event='session')
+            for chunk in reply:
+                self._send_event({'text': chunk})
+            self._send_event({'reply': reply.text, **reply.stats()}, event='done')
+        except (BrokenPipeError, ConnectionResetError):
+            pass    # 裝置斷線（例如小朋友說「跳過」），已生成的部分仍記入歷史
+        finally:
+            reply.close()
+
+    def _websocket(self, session_id: Optional[str]):
+        key = self.headers.get('Sec-WebSocket-Key')
+        if self.headers.get('Upgrade', '').lower() != 'websocket' or not key:
+            raise Rejected(HTTPStatus.BAD_REQUEST, "需要 WebSocket 連線")
+        session = self.service.open_session(session_id)
+
+        self.send_response(HTTPStatus.SWITCHING_PROTOCOLS)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept_key(key))
+        self.end_headers()
+        self.close_connection = True
+
+        ws = WebSocket(self.rfile, self.wfile)
+        send = lambda data: ws.send(json.dumps(data, ensure_ascii=False))
+        try:
+            send({'type': 'session', **session.info()})
+            while True:
+                text = ws.recv()
+                if text is None:
+                    break
+                try:
+                    request = json.loads(text)
+                except ValueError:
+                    request = {'message': text}
+                if not isinstance(request, dict):
+                    request = {'message': str(request)}
+
+                try:
+                    if request.get('type') == 'reset':
+                        self.service.reset(session)
+                        send({'type': 'reset', **session.info()})
+                        continue
+
+                    reply = self.service.ask(session, request.get('message'))
+                    try:
+                        for chunk in reply:
+                            send({'type': 'token', 'text': chunk})
+                        send({'type': 'done', 'reply': reply.text, **reply.stats()})
+                    finally:
+                        reply.close()
+                except Rejected as error:
+                    send({'type': 'error', **error.to_dict()})
+        except ValueError as e:
+            ws.close(1002, str(e)[:100])
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            ws.close()
+            if session_id is None:
+                self.service.sessions.close(session.id)
+
+    # === 輸出 ===
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise Rejected(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "請求內容過大")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError:
+            raise Rejected(HTTPStatus.BAD_REQUEST, "請求內容不是 JSON")
+        if not isinstance(body, dict):
+            raise Rejected(HTTPStatus.BAD_REQUEST, "請求內容必須是 JSON 物件")
+        return body
+
+    def _send_json(self, data: dict, status: int = HTTPStatus.OK, retry_after: float = None):
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        if retry_after is not None:
+            self.send_header('Retry-After', str(max(1, round(retry_after))))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_event(self, data: dict, event: str = None):
+        lines = f"event: {event}\n" if event else ''
+        lines += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        self.wfile.write(lines.encode('utf-8'))
+        self.wfile.flush()
+
+
+class ChatServer(ThreadingHTTPServer):
+    """多人對話伺服器（每條連線一個執行緒）"""
+
+    daemon_threads = True
+
+    def __init__(self, service: ChatService, host: str = None, port: int = None):
+        """
+        Args:
+            service: 對話服務
+            host: 監聽位址，預設讀取 SERVER_HOST（預設只接受本機連線）
+            port: 連接埠，預設讀取 SERVER_PORT
+        """
+        self.service = service
+        address = (host or os.getenv('SERVER_HOST', '127.0.0.1'),
+                   port if port is not None else int(os.getenv('SERVER_PORT', '8765')))
+        super().__init__(address, ChatRequestHandler)
+
+
+def create_server(bot=None, host: str = None, port: int = None) -> ChatServer:
+    """
+    建立對話伺服器
+
+    Args:
+        bot: 共用後端的 ChatBot，預設依 .env 建立一個
+        host: 監聽位址
+        port: 連接埠
+    """
+    if bot is None:
+        from ..voice.llm import ChatBot
+        bot = ChatBot()
+    return ChatServer(ChatService(bot), host, port)
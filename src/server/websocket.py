@@ -0,0 +1,156 @@
+"""
+最小 WebSocket 實作（RFC 6455）
+只處理對話伺服器需要的部分：握手、文字訊息（含分段）、ping/pong、關閉；
+不支援擴充（permessage-deflate）與子協定
+"""
+
+import base64
+import hashlib
+import struct
+from typing import Optional
+
+GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# 單一訊息上限（小朋友的問題不會太長）
+MAX_MESSAGE_BYTES = 64 * 1024
+
+
+def accept_key(key: str) -> str:
+    """由用戶端的 Sec-WebSocket-Key 算出 Sec-WebSocket-Accept"""
+    digest = hashlib.sha1((key.strip() + GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+class WebSocket:
+    """一條已完成握手的 WebSocket 連線（伺服器端）"""
+
+    def __init__(self, rfile, wfile, max_message: int = MAX_MESSAGE_BYTES):
+        """
+        Args:
+            rfile: 連線的讀取端（BaseHTTPRequestHandler.rfile）
+            wfile: 連線的寫入端（BaseHTTPRequestHandler.wfile）
+            max_message: 單一訊息上限（位元組）
+        """
+        self.rfile = rfile
+        self.wfile = wfile
+        self.max_message = max_message
+        self.closed = False
+
+    def recv(self) -> Optional[str]:
+        """
+        讀取下一則文字訊息（自動回應 ping）
+
+        Returns:
+            訊息文字；對方關閉連線時為 None
+
+        Raises:
+            ValueError: 違反協定（未遮罩、訊息過大、非 UTF-8 等）
+        """
+        message = bytearray()
+        opcode = None
+
+        while True:
+            frame = self._read_frame()
+            if frame is None:
+                self.closed = True
+                return None
+            fin, op, payload = frame
+
+            if op == OP_PING:
+                self._send_frame(OP_PONG, payload)
+                continue
+            if op == OP_PONG:
+                continue
+            if op == OP_CLOSE:
+                if not self.closed:
+                    self._send_frame(OP_CLOSE, payload[:2])
+                    self.closed = True
+                return None
+
+            if op == OP_CONTINUATION:
+                if opcode is None:
+                    raise ValueError("沒有開頭的分段訊息")
+            elif opcode is not None:
+                raise ValueError("分段訊息尚未結束")
+            else:
+                opcode = op
+
+            message.extend(payload)
+            if len(message) > self.max_message:
+                raise ValueError("訊息過大")
+            if fin:
+                break
+
+        if opcode != OP_TEXT:
+            raise ValueError("只接受文字訊息")
+        return message.decode('utf-8')
+
+    def send(self, text: str):
+        """送出一則文字訊息"""
+        self._send_frame(OP_TEXT, text.encode('utf-8'))
+
+    def close(self, code: int = 1000, reason: str = ''):
+        """送出關閉訊息"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._send_frame(OP_CLOSE, struct.pack('!H', code) + reason.encode('utf-8'))
+        except OSError:
+            pass
+
+    def _read_exact(self, size: int) -> Optional[bytes]:
+        data = self.rfile.read(size)
+        if len(data) < size:
+            return None
+        return data
+
+    def _read_frame(self):
+        """讀一個 frame，回傳 (fin, opcode, payload)；連線中斷時為 None"""
+        header = self._read_exact(2)
+        if header is None:
+            return None
+        fin = bool(header[0] & 0x80)
+        opcode = header[0] & 0x0F
+        masked = bool(header[1] & 0x80)
+        length = header[1] & 0x7F
+
+        if not masked:
+            raise ValueError("用戶端訊息必須遮罩")
+        if length == 126:
+            extended = self._read_exact(2)
+            if extended is None:
+                return None
+            length = struct.unpack('!H', extended)[0]
+        elif length == 127:
+            extended = self._read_exact(8)
+            if extended is None:
+                return None
+            length = struct.unpack('!Q', extended)[0]
+        if length > self.max_message:
+            raise ValueError("訊息過大")
+
+        mask = self._read_exact(4)
+        payload = self._read_exact(length) if length else b''
+        if mask is None or payload is None:
+            return None
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return fin, opcode, payload
+
+    def _send_frame(self, opcode: int, payload: bytes):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        self.wfile.write(header + payload)
+        self.wfile.flush()
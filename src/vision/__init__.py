@@ -1,4 +1,5 @@
 from .face_detector_lite import LightweightFaceDetector
 from .kid_tracker_lite import KidTrackerLite
+from .vision_process import VisionProcesses
 
-__all__ = ['LightweightFaceDetector', 'KidTrackerLite']
\ No newline at end of file
+__all__ = ['LightweightFaceDetector', 'KidTrackerLite', 'VisionProcesses']
\ No newline at end of file
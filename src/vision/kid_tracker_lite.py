@@ -1,9 +1,12 @@
 """
 輕量級整合追蹤器 (MediaPipe 0.10.32 Tasks API 版本)
 使用輕量級人臉偵測器 + MediaPipe Pose Landmarker
+幀率與姿勢模型依資源調度器（runtime.governor）的預算調整，對話進行中讓出 CPU
 """
 
 import os
+import time
+import threading
 import cv2
 import mediapipe as mp
 from mediapipe.tasks import python
@@ -11,6 +14,7 @@ from mediapipe.tasks.python import vision
 import numpy as np
 from dotenv import load_dotenv
 from .face_detector_lite import LightweightFaceDetector
+from ..runtime.governor import governor
 from pathlib import Path
 
 load_dotenv()
@@ -48,9 +52,20 @@ class KidTrackerLite:
             'name': None,
             'is_detected': False
         }
+        self.updated_at = None  # 上一次更新 target_info 的時間（time.monotonic）
         
         self.cap = None
         
+        # 姿勢模型暫停時沿用上一次的結果 (body_center, distance, landmarks)
+        self._last_body = (None, None, None)
+        
+        # 背景追蹤（與語音對話同時執行）
+        self._stop = threading.Event()
+        self._thread = None
+        
+        # 對話進行中減少 OpenCV 執行緒
+        governor.subscribe(self._on_budget)
+        
         print("✅ 使用輕量級追蹤器（MediaPipe 0.10.32 Tasks API）")
     
     def _download_pose_model(self):
@@ -73,6 +88,9 @@ class KidTrackerLite:
         if not self.cap.isOpened():
             raise Exception(f"❌ 無法開啟攝像頭 {self.camera_id}")
         
+        # 降低幀率時只拿最新的一幀，不要讀到緩衝區裡的舊畫面
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
         self.face_detector.cap = self.cap
         print(f"✅ 攝像頭 {self.camera_id} 已啟動")
     
@@ -137,8 +155,10 @@ class KidTrackerLite:
         # 1. 人臉辨識
         face_frame, face_detections = self.face_detector.detect_and_recognize(frame)
         
-        # 2. 身體偵測
-        body_center, distance, pose_landmarks = self.detect_body(frame)
+        # 2. 身體偵測（LLM / STT 進行中暫停姿勢模型，沿用上一次的結果）
+        if governor.budget('vision')['pose']:
+            self._last_body = self.detect_body(frame)
+        body_center, distance, pose_landmarks = self._last_body
         
         # 3. 找出目標
         target_face_pos = None
@@ -166,6 +186,7 @@ class KidTrackerLite:
             'name': target_name,
             'is_detected': final_position is not None
         }
+        self.updated_at = time.monotonic()
         
         # 6. 視覺化
         annotated_frame = face_frame.copy()
@@ -282,6 +303,10 @@ class KidTrackerLite:
             cv2.putText(frame, f"Position: ({pos[0]}, {pos[1]})", (20, y_offset),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
     
+    def set_target(self, name: str):
+        """設定追蹤目標（已註冊的人臉）"""
+        self.face_detector.set_target(name)
+    
     def set_tracking_mode(self, mode: str):
         """設定追蹤模式"""
         if mode in ["face", "body", "fusion"]:
@@ -316,15 +341,19 @@ class KidTrackerLite:
         print(f"📊 追蹤模式: {self.tracking_mode}\n")
         
         while True:
+            started = time.monotonic()
             ret, frame = self.cap.read()
             if not ret:
                 print("❌ 無法讀取影像")
                 break
             
-            tracked_frame, target_info = self.track_target(frame)
+            with governor.busy('vision'):
+                tracked_frame, target_info = self.track_target(frame)
             cv2.imshow('Kid Robot - Tracker (Tasks API)', tracked_frame)
             
-            key = cv2.waitKey(1) & 0xFF
+            # 依資源預算控制幀率
+            wait = governor.frame_interval() - (time.monotonic() - started)
+            key = cv2.waitKey(max(1, int(wait * 1000))) & 0xFF
             
             if key == ord('q'):
                 break
@@ -348,6 +377,46 @@ class KidTrackerLite:
         
         self.stop_camera()
     
+    def start_background(self):
+        """在背景執行緒追蹤（不顯示畫面），與語音對話同時執行時使用"""
+        if self.cap is None:
+            self.start_camera()
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._track_loop, name='vision', daemon=True)
+        self._thread.start()
+    
+    def stop_background(self):
+        """停止背景追蹤並關閉攝像頭"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+    
+    def _track_loop(self):
+        """背景追蹤迴圈：每幀依資源預算決定間隔"""
+        while not self._stop.is_set():
+            started = time.monotonic()
+            ret, frame = self.cap.read()
+            if not ret:
+                print("❌ 無法讀取影像")
+                break
+            
+            try:
+                with governor.busy('vision'):
+                    self.track_target(frame)
+            except Exception as e:
+                print(f"⚠️  追蹤錯誤: {e}")
+            
+            self._stop.wait(max(0.0, governor.frame_interval() - (time.monotonic() - started)))
+    
+    def _on_budget(self, level: str, budgets: dict):
+        """資源預算改變：調整 OpenCV 執行緒數"""
+        cv2.setNumThreads(budgets['subsystems']['vision']['cores'])
+    
     def _print_status(self):
         """印出狀態"""
         print("\n" + "="*60)
@@ -371,6 +440,18 @@ class KidTrackerLite:
     def get_tracking_info(self):
         """取得追蹤資訊"""
         return self.target_info
+    
+    @property
+    def age(self):
+        """
+        距離上一次更新追蹤結果幾秒
+        
+        背景追蹤沒有在跑（沒啟動、攝像頭讀取失敗而結束）或還沒有結果時為 None，
+        讓注意力閘門把凍結的 target_info 當成沒有視覺
+        """
+        if self._thread is None or not self._thread.is_alive() or self.updated_at is None:
+            return None
+        return time.monotonic() - self.updated_at
 
 
 if __name__ == "__main__":
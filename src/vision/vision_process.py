@@ -0,0 +1,197 @@
+"""
+多行程視覺追蹤
+攝像頭擷取與 MediaPipe 追蹤各自在獨立的子行程執行（runtime.supervisor 監督、各佔一個核心），
+語音對話所在的主行程只收到很小的追蹤結果，音訊回呼不再和影像後處理搶 GIL
+
+攝像頭行程 ──FrameRing（共享記憶體）──▶ 追蹤行程 ──('tracking', info)──▶ 主行程
+主行程的資源調度等級以 ('budget', level) 轉送給追蹤行程，對話進行中一樣會降低幀率、暫停姿勢模型
+"""
+
+import os
+import time
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from ..runtime.frames import FrameRing
+from ..runtime.governor import governor
+from ..runtime.supervisor import Supervisor
+
+load_dotenv()
+
+# 每秒至少回報一次（結果沒變也送，讓主行程知道追蹤還活著）
+REPORT_INTERVAL = 1.0
+
+
+def empty_tracking_info() -> dict:
+    """還沒有追蹤結果時的狀態（與 KidTrackerLite.target_info 相同的欄位）"""
+    return {
+        'face_position': None,
+        'body_position': None,
+        'final_position': None,
+        'distance': None,
+        'confidence': 0,
+        'name': None,
+        'is_detected': False
+    }
+
+
+def camera_worker(channel, ring_name: str, shape: tuple, slots: int, camera_id: int):
+    """子行程：從攝像頭讀取影像寫入共享記憶體"""
+    import cv2
+
+    cv2.setNumThreads(1)
+    ring = FrameRing.attach(ring_name, shape, slots)
+    cap = cv2.VideoCapture(camera_id)
+    try:
+        if not cap.isOpened():
+            raise RuntimeError(f"無法開啟攝像頭 {camera_id}")
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, shape[1])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, shape[0])
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        while True:
+            for _ in channel.messages():
+                pass
+            if channel.stopped:
+                break
+
+            ret, frame = cap.read()
+            if not ret:
+                raise RuntimeError("無法讀取影像")
+            if frame.shape != ring.shape:
+                frame = cv2.resize(frame, (shape[1], shape[0]))
+            ring.write(frame)
+    finally:
+        cap.release()
+        ring.close()
+
+
+def tracking_worker(channel, ring_name: str, shape: tuple, slots: int, camera_id: int):
+    """子行程：從共享記憶體取最新的一幀執行追蹤，結果送回主行程"""
+    import cv2
+    from .kid_tracker_lite import KidTrackerLite
+
+    # 這個行程只有自己的核心
+    if hasattr(os, 'sched_getaffinity'):
+        governor.cores = len(os.sched_getaffinity(0))
+    cv2.setNumThreads(governor.cores)
+
+    ring = FrameRing.attach(ring_name, shape, slots)
+    tracker = KidTrackerLite(camera_id=camera_id)    # 不開攝像頭，影像來自 FrameRing
+    frame = np.empty(ring.shape, dtype=np.uint8)
+    seq = 0
+    last_info = None
+    last_report = 0.0
+    wait = 0.0
+
+    try:
+        while True:
+            for topic, payload in channel.messages(wait):
+                if topic == 'budget':
+                    governor.follow(payload)
+                elif topic == 'target':
+                    tracker.set_target(payload)
+            if channel.stopped:
+                break
+
+            started = time.monotonic()
+            seq, image = ring.read(seq, out=frame)
+            if image is None:
+                wait = 0.005
+                continue
+
+            with governor.busy('vision'):
+                _, info = tracker.track_target(image)
+
+            if info != last_info or started - last_report >= REPORT_INTERVAL:
+                channel.send('tracking', info)
+                last_info = dict(info)
+                last_report = started
+
+            # 依資源預算控制幀率
+            wait = max(0.0, governor.frame_interval() - (time.monotonic() - started))
+    finally:
+        ring.close()
+
+
+class VisionProcesses:
+    """
+    在子行程執行的視覺追蹤
+
+    介面與 KidTrackerLite 的背景追蹤相同（start_background / stop_background / get_tracking_info），
+    語音對話可以直接替換
+    """
+
+    def __init__(self, camera_id: int = None, width: int = None, height: int = None,
+                 slots: int = None, supervisor: Supervisor = None):
+        """
+        Args:
+            camera_id: 攝像頭編號，預設讀取 CAMERA_ID
+            width: 影像寬度，預設讀取 CAMERA_WIDTH
+            height: 影像高度，預設讀取 CAMERA_HEIGHT
+            slots: FrameRing 槽數，預設讀取 FRAME_RING_SLOTS
+            supervisor: 共用的監督者（None 時自己建立並負責啟動、停止）
+        """
+        self.camera_id = camera_id if camera_id is not None else int(os.getenv('CAMERA_ID', '0'))
+        width = width or int(os.getenv('CAMERA_WIDTH', '640'))
+        height = height or int(os.getenv('CAMERA_HEIGHT', '480'))
+        self.shape = (height, width, 3)
+
+        self.ring = FrameRing.create(self.shape, slots)
+        self._owns_supervisor = supervisor is None
+        self.supervisor = supervisor or Supervisor()
+
+        args = (self.ring.name, self.shape, self.ring.slots, self.camera_id)
+        self.supervisor.add('camera', camera_worker, args=args)
+        self.supervisor.add('vision', tracking_worker, args=args, on_start=self._send_state)
+        self.supervisor.on('tracking', self._on_tracking)
+
+        self.target = None
+        self.target_info = empty_tracking_info()
+        self.updated_at: Optional[float] = None
+
+    def start_background(self):
+        """啟動攝像頭與追蹤子行程"""
+        governor.subscribe(self._on_budget)
+        if self._owns_supervisor:
+            self.supervisor.start()
+
+    def stop_background(self):
+        """停止子行程並釋放共享記憶體"""
+        governor.unsubscribe(self._on_budget)
+        if self._owns_supervisor:
+            self.supervisor.stop()
+        self.ring.close()
+        self.ring.unlink()
+
+    def set_target(self, name: str):
+        """設定追蹤目標（已註冊的人臉；追蹤行程重新啟動後會再設定一次）"""
+        self.target = name
+        self.supervisor.send('vision', 'target', name)
+
+    def get_tracking_info(self) -> dict:
+        """取得追蹤資訊"""
+        return self.target_info
+
+    @property
+    def age(self) -> Optional[float]:
+        """距離上一次收到追蹤結果幾秒（還沒收到為 None）"""
+        return time.monotonic() - self.updated_at if self.updated_at is not None else None
+
+    def status(self) -> dict:
+        return self.supervisor.status()
+
+    def _on_tracking(self, name: str, info: dict):
+        self.target_info = info
+        self.updated_at = time.monotonic()
+
+    def _on_budget(self, level: str, budgets: dict):
+        self.supervisor.send('vision', 'budget', level)
+
+    def _send_state(self, name: str):
+        """追蹤行程（重新）啟動後補送目前的等級與追蹤目標"""
+        self.supervisor.send(name, 'budget', governor.level)
+        if self.target:
+            self.supervisor.send(name, 'target', self.target)
@@ -1,10 +1,48 @@
 """
 語音互動模組
 包含 STT (語音轉文字)、LLM (對話引擎)、TTS (文字轉語音)
+以及本地音訊處理（麥克風串流、VAD、關鍵字偵測、回音消除、音訊輸出）
 """
 
 from .stt import SpeechToText
 from .llm import ChatBot
 from .tts import TextToSpeech
+from .tts_cache import TTSCache, load_phrase_list
+from .audio_frame import AudioFrame, AudioRingBuffer
+from .audio_stream import MicrophoneStream
+from .vad import EnergyVAD
+from .keyword_spotter import KeywordSpotter
+from .echo import EchoCanceller
+from .audio_sink import AudioSink, NullSink, PlaybackHandle, create_sink
+from .segmenter import SentenceSegmenter
+from .phrases import PHRASES, PhraseBank
+from .barge_in import BargeInDetector
+from .prefetch import FollowUpPrefetcher
+from .attention import AttentionGate, GatedListener
+from .session import VoiceSession
 
-__all__ = ['SpeechToText', 'ChatBot', 'TextToSpeech']
+__all__ = [
+    'SpeechToText',
+    'ChatBot',
+    'TextToSpeech',
+    'TTSCache',
+    'load_phrase_list',
+    'AudioFrame',
+    'AudioRingBuffer',
+    'MicrophoneStream',
+    'EnergyVAD',
+    'KeywordSpotter',
+    'EchoCanceller',
+    'AudioSink',
+    'NullSink',
+    'PlaybackHandle',
+    'create_sink',
+    'SentenceSegmenter',
+    'PHRASES',
+    'PhraseBank',
+    'BargeInDetector',
+    'FollowUpPrefetcher',
+    'AttentionGate',
+    'GatedListener',
+    'VoiceSession'
+]
@@ -0,0 +1,168 @@
+"""
+注意力閘門模組
+客廳裡的電視、兄弟姊妹聊天也會被麥克風收到；以前每一句都送去辨識、再送給 LLM 回答。
+現在依視覺追蹤結果判斷小朋友是不是在跟機器人說話，只有閘門打開時聽到的語句才會辨識
+
+- 閘門：看得到追蹤目標的臉（人臉偵測只抓得到大致面向鏡頭的臉）、距離在 ATTENTION_MAX_DISTANCE_CM 內；
+  轉頭一下不會馬上關，離開 ATTENTION_HOLD_SECONDS 秒後才關
+- 麥克風與能量 VAD 一直在跑（很便宜），只有語句與閘門打開的時間重疊才送去 STT；
+  閘門關著時說完的語句先留 ATTENTION_PREROLL_MS，這段時間內閘門打開就照樣辨識
+  （小朋友邊說邊轉過來、先開口再走到機器人前面，第一句不會被吃掉）
+- 視覺沒有結果（啟動中、追蹤行程重新啟動）時不擋，照常聆聽
+"""
+
+import os
+import time
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .audio_frame import AudioFrame, AudioRingBuffer
+from .vad import EnergyVAD
+
+load_dotenv()
+
+
+class AttentionGate:
+    """依追蹤結果判斷小朋友是否正在面對機器人"""
+
+    def __init__(self, tracker, max_distance: float = None, require_face: bool = None,
+                 hold_seconds: float = None, stale_seconds: float = None):
+        """
+        Args:
+            tracker: 有 get_tracking_info() 與 age 的追蹤器（KidTrackerLite / VisionProcesses）
+            max_distance: 最遠距離（公分），預設讀取 ATTENTION_MAX_DISTANCE_CM
+            require_face: 是否要看得到追蹤目標的臉，預設讀取 ATTENTION_REQUIRE_FACE；
+                          False 時只要有人在範圍內就打開（沒有設定追蹤目標時使用）
+            hold_seconds: 最後一次看到後保持打開幾秒，預設讀取 ATTENTION_HOLD_SECONDS
+            stale_seconds: 追蹤結果超過幾秒沒更新就視為沒有視覺，預設讀取 ATTENTION_STALE_SECONDS
+        """
+        self.tracker = tracker
+        self.max_distance = max_distance or float(os.getenv('ATTENTION_MAX_DISTANCE_CM', '150'))
+        self.require_face = require_face if require_face is not None else \
+                            os.getenv('ATTENTION_REQUIRE_FACE', 'true').lower() == 'true'
+        self.hold_seconds = hold_seconds if hold_seconds is not None else \
+                            float(os.getenv('ATTENTION_HOLD_SECONDS', '3'))
+        self.stale_seconds = stale_seconds or float(os.getenv('ATTENTION_STALE_SECONDS', '3'))
+
+        self._last_seen: Optional[float] = None
+
+    def is_open(self) -> bool:
+        """閘門目前是否打開（麥克風執行緒每個音框呼叫，只讀最新的追蹤結果）"""
+        now = time.monotonic()
+
+        # 追蹤器回報結果多舊；沒有在追蹤（None）或太舊時不擋麥克風
+        age = self.tracker.age
+        if age is None or age > self.stale_seconds:
+            return True
+
+        if self.attending(self.tracker.get_tracking_info()):
+            self._last_seen = now
+        return self._last_seen is not None and now - self._last_seen <= self.hold_seconds
+
+    def attending(self, info: dict) -> bool:
+        """這一份追蹤結果是否算「正在面對機器人」"""
+        if not info or not info.get('is_detected'):
+            return False
+        if self.require_face and info.get('face_position') is None:
+            return False
+        distance = info.get('distance')
+        if distance and distance > self.max_distance:
+            return False
+        return True
+
+
+class GatedListener:
+    """閘門打開時才把語句交出去辨識（可直接訂閱 MicrophoneStream）"""
+
+    def __init__(self, gate: AttentionGate, sample_rate: int = 16000, frame_ms: int = 20,
+                 preroll_ms: int = None, source: AudioRingBuffer = None,
+                 on_utterance: Callable[[AudioFrame], None] = None,
+                 on_speech_start: Callable[[], None] = None):
+        """
+        Args:
+            gate: 注意力閘門
+            sample_rate: 麥克風取樣率
+            frame_ms: 音框長度（毫秒）
+            preroll_ms: 閘門關著時說完的語句保留多久，預設讀取 ATTENTION_PREROLL_MS
+            source: 麥克風串流的環形緩衝區
+            on_utterance: 閘門打開期間的語句說完時的回呼（收到整段音訊）
+            on_speech_start: 閘門打開時偵測到開口的回呼（每句一次，在麥克風執行緒呼叫）
+        """
+        self.gate = gate
+        self.sample_rate = sample_rate
+        self.preroll = (preroll_ms or int(os.getenv('ATTENTION_PREROLL_MS', '1500'))) / 1000
+        self.on_utterance = on_utterance
+        self.on_speech_start = on_speech_start
+
+        # 問題可能很長：語句上限跟一般聆聽一樣（15 秒）
+        self.vad = EnergyVAD(
+            sample_rate=sample_rate,
+            frame_ms=frame_ms,
+            max_segment_ms=int(os.getenv('ATTENTION_MAX_SEGMENT_MS', '15000')),
+            source=source
+        )
+
+        self.stats = {
+            'passed': 0,       # 送去辨識的語句
+            'suppressed': 0,   # 閘門關著而略過（省下 STT / LLM）
+            'recovered': 0     # 說完後閘門才打開、從保留區補送
+        }
+        self.reset()
+
+    def reset(self):
+        """開始新的一次聆聽（保留噪音底線）"""
+        self.vad.reset()
+        self._attended = False
+        self._was_open = False
+        self._pending: Optional[Tuple[AudioFrame, float]] = None
+
+    def process_frame(self, frame) -> Optional[str]:
+        """
+        處理一個串流音框
+
+        Returns:
+            'utterance'（交出一句）、'suppressed'（略過一句）或 None
+        """
+        is_open = self.gate.is_open()
+        if is_open and not self._was_open and self._pending is not None:
+            # 閘門剛打開：剛剛說完的那一句還在保留時間內就補送
+            utterance, ended_at = self._pending
+            self._pending = None
+            if time.monotonic() - ended_at <= self.preroll:
+                self.stats['suppressed'] -= 1
+                self.stats['recovered'] += 1
+                self._deliver(utterance)
+        self._was_open = is_open
+
+        segment = self.vad.process(frame)
+        if is_open and (self.vad.in_speech or segment is not None) and not self._attended:
+            self._attended = True
+            if self.on_speech_start:
+                self.on_speech_start()
+        if segment is None:
+            if not self.vad.in_speech:
+                self._attended = False
+            return None
+
+        attended, self._attended = self._attended, False
+
+        # 環形緩衝區會被覆寫，交出去前先複製
+        if isinstance(segment, AudioFrame):
+            utterance = AudioFrame(segment.samples.copy(), segment.sample_rate, segment.start_index)
+        else:
+            utterance = AudioFrame(np.array(segment, dtype=np.int16), self.sample_rate)
+
+        if not attended:
+            self.stats['suppressed'] += 1
+            self._pending = (utterance, time.monotonic())
+            return 'suppressed'
+
+        self._deliver(utterance)
+        return 'utterance'
+
+    def _deliver(self, utterance: AudioFrame):
+        self.stats['passed'] += 1
+        if self.on_utterance:
+            self.on_utterance(utterance)
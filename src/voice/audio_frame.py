@@ -0,0 +1,212 @@
+"""
+音訊音框模組
+以 NumPy 視圖表示 PCM 音訊，讓擷取、VAD、回音消除與 STT 之間
+傳遞同一塊記憶體，而不是每一步都轉成 bytes / sr.AudioData 再複製
+
+AudioFrame       : 一段 int16 PCM（通常是某個緩衝區的視圖）
+AudioRingBuffer  : 預先配置的環形緩衝區，擷取線程直接寫入
+"""
+
+import io
+import wave
+import threading
+from typing import Optional, Union
+
+import numpy as np
+
+
+class AudioFrame:
+    """單聲道 int16 PCM 音訊（切片與轉換盡量不複製）"""
+
+    __slots__ = ('samples', 'sample_rate', 'start_index')
+
+    def __init__(self, samples: np.ndarray, sample_rate: int, start_index: int = 0):
+        """
+        Args:
+            samples: int16 一維陣列（可以是其他緩衝區的視圖）
+            sample_rate: 取樣率
+            start_index: 第一個取樣點在整條串流中的絕對位置
+        """
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.start_index = start_index
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    @property
+    def end_index(self) -> int:
+        return self.start_index + len(self.samples)
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview], sample_rate: int,
+                   start_index: int = 0) -> 'AudioFrame':
+        """由 16-bit PCM bytes 建立（共用同一塊記憶體）"""
+        return cls(np.frombuffer(data, dtype=np.int16), sample_rate, start_index)
+
+    @classmethod
+    def from_audio_data(cls, audio) -> 'AudioFrame':
+        """
+        由 sr.AudioData 建立
+
+        16-bit 音訊直接共用 frame_data，其他位元深度才需要轉換
+        """
+        if audio.sample_width == 2:
+            return cls.from_bytes(audio.frame_data, audio.sample_rate)
+        return cls.from_bytes(audio.get_raw_data(convert_width=2), audio.sample_rate)
+
+    @classmethod
+    def from_wav_bytes(cls, data: bytes) -> 'AudioFrame':
+        """解析 16-bit WAV（多聲道會混成單聲道）"""
+        with wave.open(io.BytesIO(data), 'rb') as wf:
+            sample_rate = wf.getframerate()
+            channels = wf.getnchannels()
+            if wf.getsampwidth() != 2:
+                raise ValueError("只支援 16-bit WAV")
+            samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return cls(samples, sample_rate)
+
+    def to_wav_bytes(self) -> bytes:
+        """編碼為 16-bit 單聲道 WAV"""
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(self.to_bytes())
+        return buffer.getvalue()
+
+    def to_audio_data(self):
+        """轉為 sr.AudioData（Google API 需要，這一步無法避免複製）"""
+        import speech_recognition as sr
+        return sr.AudioData(self.samples.tobytes(), self.sample_rate, 2)
+
+    def to_bytes(self) -> memoryview:
+        """以 memoryview 形式取得原始 PCM（不複製）"""
+        return memoryview(np.ascontiguousarray(self.samples)).cast('B')
+
+    def slice(self, start: float = 0.0, end: float = None) -> 'AudioFrame':
+        """依秒數切片（回傳視圖）"""
+        begin = int(start * self.sample_rate)
+        stop = len(self.samples) if end is None else int(end * self.sample_rate)
+        return AudioFrame(self.samples[begin:stop], self.sample_rate, self.start_index + begin)
+
+    def as_float32(self, out: np.ndarray = None) -> np.ndarray:
+        """
+        轉為 [-1, 1] 的 float32
+
+        Args:
+            out: 預先配置的輸出陣列（長度需 >= 取樣數），可重複使用避免配置
+        """
+        n = len(self.samples)
+        if out is None:
+            out = np.empty(n, dtype=np.float32)
+        target = out[:n]
+        np.multiply(self.samples, 1.0 / 32768.0, out=target, casting='unsafe')
+        return target
+
+    def resample(self, sample_rate: int, out: np.ndarray = None) -> 'AudioFrame':
+        """
+        重新取樣
+
+        取樣率相同時直接回傳自己；整數倍降頻以區塊平均（視圖 reshape + 寫入 out）；
+        其他情況用線性內插
+        """
+        if sample_rate == self.sample_rate:
+            return self
+
+        n = len(self.samples)
+        target_len = n * sample_rate // self.sample_rate
+        if out is None:
+            out = np.empty(target_len, dtype=np.int16)
+        target = out[:target_len]
+
+        ratio, remainder = divmod(self.sample_rate, sample_rate)
+        if remainder == 0 and ratio > 1:
+            # 例如 48k → 16k：每 3 點平均，reshape 只是視圖
+            blocks = self.samples[:target_len * ratio].reshape(target_len, ratio)
+            target[:] = blocks.mean(axis=1)
+        else:
+            positions = np.arange(target_len, dtype=np.float64) * (self.sample_rate / sample_rate)
+            target[:] = np.interp(positions, np.arange(n), self.samples)
+
+        return AudioFrame(target, sample_rate, self.start_index * sample_rate // self.sample_rate)
+
+
+def as_samples(frame) -> np.ndarray:
+    """取得 int16 陣列（同時接受 AudioFrame 與 np.ndarray）"""
+    return frame.samples if isinstance(frame, AudioFrame) else frame
+
+
+class AudioRingBuffer:
+    """
+    預先配置的環形 PCM 緩衝區
+
+    擷取線程把每個音框寫進固定的記憶體位置並取得該位置的視圖；
+    VAD 以絕對取樣位置記錄語句起訖，結束時再從這裡取回整段音訊
+    """
+
+    def __init__(self, sample_rate: int, seconds: float = 30.0):
+        self.sample_rate = sample_rate
+        self.capacity = int(sample_rate * seconds)
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+        self._lock = threading.Lock()
+        self.write_index = 0  # 已寫入的總取樣數（絕對位置）
+
+    def reserve(self, length: int) -> AudioFrame:
+        """
+        預留下一段連續空間並回傳其視圖（呼叫端直接寫入，不另外配置）
+
+        為了讓每個音框都是連續記憶體，尾端放不下時會跳回開頭，
+        被跳過的尾巴以靜音填滿
+        """
+        with self._lock:
+            offset = self.write_index % self.capacity
+            if offset + length > self.capacity:
+                skipped = self.capacity - offset
+                self._buffer[offset:] = 0
+                self.write_index += skipped
+                offset = 0
+
+            start = self.write_index
+            self.write_index += length
+            return AudioFrame(self._buffer[offset:offset + length], self.sample_rate, start)
+
+    def write(self, data: Union[bytes, np.ndarray]) -> AudioFrame:
+        """寫入一個音框，回傳緩衝區內的視圖"""
+        samples = np.frombuffer(data, dtype=np.int16) if isinstance(data, (bytes, bytearray)) else data
+        frame = self.reserve(len(samples))
+        frame.samples[:] = samples
+        return frame
+
+    def read(self, start_index: int, end_index: int, out: np.ndarray = None) -> Optional[AudioFrame]:
+        """
+        取回 [start_index, end_index) 的音訊
+
+        範圍在緩衝區內連續時回傳視圖；跨越環形尾端時才複製到 out
+        已被覆寫的範圍回傳 None
+
+        注意：視圖在緩衝區繞一圈後會被新音訊覆寫，要長期保留請自行 copy()
+        """
+        with self._lock:
+            if end_index > self.write_index or start_index < self.write_index - self.capacity:
+                return None
+
+            length = end_index - start_index
+            offset = start_index % self.capacity
+            if offset + length <= self.capacity:
+                return AudioFrame(self._buffer[offset:offset + length], self.sample_rate, start_index)
+
+            if out is None:
+                out = np.empty(length, dtype=np.int16)
+            first = self.capacity - offset
+            out[:first] = self._buffer[offset:]
+            out[first:length] = self._buffer[:length - first]
+            return AudioFrame(out[:length], self.sample_rate, start_index)
@@ -0,0 +1,431 @@
+"""
+音訊輸出模組
+一個長駐的播放輸出（取代每句話各開一次 afplay），附播放佇列、
+以取樣點為單位的停止（跳過／插話）與完成事件，不需要輪詢子行程
+
+PyAudioSink : PortAudio 輸出串流（與麥克風共用 PyAudio，macOS / Linux 都能用）
+PipeSink    : 長駐的 aplay / ffplay 行程，從 stdin 餵 raw PCM
+NullSink    : 不發出聲音，依實際時間（或立即）消化音訊，供測試與沒有喇叭的環境
+
+所有輸出都從同一個佇列取樣點（_pull）：目前播到哪一個取樣點是精確的，
+stop() 之後下一個區塊就是靜音
+"""
+
+import os
+import time
+import shutil
+import threading
+import subprocess
+from collections import deque
+from typing import Callable, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .audio_frame import AudioFrame
+
+load_dotenv()
+
+
+class PlaybackHandle:
+    """排入佇列的一段音訊"""
+
+    def __init__(self, frame: AudioFrame, tag=None):
+        self.frame = frame
+        self.tag = tag             # 呼叫端附帶的資料（播放事件中可取用）
+        self.position = 0          # 已送出的取樣數
+        self.cancelled = False
+        self.started = threading.Event()
+        self.done = threading.Event()
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待播放結束（或被停止），逾時回傳 False"""
+        return self.done.wait(timeout)
+
+    @property
+    def played_seconds(self) -> float:
+        return self.position / self.frame.sample_rate
+
+
+class AudioSink:
+    """音訊輸出的共用邏輯：佇列、事件、停止"""
+
+    name = 'base'
+
+    def __init__(self, sample_rate: int = None, block_ms: int = None):
+        """
+        Args:
+            sample_rate: 輸出取樣率，預設 24000（gTTS 的取樣率，免重新取樣）
+            block_ms: 每次送往裝置的區塊長度（毫秒），也是停止的最大延遲
+        """
+        self.sample_rate = sample_rate or int(os.getenv('AUDIO_OUTPUT_RATE', '24000'))
+        block_ms = block_ms or int(os.getenv('AUDIO_OUTPUT_BLOCK_MS', '20'))
+        self.block_size = self.sample_rate * block_ms // 1000
+
+        self._queue: deque = deque()
+        self._current: Optional[PlaybackHandle] = None
+        self._cond = threading.Condition()
+        self._listeners: List[Callable[[str, PlaybackHandle], None]] = []
+        self._running = False
+
+    # === 對外介面 ===
+
+    def subscribe(self, callback: Callable[[str, PlaybackHandle], None]):
+        """
+        訂閱播放事件 callback(event, handle)，event 為 'start' 或 'end'
+
+        會在輸出線程中被呼叫，請勿阻塞
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, PlaybackHandle], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def start(self):
+        """開啟輸出裝置（重複呼叫無副作用；play() 也會自動呼叫）"""
+        if self._running:
+            return
+        self._running = True
+        try:
+            self._open()
+        except Exception:
+            self._running = False
+            raise
+
+    def play(self, frame: AudioFrame, tag=None) -> PlaybackHandle:
+        """
+        排入一段音訊
+
+        Args:
+            frame: 單聲道 int16 AudioFrame（取樣率不同時會重新取樣）
+            tag: 附帶在 PlaybackHandle 上的資料，例如事先算好的回音消除參考訊號
+
+        Returns:
+            PlaybackHandle，可用 wait() 等待播放結束
+        """
+        self.start()
+        if frame.sample_rate != self.sample_rate:
+            frame = frame.resample(self.sample_rate)
+
+        handle = PlaybackHandle(frame, tag)
+        with self._cond:
+            self._queue.append(handle)
+            self._cond.notify_all()
+        return handle
+
+    def stop(self):
+        """停止目前播放並清空佇列（下一個區塊起就是靜音）"""
+        with self._cond:
+            stopped = ([self._current] if self._current else []) + list(self._queue)
+            self._current = None
+            self._queue.clear()
+            for handle in stopped:
+                handle.cancelled = True
+
+        for handle in stopped:
+            self._finish(handle)
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待佇列全部播完"""
+        with self._cond:
+            pending = ([self._current] if self._current else []) + list(self._queue)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for handle in pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not handle.wait(remaining):
+                return False
+        return True
+
+    @property
+    def is_playing(self) -> bool:
+        with self._cond:
+            return self._current is not None or bool(self._queue)
+
+    def close(self):
+        """停止播放並釋放裝置"""
+        self.stop()
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        self._close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # === 取樣點來源（各輸出共用）===
+
+    def _pull(self, n: int, out: np.ndarray = None) -> np.ndarray:
+        """從佇列取出 n 個取樣點，不足處補靜音"""
+        if out is None:
+            out = np.zeros(n, dtype=np.int16)
+        else:
+            out[:n] = 0
+
+        started, finished = [], []
+        filled = 0
+        with self._cond:
+            while filled < n:
+                if self._current is None:
+                    if not self._queue:
+                        break
+                    self._current = self._queue.popleft()
+                    started.append(self._current)
+
+                handle = self._current
+                take = min(len(handle.frame) - handle.position, n - filled)
+                out[filled:filled + take] = handle.frame.samples[handle.position:handle.position + take]
+                handle.position += take
+                filled += take
+
+                if handle.position >= len(handle.frame):
+                    finished.append(handle)
+                    self._current = None
+
+        for handle in started:
+            handle.started.set()
+            self._notify('start', handle)
+        for handle in finished:
+            self._finish(handle)
+
+        return out[:n]
+
+    def _finish(self, handle: PlaybackHandle):
+        if not handle.done.is_set():
+            self._notify('end', handle)
+            handle.done.set()
+
+    def _notify(self, event: str, handle: PlaybackHandle):
+        for callback in list(self._listeners):
+            try:
+                callback(event, handle)
+            except Exception as e:
+                print(f"⚠️  播放事件處理錯誤: {e}")
+
+    def _wait_for_audio(self) -> bool:
+        """（推送式輸出用）閒置時阻塞到有音訊排入，關閉時回傳 False"""
+        with self._cond:
+            while self._running and self._current is None and not self._queue:
+                self._cond.wait()
+            return self._running
+
+    # === 子類別實作 ===
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+
+class _PacedSink(AudioSink):
+    """
+    推送式輸出：背景線程依實際時間送出區塊
+
+    最多只比實際播放超前 lead_ms，停止時裝置裡殘留的聲音不會超過這個長度
+    """
+
+    realtime = True
+
+    def __init__(self, sample_rate: int = None, block_ms: int = None, lead_ms: int = None):
+        super().__init__(sample_rate, block_ms)
+        if lead_ms is None:
+            lead_ms = int(os.getenv('AUDIO_OUTPUT_LEAD_MS', '60'))
+        self.lead = lead_ms / 1000
+        self._thread = None
+        self._block = np.zeros(self.block_size, dtype=np.int16)
+
+    def _open(self):
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    def _pump(self):
+        block_seconds = self.block_size / self.sample_rate
+        while self._wait_for_audio():
+            # 從閒置恢復：重新對時，先送出 lead 長度的緩衝
+            clock = time.monotonic()
+            while self._running and self.is_playing:
+                self._write(self._pull(self.block_size, self._block))
+                clock += block_seconds
+                delay = clock - time.monotonic() - self.lead
+                if self.realtime and delay > 0:
+                    time.sleep(delay)
+
+    def _write(self, chunk: np.ndarray):
+        raise NotImplementedError
+
+    def _close(self):
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+
+class PyAudioSink(AudioSink):
+    """PortAudio 輸出串流（callback 模式，每個區塊直接從佇列取樣點）"""
+
+    name = 'pyaudio'
+
+    def __init__(self, sample_rate: int = None, block_ms: int = None, device_index: int = None):
+        """
+        Args:
+            sample_rate: 輸出取樣率
+            block_ms: callback 區塊長度（毫秒）
+            device_index: PyAudio 輸出裝置編號，None 為系統預設
+        """
+        super().__init__(sample_rate, block_ms)
+        self.device_index = device_index
+        self._pa = None
+        self._stream = None
+        self._block = np.zeros(self.block_size, dtype=np.int16)
+
+    def _open(self):
+        import pyaudio
+
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.sample_rate,
+            output=True,
+            frames_per_buffer=self.block_size,
+            output_device_index=self.device_index,
+            stream_callback=self._callback
+        )
+        self._stream.start_stream()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        import pyaudio
+
+        if frame_count != len(self._block):
+            self._block = np.zeros(frame_count, dtype=np.int16)
+        return self._pull(frame_count, self._block).tobytes(), pyaudio.paContinue
+
+    def _close(self):
+        if self._stream:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+
+        if self._pa:
+            self._pa.terminate()
+            self._pa = None
+
+
+class PipeSink(_PacedSink):
+    """長駐的命令列播放器（aplay / ffplay），從 stdin 餵 raw PCM"""
+
+    name = 'pipe'
+
+    def __init__(self, player: str = 'aplay', sample_rate: int = None,
+                 block_ms: int = None, lead_ms: int = None):
+        """
+        Args:
+            player: 'aplay'（ALSA，Linux 機器人）或 'ffplay'
+            sample_rate: 輸出取樣率
+            block_ms: 每次寫入的區塊長度（毫秒）
+            lead_ms: 最多比實際播放超前多少（毫秒）
+        """
+        super().__init__(sample_rate, block_ms, lead_ms)
+        self.player = player
+        self.name = player
+        self._process = None
+
+    def _command(self) -> List[str]:
+        rate = str(self.sample_rate)
+        if self.player == 'ffplay':
+            return ['ffplay', '-nodisp', '-loglevel', 'quiet',
+                    '-f', 's16le', '-ar', rate, '-ac', '1', '-i', '-']
+        return ['aplay', '-q', '-t', 'raw', '-f', 'S16_LE', '-c', '1', '-r', rate, '-']
+
+    def _spawn(self):
+        self._process = subprocess.Popen(
+            self._command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def _open(self):
+        self._spawn()
+        super()._open()
+
+    def _write(self, chunk: np.ndarray):
+        try:
+            self._process.stdin.write(chunk.tobytes())
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError, AttributeError):
+            # 播放器意外結束：重新啟動，這個區塊丟掉
+            print(f"⚠️  {self.player} 已結束，重新啟動")
+            self._spawn()
+
+    def _close(self):
+        super()._close()
+        if self._process:
+            try:
+                self._process.stdin.close()
+                self._process.terminate()
+                self._process.wait(timeout=1.0)
+            except Exception:
+                pass
+            self._process = None
+
+
+class NullSink(_PacedSink):
+    """不發出聲音的輸出（測試、模擬、沒有喇叭的環境）"""
+
+    name = 'null'
+
+    def __init__(self, sample_rate: int = None, block_ms: int = None, realtime: bool = True):
+        """
+        Args:
+            sample_rate: 輸出取樣率
+            block_ms: 區塊長度（毫秒）
+            realtime: True 依實際時間消化音訊；False 立即消化（模擬加速）
+        """
+        super().__init__(sample_rate, block_ms, lead_ms=0)
+        self.realtime = realtime
+        self.samples_played = 0
+
+    def _write(self, chunk: np.ndarray):
+        self.samples_played += len(chunk)
+
+
+def create_sink(kind: str = None, sample_rate: int = None) -> AudioSink:
+    """
+    建立音訊輸出
+
+    Args:
+        kind: 'auto' / 'pyaudio' / 'aplay' / 'ffplay' / 'null'，預設讀 AUDIO_SINK
+        sample_rate: 輸出取樣率
+
+    auto 依序嘗試 PyAudio → aplay → ffplay，都沒有時使用 NullSink
+    """
+    kind = (kind or os.getenv('AUDIO_SINK', 'auto')).lower()
+
+    if kind == 'pyaudio':
+        return PyAudioSink(sample_rate)
+    if kind in ('aplay', 'ffplay'):
+        return PipeSink(kind, sample_rate)
+    if kind == 'null':
+        return NullSink(sample_rate)
+
+    try:
+        import pyaudio  # noqa: F401
+        return PyAudioSink(sample_rate)
+    except ImportError:
+        pass
+
+    for player in ('aplay', 'ffplay'):
+        if shutil.which(player):
+            return PipeSink(player, sample_rate)
+
+    print("⚠️  找不到可用的音訊輸出，改用靜音輸出")
+    return NullSink(sample_rate)
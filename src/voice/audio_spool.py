@@ -0,0 +1,164 @@
+"""
+語音檔暫存區 (Spool) 模組
+管理 DATA_DIR/audio 底下每句話產生的語音檔：
+
+- 檔名唯一（時間 + 行程 + 流水號），同一秒、多個線程同時合成也不會互相覆蓋
+- 依日期分子目錄，避免單一目錄累積幾十萬個檔案
+- 背景清理線程依「保留天數」與「容量上限」刪除最舊的檔案
+
+只會清理自己產生的檔案（檔名以 prefix 開頭），其他放在同目錄的檔案不受影響
+"""
+
+import os
+import time
+import itertools
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple, Union
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class AudioSpool:
+    """有容量與保存期限的語音檔暫存區"""
+
+    def __init__(self, directory: Union[str, Path] = None, max_mb: float = None,
+                 max_age_hours: float = None, keep: bool = None, prefix: str = 'tts'):
+        """
+        初始化暫存區
+
+        Args:
+            directory: 暫存目錄，預設 {DATA_DIR}/audio
+            max_mb: 容量上限（MB），0 表示不限
+            max_age_hours: 保存時數，0 表示不限
+            keep: 是否保存每句話的語音檔；False 時只在呼叫端明確要求時才寫檔
+            prefix: 本暫存區產生的檔名前綴（清理時只看這個前綴）
+        """
+        self.directory = Path(directory or Path(os.getenv('DATA_DIR', './data')) / 'audio')
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.max_bytes = int((max_mb if max_mb is not None else
+                              float(os.getenv('AUDIO_SPOOL_MAX_MB', '500'))) * 1024 * 1024)
+        self.max_age = (max_age_hours if max_age_hours is not None else
+                        float(os.getenv('AUDIO_SPOOL_MAX_AGE_HOURS', '72'))) * 3600
+        self.keep = keep if keep is not None else \
+                    os.getenv('AUDIO_SPOOL_KEEP', 'true').lower() == 'true'
+        self.prefix = prefix
+
+        self._counter = itertools.count()
+        self._janitor = None
+        self._stop = threading.Event()
+
+    def new_path(self, suffix: str = '.wav', subdir: str = None) -> Path:
+        """
+        產生一個唯一的新檔案路徑（目錄會自動建立）
+
+        Args:
+            suffix: 副檔名
+            subdir: 放在暫存區下的子目錄（例如 'archive'）
+        """
+        now = datetime.now()
+        folder = self.directory / subdir if subdir else self.directory
+        folder = folder / now.strftime('%Y%m%d')
+        folder.mkdir(parents=True, exist_ok=True)
+
+        name = f"{self.prefix}_{now.strftime('%H%M%S_%f')}_{os.getpid()}_{next(self._counter)}{suffix}"
+        return folder / name
+
+    def _files(self) -> List[Tuple[float, int, Path]]:
+        """列出本暫存區產生的檔案 (修改時間, 大小, 路徑)"""
+        entries = []
+        for path in self.directory.rglob(f'{self.prefix}_*'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if path.is_file():
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def sweep(self) -> dict:
+        """
+        執行一次清理：先刪過期的檔案，再從最舊的開始刪到容量以內
+
+        Returns:
+            清理統計
+        """
+        entries = sorted(self._files())
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.max_age if self.max_age > 0 else None
+
+        removed = 0
+        freed = 0
+        for mtime, size, path in entries:
+            expired = cutoff is not None and mtime < cutoff
+            over_size = self.max_bytes > 0 and total > self.max_bytes
+            if not (expired or over_size):
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            freed += size
+
+        self._remove_empty_dirs()
+
+        return {
+            'files': len(entries) - removed,
+            'size_mb': total / 1024 / 1024,
+            'removed': removed,
+            'freed_mb': freed / 1024 / 1024
+        }
+
+    def _remove_empty_dirs(self):
+        """
+        刪除已經清空的日期子目錄
+
+        只處理 new_path() 建立的日期目錄（暫存區或其子目錄下的 YYYYMMDD），
+        而且不動今天的：new_path() 先建目錄、之後才寫檔（例如背景 MP3 封存），
+        刪掉會讓寫檔失敗；其他目錄即使是空的也不受影響
+        """
+        today = datetime.now().strftime('%Y%m%d')
+        pattern = '[0-9]' * 8
+        folders = list(self.directory.glob(pattern)) + list(self.directory.glob(f'*/{pattern}'))
+        for folder in folders:
+            if folder.name >= today or not folder.is_dir():
+                continue
+            try:
+                folder.rmdir()  # 只有空目錄才會成功
+            except OSError:
+                pass
+
+    def start_janitor(self, interval: float = None):
+        """啟動背景清理線程（重複呼叫無副作用）"""
+        if self._janitor and self._janitor.is_alive():
+            return
+
+        interval = interval or float(os.getenv('AUDIO_SPOOL_SWEEP_SECONDS', '600'))
+        self._stop.clear()
+
+        def run():
+            while True:
+                try:
+                    stats = self.sweep()
+                    if stats['removed']:
+                        print(f"🧹 清理語音檔 {stats['removed']} 個（釋放 {stats['freed_mb']:.1f} MB）")
+                except Exception as e:
+                    print(f"⚠️  語音檔清理失敗: {e}")
+                if self._stop.wait(interval):
+                    break
+
+        self._janitor = threading.Thread(target=run, daemon=True, name='audio-spool-janitor')
+        self._janitor.start()
+
+    def stop_janitor(self):
+        """停止背景清理線程"""
+        self._stop.set()
+        if self._janitor:
+            self._janitor.join(timeout=1.0)
+            self._janitor = None
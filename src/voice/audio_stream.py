@@ -0,0 +1,171 @@
+"""
+共享麥克風音訊串流模組
+開一次 PyAudio 輸入串流，將固定長度的 PCM 音框分發給多個訂閱者
+（關鍵字偵測、VAD 等），避免每個功能各自開麥克風、各自校正噪音
+
+分發前可串接處理階段（例如回音消除），所有訂閱者拿到的都是處理後的音框
+
+每個音框直接寫入預先配置的環形緩衝區，分發出去的 AudioFrame 是緩衝區的視圖，
+處理階段就地修改，下游（VAD、STT）取整段語句時也不必重新串接
+"""
+
+import os
+import threading
+from typing import Callable, List
+
+from dotenv import load_dotenv
+
+from .audio_frame import AudioFrame, AudioRingBuffer
+
+load_dotenv()
+
+
+class MicrophoneStream:
+    """共享麥克風串流（16-bit 單聲道 PCM）"""
+
+    def __init__(self, sample_rate: int = None, frame_ms: int = None, device_index: int = None,
+                 capture_rate: int = None, buffer_seconds: float = None):
+        """
+        初始化麥克風串流
+
+        Args:
+            sample_rate: 分發給下游的取樣率（Hz），預設 16000
+            frame_ms: 每個音框長度（毫秒），預設 20
+            device_index: PyAudio 輸入裝置編號，None 為系統預設
+            capture_rate: 硬體擷取取樣率，有些板子只支援 44.1k/48k，預設同 sample_rate
+            buffer_seconds: 環形緩衝區長度（秒）
+        """
+        self.sample_rate = sample_rate or int(os.getenv('AUDIO_SAMPLE_RATE', '16000'))
+        self.capture_rate = capture_rate or int(os.getenv('AUDIO_CAPTURE_RATE', str(self.sample_rate)))
+        self.frame_ms = frame_ms or int(os.getenv('AUDIO_FRAME_MS', '20'))
+        self.frame_size = self.sample_rate * self.frame_ms // 1000
+        self.capture_frame_size = self.capture_rate * self.frame_ms // 1000
+        self.device_index = device_index
+
+        buffer_seconds = buffer_seconds or float(os.getenv('AUDIO_BUFFER_SECONDS', '30'))
+        self.buffer = AudioRingBuffer(self.sample_rate, buffer_seconds)
+
+        self._subscribers: List[Callable[[AudioFrame], None]] = []
+        self._stages: List[Callable[[AudioFrame], AudioFrame]] = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self._pa = None
+        self._stream = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def subscribe(self, callback: Callable[[AudioFrame], None]):
+        """訂閱音框（callback 會在擷取線程中被呼叫，請勿阻塞）"""
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[AudioFrame], None]):
+        """取消訂閱"""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def add_stage(self, stage: Callable[[AudioFrame], AudioFrame]):
+        """加入處理階段（音框 → 音框，可就地修改），依加入順序執行"""
+        with self._lock:
+            if stage not in self._stages:
+                self._stages.append(stage)
+
+    def remove_stage(self, stage: Callable[[AudioFrame], AudioFrame]):
+        """移除處理階段"""
+        with self._lock:
+            if stage in self._stages:
+                self._stages.remove(stage)
+
+    def start(self):
+        """開啟麥克風並啟動擷取線程（重複呼叫無副作用）"""
+        if self._running:
+            return
+
+        import pyaudio
+
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.capture_rate,
+            input=True,
+            frames_per_buffer=self.capture_frame_size,
+            input_device_index=self.device_index
+        )
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """擷取線程：讀取音框並分發"""
+        while self._running:
+            try:
+                data = self._stream.read(self.capture_frame_size, exception_on_overflow=False)
+            except Exception as e:
+                print(f"❌ 麥克風讀取錯誤: {e}")
+                break
+
+            self._dispatch(self._store(data))
+
+        self._running = False
+
+    def _store(self, data: bytes) -> AudioFrame:
+        """把擷取到的 bytes 寫進環形緩衝區（需要時順便重新取樣）"""
+        if self.capture_rate == self.sample_rate:
+            return self.buffer.write(data)
+
+        raw = AudioFrame.from_bytes(data, self.capture_rate)
+        frame = self.buffer.reserve(self.frame_size)
+        raw.resample(self.sample_rate, out=frame.samples)
+        return frame
+
+    def _dispatch(self, frame: AudioFrame):
+        """將音框經過處理階段後交給所有訂閱者"""
+        with self._lock:
+            stages = list(self._stages)
+            subscribers = list(self._subscribers)
+
+        for stage in stages:
+            try:
+                frame = stage(frame)
+            except Exception as e:
+                print(f"⚠️  音訊處理階段錯誤: {e}")
+
+        for callback in subscribers:
+            try:
+                callback(frame)
+            except Exception as e:
+                print(f"⚠️  音框處理錯誤: {e}")
+
+    def stop(self):
+        """停止擷取並釋放麥克風"""
+        self._running = False
+
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+        if self._stream:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+
+        if self._pa:
+            self._pa.terminate()
+            self._pa = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
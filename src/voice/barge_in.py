@@ -0,0 +1,93 @@
+"""
+插話 (Barge-in) 偵測模組
+播放期間持續監聽麥克風（經過回音消除），偵測到小朋友持續說話就立刻通知，
+不必等整句辨識完成；之後繼續收音，語句結束時把整段（含起點前的音訊）交出，
+直接當作下一個問題
+
+- on_barge_in()：連續語音達 BARGE_IN_MS（預設 120 毫秒）時呼叫一次
+- on_utterance(frame)：插話的那一句說完時呼叫
+"""
+
+import os
+from typing import Callable, Optional, Union
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .audio_frame import AudioFrame, AudioRingBuffer
+from .vad import EnergyVAD
+
+load_dotenv()
+
+
+class BargeInDetector:
+    """播放期間的插話偵測（可直接訂閱 MicrophoneStream）"""
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 20,
+                 trigger_ms: int = None, source: AudioRingBuffer = None,
+                 on_barge_in: Callable[[], None] = None,
+                 on_utterance: Callable[[AudioFrame], None] = None):
+        """
+        初始化插話偵測
+
+        Args:
+            sample_rate: 麥克風取樣率
+            frame_ms: 音框長度（毫秒）
+            trigger_ms: 連續語音多久視為插話（太短容易被咳嗽、碰撞聲觸發）
+            source: 麥克風串流的環形緩衝區
+            on_barge_in: 偵測到插話時的回呼
+            on_utterance: 插話的語句結束時的回呼（收到整段音訊）
+        """
+        self.sample_rate = sample_rate
+        trigger_ms = trigger_ms or int(os.getenv('BARGE_IN_MS', '120'))
+        self.trigger_frames = max(1, trigger_ms // frame_ms)
+        self.on_barge_in = on_barge_in
+        self.on_utterance = on_utterance
+
+        # 問題可能很長：語句上限跟一般聆聽一樣
+        self.vad = EnergyVAD(
+            sample_rate=sample_rate,
+            frame_ms=frame_ms,
+            min_speech_ms=trigger_ms,
+            max_segment_ms=int(os.getenv('BARGE_IN_MAX_SEGMENT_MS', '15000')),
+            source=source
+        )
+        self.reset()
+
+    def reset(self):
+        """開始新的一段播放時清除狀態（保留噪音底線）"""
+        self.vad.reset()
+        self.triggered = False
+        self._run = 0
+
+    def process_frame(self, frame: Union[np.ndarray, AudioFrame]) -> Optional[str]:
+        """
+        處理一個串流音框
+
+        Returns:
+            'barge_in'（剛觸發）、'utterance'（插話語句結束）或 None
+        """
+        segment = self.vad.process(frame)
+
+        if not self.triggered:
+            self._run = self._run + 1 if self.vad.last_speech else 0
+            if self._run >= self.trigger_frames and self.vad.in_speech:
+                self.triggered = True
+                if self.on_barge_in:
+                    self.on_barge_in()
+                return 'barge_in'
+            return None
+
+        if segment is None:
+            return None
+
+        # 環形緩衝區會被覆寫，交出去前先複製
+        if isinstance(segment, AudioFrame):
+            utterance = AudioFrame(segment.samples.copy(), segment.sample_rate, segment.start_index)
+        else:
+            utterance = AudioFrame(np.array(segment, dtype=np.int16), self.sample_rate)
+
+        self.reset()
+        if self.on_utterance:
+            self.on_utterance(utterance)
+        return 'utterance'
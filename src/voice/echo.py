@@ -0,0 +1,243 @@
+"""
+回音消除 (Acoustic Echo Suppression) 模組
+機器人播放 TTS 時，麥克風會錄到自己的聲音；
+以已知的播放訊號為參考，用區塊 NLMS 自適應濾波器估計並扣除回音，
+再把扣除、壓抑之後「還剩下」的回音能量提供給 VAD 作為播放期間的門檻
+（VAD 看到的是消除後的音訊，門檻也要以殘餘回音為準，否則小朋友得比整個喇叭聲還大聲）
+"""
+
+import os
+import threading
+import time
+from typing import List, Optional, Union
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .audio_frame import AudioFrame, as_samples
+
+load_dotenv()
+
+
+class EchoCanceller:
+    """區塊 NLMS 回音消除器（可作為 MicrophoneStream 的處理階段）"""
+
+    def __init__(self, sample_rate: int = 16000, filter_ms: int = None,
+                 step_size: float = None, delay_ms: int = None):
+        """
+        初始化回音消除器
+
+        Args:
+            sample_rate: 麥克風取樣率
+            filter_ms: 濾波器長度（毫秒），需涵蓋喇叭到麥克風的延遲與殘響
+            step_size: NLMS 步長，需滿足 步長 × 音框長度 / 濾波器長度 < 2 才會穩定
+            delay_ms: 播放啟動延遲補償（毫秒）
+        """
+        self.sample_rate = sample_rate
+        filter_ms = filter_ms or int(os.getenv('AEC_FILTER_MS', '64'))
+        self.filter_len = sample_rate * filter_ms // 1000
+        self.step_size = step_size or float(os.getenv('AEC_STEP_SIZE', '0.3'))
+        self.delay = sample_rate * (delay_ms if delay_ms is not None else
+                                    int(os.getenv('AEC_DELAY_MS', '40'))) // 1000
+
+        # 殘餘回音壓抑的最低增益，避免完全消音把插話也吃掉
+        self.suppression_floor = float(os.getenv('AEC_SUPPRESSION_FLOOR', '0.1'))
+
+        # 麥克風峰值超過參考峰值的這個倍數，就視為小朋友也在說話
+        self.double_talk_ratio = float(os.getenv('AEC_DOUBLE_TALK_RATIO', '1.0'))
+
+        # 濾波器係數以「時間反轉」存放，讓滑動視窗可以直接做矩陣乘法
+        self.weights = np.zeros(self.filter_len, dtype=np.float32)
+
+        self._lock = threading.Lock()
+        self._reference: Optional[np.ndarray] = None
+        self._start_time = 0.0
+
+        # 參考歷史的工作區，依音框長度配置一次後重複使用
+        self._history = np.zeros(0, dtype=np.float32)
+
+        self._gated_vads: List = []
+        self.echo_rms = 0.0
+        self.double_talk = False
+
+        # 殘餘回音能量：只有機器人在說話時，以輸出（消除後）的能量追蹤；
+        # 上升慢、下降快，小朋友剛開口的幾個音框不會馬上把門檻拉高
+        self.residual_echo_rms = 0.0
+        self.residual_rise = float(os.getenv('AEC_RESIDUAL_RISE', '0.005'))
+        self.residual_fall = float(os.getenv('AEC_RESIDUAL_FALL', '0.5'))
+
+        # 回音衰減量 (ERLE) 統計
+        self._mic_energy = 0.0
+        self._residual_energy = 0.0
+
+    @property
+    def playback_active(self) -> bool:
+        with self._lock:
+            if self._reference is None:
+                return False
+            position = self._position()
+            return position < len(self._reference) + self.filter_len
+
+    def gate(self, vad):
+        """登記一個 VAD，播放期間會依回音能量調高它的門檻"""
+        if vad not in self._gated_vads:
+            self._gated_vads.append(vad)
+
+    def prepare(self, reference: np.ndarray, sample_rate: int = None) -> np.ndarray:
+        """
+        把即將播放的 PCM 轉成參考訊號（轉型、重新取樣、補零）
+
+        整句重新取樣要好幾毫秒，請在排入播放前呼叫，不要在音訊回呼裡做
+
+        Args:
+            reference: 即將播放的 PCM（int16 或 float）
+            sample_rate: 參考訊號取樣率，與麥克風不同時會重新取樣
+
+        Returns:
+            交給 start_playback() 的參考訊號
+        """
+        ref = reference.astype(np.float32)
+        if sample_rate and sample_rate != self.sample_rate:
+            ref = self._resample(ref, sample_rate, self.sample_rate)
+
+        # 前面補零：讓第一個音框也有完整的濾波器歷史
+        return np.concatenate((np.zeros(self.filter_len + self.delay, dtype=np.float32), ref))
+
+    def start_playback(self, reference: np.ndarray, sample_rate: int = None, prepared: bool = False):
+        """
+        播放開始時提供參考訊號
+
+        Args:
+            reference: 即將播放的 PCM（int16 或 float），或 prepare() 的結果
+            sample_rate: 參考訊號取樣率，與麥克風不同時會重新取樣
+            prepared: reference 已經是 prepare() 的結果（只換指標，可在音訊回呼中呼叫）
+        """
+        if not prepared:
+            reference = self.prepare(reference, sample_rate)
+
+        with self._lock:
+            self._reference = reference
+            self._start_time = time.monotonic()
+
+    def stop_playback(self, reference: np.ndarray = None):
+        """
+        播放結束（或被跳過）
+
+        Args:
+            reference: 結束的是哪一段的參考訊號；連續播放時下一段已經開始，就不停止
+        """
+        with self._lock:
+            if reference is not None and self._reference is not None and self._reference is not reference:
+                return
+            self._reference = None
+        self.echo_rms = 0.0
+        self.residual_echo_rms = 0.0
+        self.double_talk = False
+        for vad in self._gated_vads:
+            vad.set_echo_level(0.0)
+
+    def _position(self) -> int:
+        """依時鐘推算目前播放到的參考訊號位置（含前置補零）"""
+        elapsed = time.monotonic() - self._start_time
+        return self.filter_len + int(elapsed * self.sample_rate)
+
+    @staticmethod
+    def _resample(signal: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+        """線性內插重新取樣"""
+        duration = len(signal) / src_rate
+        target_len = int(round(duration * dst_rate))
+        src_times = np.arange(len(signal)) / src_rate
+        dst_times = np.arange(target_len) / dst_rate
+        return np.interp(dst_times, src_times, signal).astype(np.float32)
+
+    def process(self, frame: Union[np.ndarray, AudioFrame]) -> Union[np.ndarray, AudioFrame]:
+        """
+        對一個麥克風音框做回音消除
+
+        Args:
+            frame: int16 PCM 音框；AudioFrame 會就地寫回結果
+
+        Returns:
+            扣除回音後的音框（型別同輸入）；沒有播放時原樣回傳
+        """
+        samples = as_samples(frame)
+
+        with self._lock:
+            reference = self._reference
+            end = self._position() if reference is not None else 0
+
+        n = len(samples)
+        if reference is None or end - n >= len(reference) + self.filter_len:
+            return frame
+
+        start = end - n - self.filter_len + 1
+
+        # 取出 (filter_len + n - 1) 長度的參考歷史，不足處補零
+        if len(self._history) != self.filter_len + n - 1:
+            self._history = np.zeros(self.filter_len + n - 1, dtype=np.float32)
+        history = self._history
+        history[:] = 0.0
+        src_start, src_end = max(start, 0), min(end, len(reference))
+        if src_end > src_start:
+            history[src_start - start:src_end - start] = reference[src_start:src_end]
+
+        # 每一列是一個取樣點對應的參考視窗（視圖，不複製）
+        windows = np.lib.stride_tricks.sliding_window_view(history, self.filter_len)
+
+        mic = samples.astype(np.float32)
+        echo_estimate = windows @ self.weights
+        error = mic - echo_estimate
+
+        # Geigel 雙方講話偵測：近端音量明顯大於參考時暫停自適應，避免濾波器發散
+        ref_peak = float(np.max(np.abs(history))) if len(history) else 0.0
+        self.double_talk = float(np.max(np.abs(mic))) > self.double_talk_ratio * ref_peak + 1.0 and ref_peak > 0
+
+        if not self.double_talk and ref_peak > 0:
+            # 區塊梯度直接累加（不除以 n），每個音框約等於 n 次 NLMS 更新
+            power = float(np.dot(history, history)) / len(history) * self.filter_len
+            self.weights += (self.step_size / (power + 1e-3)) * (windows.T @ error)
+
+        # 殘餘回音壓抑：依估計回音與殘差的能量比縮小增益
+        self.echo_rms = float(np.sqrt(np.mean(echo_estimate * echo_estimate)))
+        residual_rms = float(np.sqrt(np.mean(error * error)))
+        if not self.double_talk and residual_rms > 0:
+            gain = max(self.suppression_floor, 1.0 - (self.echo_rms / (residual_rms + self.echo_rms)))
+            error *= gain
+
+        self._mic_energy += float(np.dot(mic, mic))
+        self._residual_energy += float(np.dot(error, error))
+
+        # 雙方講話時輸出裡有小朋友的聲音，沿用之前的殘餘回音估計；
+        # 還沒有估計時，以估計回音扣掉目前的回音衰減量代替
+        if not self.double_talk:
+            output_rms = float(np.sqrt(np.mean(error * error)))
+            if self.residual_echo_rms == 0.0:
+                self.residual_echo_rms = output_rms
+            else:
+                alpha = self.residual_rise if output_rms > self.residual_echo_rms else self.residual_fall
+                self.residual_echo_rms += alpha * (output_rms - self.residual_echo_rms)
+        elif self.residual_echo_rms == 0.0:
+            self.residual_echo_rms = self.echo_rms * 10 ** (-self.erle_db / 20)
+
+        # 播放期間至少給 1（VAD 以 0 判斷沒有在播放）
+        for vad in self._gated_vads:
+            vad.set_echo_level(max(self.residual_echo_rms, 1.0))
+
+        np.clip(error, -32768, 32767, out=error)
+        if isinstance(frame, AudioFrame):
+            frame.samples[:] = error
+            return frame
+        return error.astype(np.int16)
+
+    @property
+    def erle_db(self) -> float:
+        """累積回音衰減量（dB），越大代表消得越乾淨"""
+        if self._residual_energy <= 0:
+            return 0.0
+        return 10.0 * np.log10(self._mic_energy / self._residual_energy + 1e-12)
+
+    def reset(self):
+        """清除濾波器（例如換了喇叭或音量大幅改變時）"""
+        self.weights[:] = 0.0
+        self._mic_energy = 0.0
+        self._residual_energy = 0.0
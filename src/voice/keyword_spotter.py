@@ -0,0 +1,343 @@
+"""
+本地關鍵字偵測 (Keyword Spotting) 模組
+以 MFCC 特徵 + DTW 樣板比對辨識固定指令（跳過、下一個、skip、next），
+完全在本機執行，不需要呼叫 Google STT
+
+樣板存放方式：
+    {KWS_TEMPLATE_DIR}/{關鍵字}/*.wav   （16kHz 單聲道 16-bit）
+可執行 `python -m src.voice.keyword_spotter 跳過` 錄製樣板
+"""
+
+import os
+import wave
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .audio_frame import AudioFrame, AudioRingBuffer, as_samples
+from .vad import EnergyVAD
+
+load_dotenv()
+
+
+# 關鍵字 → 指令
+COMMANDS = {
+    '跳過': 'skip',
+    '下一個': 'skip',
+    'skip': 'skip',
+    'next': 'skip',
+    '重置': 'reset',
+}
+
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+
+def mel_filterbank(sample_rate: int, n_fft: int, num_filters: int) -> np.ndarray:
+    """建立三角形 Mel 濾波器組，形狀 (num_filters, n_fft // 2 + 1)"""
+    mel_points = np.linspace(_hz_to_mel(0), _hz_to_mel(sample_rate / 2), num_filters + 2)
+    bins = np.floor((n_fft + 1) * _mel_to_hz(mel_points) / sample_rate).astype(int)
+
+    fbank = np.zeros((num_filters, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, num_filters + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            fbank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            fbank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return fbank
+
+
+def dct_matrix(num_filters: int, num_ceps: int) -> np.ndarray:
+    """正交 DCT-II 矩陣，形狀 (num_filters, num_ceps)"""
+    n = np.arange(num_filters)
+    k = np.arange(num_ceps)
+    basis = np.cos(np.pi / num_filters * (n[:, None] + 0.5) * k[None, :])
+    basis *= np.sqrt(2.0 / num_filters)
+    basis[:, 0] *= np.sqrt(0.5)
+    return basis.astype(np.float32)
+
+
+class MFCCExtractor:
+    """MFCC 特徵擷取器（濾波器組與 DCT 矩陣只建立一次）"""
+
+    def __init__(self, sample_rate: int = 16000, num_ceps: int = 13, num_filters: int = 26,
+                 n_fft: int = 512, frame_len: float = 0.025, frame_step: float = 0.01):
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.frame_len = int(round(frame_len * sample_rate))
+        self.frame_step = int(round(frame_step * sample_rate))
+        self.window = np.hamming(self.frame_len).astype(np.float32)
+        self.fbank = mel_filterbank(sample_rate, n_fft, num_filters)
+        self.dct = dct_matrix(num_filters, num_ceps)
+
+    def __call__(self, signal: np.ndarray) -> np.ndarray:
+        """
+        計算 MFCC
+
+        Args:
+            signal: int16 或 float PCM
+
+        Returns:
+            形狀 (音框數, num_ceps) 的特徵，已做倒頻譜平均正規化 (CMN)
+        """
+        x = signal.astype(np.float32)
+        if len(x) < self.frame_len:
+            x = np.pad(x, (0, self.frame_len - len(x)))
+
+        # 預強調
+        x = np.append(x[0], x[1:] - 0.97 * x[:-1])
+
+        # 以 stride 建立音框視圖，不複製資料
+        num_frames = 1 + (len(x) - self.frame_len) // self.frame_step
+        frames = np.lib.stride_tricks.as_strided(
+            x,
+            shape=(num_frames, self.frame_len),
+            strides=(x.strides[0] * self.frame_step, x.strides[0])
+        ) * self.window
+
+        power = np.abs(np.fft.rfft(frames, n=self.n_fft)) ** 2 / self.n_fft
+        energies = np.maximum(power @ self.fbank.T, 1e-10)
+        ceps = np.log(energies) @ self.dct
+
+        return ceps - ceps.mean(axis=0)
+
+
+def dtw_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    以餘弦距離計算兩段特徵序列的 DTW 距離（依路徑長度正規化）
+
+    每一列的遞迴以累積和 + 累積最小值向量化，只有外層迴圈是 Python
+    """
+    a_norm = a / (np.linalg.norm(a, axis=1, keepdims=True) + 1e-8)
+    b_norm = b / (np.linalg.norm(b, axis=1, keepdims=True) + 1e-8)
+    cost = 1.0 - a_norm @ b_norm.T
+
+    n, m = cost.shape
+    prev = np.full(m + 1, np.inf)
+    prev[0] = 0.0
+
+    for i in range(n):
+        row_cost = cost[i]
+        # 來自上方或左上方的最小值
+        diag_up = np.minimum(prev[:-1], prev[1:])
+        # D[j] = c[j] + min(diag_up[j], D[j-1]) 展開後為累積和 + 累積最小值
+        csum = np.cumsum(row_cost)
+        shifted = np.concatenate(([0.0], csum[:-1]))
+        current = csum + np.minimum.accumulate(diag_up - shifted)
+        prev = np.concatenate(([np.inf], current))
+
+    return float(prev[-1] / (n + m))
+
+
+def _read_wav(path: Path) -> Tuple[np.ndarray, int]:
+    """讀取 16-bit 單聲道 WAV"""
+    with wave.open(str(path), 'rb') as wf:
+        sample_rate = wf.getframerate()
+        data = wf.readframes(wf.getnframes())
+        channels = wf.getnchannels()
+
+    samples = np.frombuffer(data, dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+
+def _write_wav(path: Path, samples: np.ndarray, sample_rate: int):
+    """寫入 16-bit 單聲道 WAV"""
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.astype(np.int16).tobytes())
+
+
+class KeywordSpotter:
+    """本地關鍵字偵測器（VAD 切段 → MFCC → DTW 樣板比對）"""
+
+    def __init__(self, template_dir: str = None, threshold: float = None,
+                 sample_rate: int = 16000, frame_ms: int = 20,
+                 on_command: Callable[[str, str], None] = None,
+                 source: AudioRingBuffer = None):
+        """
+        初始化關鍵字偵測器
+
+        Args:
+            template_dir: 樣板目錄，預設 {DATA_DIR}/keywords
+            threshold: DTW 距離門檻，越小越嚴格
+            sample_rate: 音訊取樣率
+            frame_ms: 輸入音框長度（毫秒）
+            on_command: 偵測到指令時的回呼 (command, keyword)
+            source: 麥克風串流的環形緩衝區，切段時直接取視圖
+        """
+        self.template_dir = Path(template_dir or os.getenv(
+            'KWS_TEMPLATE_DIR',
+            str(Path(os.getenv('DATA_DIR', './data')) / 'keywords')
+        ))
+        self.threshold = threshold or float(os.getenv('KWS_THRESHOLD', '0.25'))
+        self.sample_rate = sample_rate
+        self.on_command = on_command
+
+        # 關鍵字都很短，語句結束判定可以比一般對話快很多
+        self.vad = EnergyVAD(
+            sample_rate=sample_rate,
+            frame_ms=frame_ms,
+            hangover_ms=int(os.getenv('KWS_HANGOVER_MS', '150')),
+            max_segment_ms=1500,
+            source=source
+        )
+        self.min_samples = int(0.2 * sample_rate)
+        self.max_samples = int(1.5 * sample_rate)
+
+        self.extractor = MFCCExtractor(sample_rate=sample_rate)
+        self.templates: Dict[str, List[np.ndarray]] = {}
+        self.load_templates()
+
+    @property
+    def has_templates(self) -> bool:
+        return any(self.templates.values())
+
+    def load_templates(self):
+        """從樣板目錄載入所有關鍵字樣板"""
+        self.templates = {}
+        if not self.template_dir.exists():
+            return
+
+        for keyword_dir in sorted(self.template_dir.iterdir()):
+            if not keyword_dir.is_dir() or keyword_dir.name not in COMMANDS:
+                continue
+            for wav_path in sorted(keyword_dir.glob('*.wav')):
+                try:
+                    samples, sample_rate = _read_wav(wav_path)
+                except Exception as e:
+                    print(f"⚠️  無法讀取樣板 {wav_path}: {e}")
+                    continue
+                if sample_rate != self.sample_rate:
+                    print(f"⚠️  樣板取樣率不符，略過: {wav_path}")
+                    continue
+                self.add_template(keyword_dir.name, samples)
+
+    def add_template(self, keyword: str, samples: np.ndarray):
+        """加入一個樣板（記憶體中）"""
+        if keyword not in COMMANDS:
+            raise ValueError(f"不支援的關鍵字: {keyword}")
+        self.templates.setdefault(keyword, []).append(self.extractor(self._trim(samples)))
+
+    def enroll(self, keyword: str, samples: np.ndarray) -> Path:
+        """加入樣板並存檔到樣板目錄"""
+        self.add_template(keyword, samples)
+
+        keyword_dir = self.template_dir / keyword
+        keyword_dir.mkdir(parents=True, exist_ok=True)
+        path = keyword_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.wav"
+        _write_wav(path, samples, self.sample_rate)
+        return path
+
+    def _trim(self, samples: np.ndarray) -> np.ndarray:
+        """去除頭尾靜音（以 10ms 區塊能量判斷）"""
+        block = self.sample_rate // 100
+        usable = len(samples) // block * block
+        if usable == 0:
+            return samples
+
+        blocks = samples[:usable].astype(np.float32).reshape(-1, block)
+        rms = np.sqrt(np.mean(blocks * blocks, axis=1))
+        voiced = np.nonzero(rms > max(rms.max() * 0.1, 1.0))[0]
+        if len(voiced) == 0:
+            return samples
+        return samples[voiced[0] * block:(voiced[-1] + 1) * block]
+
+    def detect(self, samples: Union[np.ndarray, AudioFrame]) -> Optional[Tuple[str, float]]:
+        """
+        比對一段語音與所有樣板
+
+        Returns:
+            (關鍵字, 距離)，沒有低於門檻的樣板時回傳 None
+        """
+        if not self.has_templates:
+            return None
+
+        samples = self._trim(as_samples(samples))
+        if not (self.min_samples <= len(samples) <= self.max_samples):
+            return None
+
+        features = self.extractor(samples)
+        best_keyword, best_score = None, np.inf
+
+        for keyword, templates in self.templates.items():
+            for template in templates:
+                # 長度差太多的樣板不可能匹配，直接略過
+                ratio = len(features) / len(template)
+                if ratio < 0.5 or ratio > 2.0:
+                    continue
+                score = dtw_distance(features, template)
+                if score < best_score:
+                    best_keyword, best_score = keyword, score
+
+        if best_keyword is None or best_score > self.threshold:
+            return None
+        return best_keyword, best_score
+
+    def process_frame(self, frame: Union[np.ndarray, AudioFrame]) -> Optional[str]:
+        """
+        處理一個串流音框（可直接訂閱 MicrophoneStream）
+
+        Returns:
+            偵測到的指令（如 'skip'），否則 None
+        """
+        segment = self.vad.process(frame)
+        if segment is None:
+            return None
+
+        result = self.detect(segment)
+        if result is None:
+            return None
+
+        keyword, _ = result
+        command = COMMANDS[keyword]
+        if self.on_command:
+            self.on_command(command, keyword)
+        return command
+
+    def reset(self):
+        """清除 VAD 狀態（例如開始新的一段播放時）"""
+        self.vad.reset()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from .audio_stream import MicrophoneStream
+
+    keyword = sys.argv[1] if len(sys.argv) > 1 else '跳過'
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    spotter = KeywordSpotter()
+    print(f"🎙️  錄製關鍵字樣板: {keyword}（共 {count} 次）")
+
+    segments = []
+    stream = MicrophoneStream(sample_rate=spotter.sample_rate)
+
+    def collect(frame):
+        segment = spotter.vad.process(frame)
+        if segment is not None and len(segments) < count:
+            segments.append(as_samples(segment).copy())
+            print(f"✅ 已錄製第 {len(segments)} 次")
+
+    stream.subscribe(collect)
+    with stream:
+        print(f"💡 請說「{keyword}」，每次之間稍微停頓")
+        while len(segments) < count:
+            time.sleep(0.05)
+
+    for segment in segments:
+        path = spotter.enroll(keyword, as_samples(segment))
+        print(f"💾 已儲存: {path}")
@@ -5,12 +5,18 @@ LLM 對話引擎模組
 """
 
 import os
+import copy
+import contextlib
 import json
 import sys
 from datetime import datetime
 from pathlib import Path
+from typing import Iterator
 from dotenv import load_dotenv
 
+from ..runtime.tracing import tracer
+from ..runtime.governor import governor
+
 load_dotenv()
 
 
@@ -43,6 +49,12 @@ class ChatBot:
         # 對話歷史
         self.chat_history = []
         
+        # Multi-Agent 對話上下文（None 表示使用協調器預設的；fork() 出來的分身各有一份）
+        self.agent_context = None
+        
+        # 對話快照（attach_snapshot() 之後每輪自動記錄）
+        self.snapshot = None
+        
         # 日誌目錄
         self.log_dir = Path(os.getenv('DATA_DIR', './data')) / 'logs'
         self.log_dir.mkdir(parents=True, exist_ok=True)
@@ -102,12 +114,15 @@ class ChatBot:
     def _init_multi_agent(self):
         """初始化 Multi-Agent 系統"""
         try:
-            # 將 src 目錄加入 Python 路徑
-            src_dir = Path(__file__).parent.parent
-            if str(src_dir) not in sys.path:
-                sys.path.insert(0, str(src_dir))
-            
-            from agents import MultiAgentOrchestrator
+            try:
+                from ..agents import MultiAgentOrchestrator
+            except ImportError:
+                # 將 src 目錄加入 Python 路徑
+                src_dir = Path(__file__).parent.parent
+                if str(src_dir) not in sys.path:
+                    sys.path.insert(0, str(src_dir))
+                
+                from agents import MultiAgentOrchestrator
             
             self.orchestrator = MultiAgentOrchestrator(self.client)
             print("✅ Multi-Agent 模式已啟用")
@@ -118,6 +133,31 @@ class ChatBot:
             self.use_multi_agent = False
             self.orchestrator = None
     
+    def fork(self) -> 'ChatBot':
+        """
+        建立共用後端的對話分身（對話伺服器每個 session 一個）
+        
+        分身共用同一個模型連線與 Multi-Agent 協調器，不重新連線、不重新載入，
+        只有對話歷史與上下文是自己的
+        
+        Returns:
+            新的 ChatBot
+        """
+        bot = copy.copy(self)
+        bot.chat_history = []
+        bot.snapshot = None
+        if self.use_multi_agent and self.orchestrator:
+            bot.agent_context = self.orchestrator.new_context()
+        return bot
+    
+    @property
+    def context(self) -> dict:
+        """目前使用的 Multi-Agent 對話上下文"""
+        if self.agent_context is not None:
+            return self.agent_context
+        return self.orchestrator.context
+    
+    @governor.track('llm')
     def chat(self, user_message: str, verbose: bool = False) -> str:
         """
         與 AI 對話
@@ -137,17 +177,20 @@ class ChatBot:
                     print(f"\n{'='*60}")
                     print(f"🔍 [路由分析] 問題: {user_message}")
                 
-                response = self.orchestrator.process_question(user_message, verbose=verbose)
+                response = self.orchestrator.process_question(
+                    user_message, verbose=verbose, context=self.agent_context
+                )
                 
                 # 顯示使用的 Agent
                 if verbose or os.getenv('SHOW_ROUTING', 'false').lower() == 'true':
-                    last_agent = self.orchestrator.context.get('last_agent')
+                    last_agent = self.context.get('last_agent')
                     print(f"✅ [使用 Agent] {last_agent}")
                     print(f"{'='*60}\n")
                 
                 # 儲存對話記錄
                 if self.save_conversation:
                     self._save_log(user_message, response, agent='multi-agent')
+                self._snapshot_turn(user_message)
                 
                 return response
             
@@ -163,9 +206,63 @@ class ChatBot:
             traceback.print_exc()
             return "抱歉，我現在有點累了，等一下再聊好嗎？"
     
-    def _chat_ollama(self, user_message: str) -> str:
-        """使用 Ollama 對話（單一 Agent）"""
-        # 建立完整的對話訊息
+    def chat_stream(self, user_message: str, verbose: bool = False, track: bool = True) -> Iterator[str]:
+        """
+        與 AI 對話（串流，邊生成邊交出文字）
+        
+        中途停止迭代時，已經生成的部分仍會記入對話歷史
+        
+        Args:
+            user_message: 使用者輸入的訊息
+            verbose: 是否顯示詳細日誌
+            track: 是否回報資源調度器；背景預先生成時為 False，不讓視覺因猜測的問題降速
+            
+        Yields:
+            AI 回應的文字片段
+        """
+        with governor.busy('llm') if track else contextlib.nullcontext():
+            yield from self._chat_stream(user_message, verbose)
+    
+    def _chat_stream(self, user_message: str, verbose: bool) -> Iterator[str]:
+        """chat_stream() 的本體（不回報資源調度器）"""
+        parts = []
+        agent = 'single'
+        
+        if self.use_multi_agent and self.orchestrator:
+            source = self.orchestrator.process_question_stream(
+                user_message, verbose=verbose, context=self.agent_context
+            )
+            agent = 'multi-agent'
+        elif self.backend == 'ollama':
+            source = self._stream_ollama(user_message)
+        else:
+            source = self._stream_gemini(user_message)
+        
+        try:
+            for chunk in source:
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            print(f"❌ AI 對話錯誤: {e}")
+            if not parts:
+                fallback = "抱歉，我現在有點累了，等一下再聊好嗎？"
+                parts.append(fallback)
+                yield fallback
+        finally:
+            source.close()
+            response = ''.join(parts)
+            
+            if agent == 'single':
+                self._remember(user_message, response)
+            else:
+                self._snapshot_turn(user_message)
+            
+            # 儲存對話記錄
+            if self.save_conversation and response:
+                self._save_log(user_message, response, agent=agent)
+    
+    def _ollama_messages(self, user_message: str) -> list:
+        """建立 Ollama 對話訊息（單一 Agent）"""
         messages = []
         
         # 加入系統指示（只在第一次）
@@ -183,34 +280,10 @@ class ChatBot:
             'role': 'user',
             'content': user_message
         })
-        
-        # 呼叫 Ollama API
-        response = self.client.chat(
-            model=self.model_name,
-            messages=messages
-        )
-        
-        ai_response = response['message']['content']
-        
-        # 更新對話歷史
-        self.chat_history.append({
-            'role': 'user',
-            'content': user_message
-        })
-        self.chat_history.append({
-            'role': 'assistant',
-            'content': ai_response
-        })
-        
-        # 儲存對話記錄
-        if self.save_conversation:
-            self._save_log(user_message, ai_response)
-        
-        return ai_response
+        return messages
     
-    def _chat_gemini(self, user_message: str) -> str:
-        """使用 Gemini 對話（單一 Agent）"""
-        # 建立完整的對話內容
+    def _gemini_contents(self, user_message: str) -> list:
+        """建立 Gemini 對話內容（單一 Agent）"""
         contents = []
         
         # 加入系統指示（作為第一條訊息）
@@ -236,16 +309,10 @@ class ChatBot:
             role='user',
             parts=[self.types.Part(text=user_message)]
         ))
-        
-        # 呼叫 Gemini API
-        response = self.client.models.generate_content(
-            model=self.model_name,
-            contents=contents
-        )
-        
-        ai_response = response.text
-        
-        # 更新對話歷史
+        return contents
+    
+    def _remember(self, user_message: str, ai_response: str):
+        """更新對話歷史"""
         self.chat_history.append({
             'role': 'user',
             'content': user_message
@@ -254,6 +321,57 @@ class ChatBot:
             'role': 'assistant',
             'content': ai_response
         })
+        self._snapshot_turn(user_message)
+    
+    def _chat_ollama(self, user_message: str) -> str:
+        """使用 Ollama 對話（單一 Agent）"""
+        # 呼叫 Ollama API
+        with tracer.span('llm.chat', model=self.model_name) as span:
+            response = self.client.chat(
+                model=self.model_name,
+                messages=self._ollama_messages(user_message)
+            )
+            span.ollama(response)
+        
+        ai_response = response['message']['content']
+        
+        # 更新對話歷史
+        self._remember(user_message, ai_response)
+        
+        # 儲存對話記錄
+        if self.save_conversation:
+            self._save_log(user_message, ai_response)
+        
+        return ai_response
+    
+    def _stream_ollama(self, user_message: str) -> Iterator[str]:
+        """使用 Ollama 串流對話（單一 Agent）"""
+        with tracer.span('llm.chat', model=self.model_name, stream=True) as span:
+            for chunk in self.client.chat(
+                model=self.model_name,
+                messages=self._ollama_messages(user_message),
+                stream=True
+            ):
+                if chunk.get('done'):
+                    span.ollama(chunk)
+                content = chunk['message']['content']
+                if content:
+                    tracer.mark('first_token')
+                    yield content
+    
+    def _chat_gemini(self, user_message: str) -> str:
+        """使用 Gemini 對話（單一 Agent）"""
+        # 呼叫 Gemini API
+        with tracer.span('llm.chat', model=self.model_name):
+            response = self.client.models.generate_content(
+                model=self.model_name,
+                contents=self._gemini_contents(user_message)
+            )
+        
+        ai_response = response.text
+        
+        # 更新對話歷史
+        self._remember(user_message, ai_response)
         
         # 儲存對話記錄
         if self.save_conversation:
@@ -261,6 +379,17 @@ class ChatBot:
         
         return ai_response
     
+    def _stream_gemini(self, user_message: str) -> Iterator[str]:
+        """使用 Gemini 串流對話（單一 Agent）"""
+        with tracer.span('llm.chat', model=self.model_name, stream=True):
+            for chunk in self.client.models.generate_content_stream(
+                model=self.model_name,
+                contents=self._gemini_contents(user_message)
+            ):
+                if chunk.text:
+                    tracer.mark('first_token')
+                    yield chunk.text
+    
     def _save_log(self, user_msg: str, ai_msg: str, agent: str = 'single'):
         """儲存對話記錄到日誌檔案"""
         timestamp = datetime.now().strftime("%Y%m%d")
@@ -277,16 +406,87 @@ class ChatBot:
         }
         
         if self.use_multi_agent and self.orchestrator:
-            log_entry['last_agent'] = self.orchestrator.context.get('last_agent')
+            log_entry['last_agent'] = self.context.get('last_agent')
         
         with open(log_file, 'a', encoding='utf-8') as f:
             f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
     
+    def session_state(self) -> dict:
+        """目前的對話狀態（歷史、上一個 Agent、學生程度、摘要），供對話快照使用"""
+        if self.use_multi_agent and self.orchestrator:
+            context = self.context
+            return {
+                'history': context['history'],
+                'last_agent': context.get('last_agent'),
+                'student_level': context.get('student_level'),
+                'summary': context.get('summary')
+            }
+        return {
+            'history': self.chat_history,
+            'last_agent': None,
+            'student_level': None,
+            'summary': None
+        }
+    
+    def restore_state(self, state: dict):
+        """恢復 session_state() 取得的對話狀態"""
+        if self.use_multi_agent and self.orchestrator:
+            context = self.context
+            context['history'] = list(state['history'])
+            context['last_agent'] = state.get('last_agent')
+            for key in ('student_level', 'summary'):
+                if state.get(key):
+                    context[key] = state[key]
+        else:
+            self.chat_history = list(state['history'])
+    
+    def adopt(self, state: dict, user_message: str):
+        """
+        採用在分身（fork()）上完成的一輪對話，例如預先生成、剛好被問到的追問
+        
+        Args:
+            state: 分身的 session_state()，最後兩則是這一輪的問答
+            user_message: 小朋友實際說的話（取代分身上預測的問題）
+        """
+        self.restore_state(state)
+        history = self.session_state()['history']
+        history[-2] = {'role': 'user', 'content': user_message}
+        
+        if self.save_conversation:
+            self._save_log(user_message, history[-1]['content'], agent='prefetch')
+        self._snapshot_turn(user_message)
+    
+    def attach_snapshot(self, snapshot):
+        """
+        使用對話快照：先恢復快照中的對話，之後每輪回答完自動記錄
+        
+        Args:
+            snapshot: runtime.snapshot.SessionSnapshot
+        """
+        if snapshot.restored:
+            self.restore_state(snapshot.state)
+        self.snapshot = snapshot
+    
+    def _snapshot_turn(self, user_message: str):
+        """把剛完成的一輪寫進對話快照"""
+        if self.snapshot is None:
+            return
+        state = self.session_state()
+        history = state['history']
+        # 路由失敗等情況不會記入歷史，就不寫
+        if len(history) >= 2 and history[-2]['content'] == user_message:
+            self.snapshot.record_turn(state)
+    
     def reset_conversation(self):
         """重置對話歷史"""
         self.chat_history = []
         
-        if self.use_multi_agent and self.orchestrator:
+        if self.snapshot is not None:
+            self.snapshot.record_reset()
+        
+        if self.agent_context is not None:
+            self.agent_context = self.orchestrator.new_context()
+        elif self.use_multi_agent and self.orchestrator:
             self.orchestrator.reset_context()
         
         print("✅ 對話歷史已清除")
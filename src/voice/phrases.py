@@ -0,0 +1,88 @@
+"""
+固定系統語句模組
+打招呼、再見、重新開始等固定句子統一登記在 PHRASES，
+啟動時由背景線程先合成好放在記憶體，需要時立即播放，
+不必等 TTS，也不會和回答的合成搶資源
+"""
+
+import threading
+from typing import Dict, Optional
+
+from .audio_frame import AudioFrame
+
+# 系統語句登記表（key → 文字）
+PHRASES: Dict[str, str] = {
+    'greeting': "你好！我是陪讀小助手。你可以直接用說的問我問題喔！",
+    'farewell': "再見！期待下次再聊！",
+    'interrupted': "掰掰！",
+    'reset': "好的，我們重新開始吧！",
+    'not_heard': "沒有聽到聲音，請再說一次喔！",
+}
+
+
+class PhraseBank:
+    """預先合成的固定語句"""
+
+    def __init__(self, tts, phrases: Dict[str, str] = None):
+        """
+        Args:
+            tts: TextToSpeech 實例
+            phrases: 語句登記表，預設使用 PHRASES
+        """
+        self.tts = tts
+        self.phrases = dict(phrases or PHRASES)
+        self._frames: Dict[str, AudioFrame] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def preload(self):
+        """在背景依序合成所有語句（單一線程，不佔用回答的合成資源）"""
+        if self._thread is not None:
+            return
+
+        def run():
+            for key in list(self.phrases):
+                try:
+                    self._load(key)
+                except Exception as e:
+                    print(f"⚠️  預先合成失敗「{self.phrases[key]}」: {e}")
+            self._ready.set()
+
+        self._thread = threading.Thread(target=run, daemon=True, name='phrase-preload')
+        self._thread.start()
+
+    def _load(self, key: str) -> AudioFrame:
+        frame = self.tts.synthesize(self.phrases[key])
+        with self._lock:
+            self._frames[key] = frame
+        return frame
+
+    def text(self, key: str) -> str:
+        return self.phrases[key]
+
+    def get(self, key: str) -> Optional[AudioFrame]:
+        """
+        取得語句的 PCM
+
+        已經預先合成就直接回傳；還沒輪到的話當場合成
+        """
+        with self._lock:
+            frame = self._frames.get(key)
+        if frame is not None:
+            return frame
+
+        try:
+            return self._load(key)
+        except Exception as e:
+            print(f"❌ TTS 錯誤: {e}")
+            return None
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待全部語句合成完成"""
+        return self._ready.wait(timeout)
+
+    @property
+    def loaded(self) -> int:
+        with self._lock:
+            return len(self._frames)
@@ -0,0 +1,232 @@
+"""
+追問預先生成模組
+機器人念回答的好幾秒裡，CPU 和模型伺服器都閒著。回答合成完之後，
+依這一輪的 Agent 猜小朋友最可能的追問（「為什麼？」「然後呢？」……），
+在背景用對話分身（ChatBot.fork()）先把回答生成好；
+真的問了一樣的問題就直接拿來播放，不用再等模型
+
+- 一次只生成一個預測，小朋友一開口（插話、注意力聆聽偵測到開口、或收到一句話）就取消還在生成的那一個，
+  關閉串流時模型伺服器也會停止生成；已經生成好的留著比對
+- 背景執行緒調低排程優先權，不計入延遲追蹤，也不回報資源調度器（視覺照常運作）
+- 「再說一次」直接重播上一個回答，不必經過模型
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from ..runtime.tracing import tracer
+
+load_dotenv()
+
+# 各 Agent 之後最可能的追問（依可能性排序；None 為單一 Agent 模式）
+FOLLOW_UPS: Dict[Optional[str], List[str]] = {
+    'math_tutor': ['為什麼？', '怎麼算？'],
+    'science_tutor': ['為什麼？', '然後呢？'],
+    'language_tutor': ['可以舉個例子嗎？', '為什麼？'],
+    'pedagogy': ['可以舉個例子嗎？', '為什麼？'],
+    'assessment': ['那正確答案是什麼？', '為什麼？'],
+    'companion': ['為什麼？', '然後呢？'],
+    None: ['為什麼？', '然後呢？'],
+}
+
+# 同一個追問的不同說法
+ALIASES: Dict[str, List[str]] = {
+    '為什麼？': ['為什麼', '為什麼呢', '為啥', '為什麼會這樣', '怎麼會這樣'],
+    '然後呢？': ['然後呢', '然後', '後來呢', '接下來呢', '還有呢'],
+    '怎麼算？': ['怎麼算', '要怎麼算', '怎麼算的', '怎麼算出來的'],
+    '可以舉個例子嗎？': ['舉個例子', '舉例', '可以舉例嗎', '有沒有例子'],
+    '那正確答案是什麼？': ['正確答案是什麼', '答案是什麼', '那答案是什麼'],
+}
+
+# 要求重說上一個回答
+REPEAT_WORDS = ['再說一次', '再講一次', '再說一遍', '再講一遍', '你說什麼', '沒聽清楚']
+
+REPEAT = '再說一次'
+
+_PUNCTUATION = re.compile(r'[\s，,。.！!？?、~～…]+')
+
+
+def _normalize(text: str) -> str:
+    return _PUNCTUATION.sub('', text).lower()
+
+
+class FollowUpPrefetcher:
+    """在播放回答時預先生成追問的回答"""
+
+    def __init__(self, bot, max_predictions: int = None, nice: int = None):
+        """
+        Args:
+            bot: ChatBot 實例（預先生成在它的分身上進行，用上時才併入對話歷史）
+            max_predictions: 每個回答之後最多預先生成幾個追問，預設讀取 PREFETCH_MAX
+            nice: 背景執行緒的 nice 值（只影響本行程），預設讀取 PREFETCH_NICE
+        """
+        self.bot = bot
+        self.max_predictions = max_predictions or int(os.getenv('PREFETCH_MAX', '2'))
+        self.nice = nice if nice is not None else int(os.getenv('PREFETCH_NICE', '10'))
+
+        # 說法 → 追問（比對用）
+        self._lookup: Dict[str, str] = {}
+        for question, aliases in ALIASES.items():
+            for alias in [question] + aliases:
+                self._lookup[_normalize(alias)] = question
+        for word in REPEAT_WORDS:
+            self._lookup[_normalize(word)] = REPEAT
+
+        self._lock = threading.Lock()
+        self._ready: Dict[str, dict] = {}     # 追問 → 分身生成好的對話狀態
+        self._base = None                     # 預測時的對話（最後一則訊息），用來確認沒有過期
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 事件迴圈與預測執行緒都會更新，一律在 _lock 內修改
+        self.stats = {
+            'asked': 0,        # 回答過的問題
+            'hits': 0,         # 直接使用預先生成的回答
+            'repeats': 0,      # 其中「再說一次」
+            'predicted': 0,    # 開始預先生成
+            'prefetched': 0,   # 生成完成
+            'cancelled': 0     # 小朋友開口而取消
+        }
+
+    # === 預測 ===
+
+    def predict(self, state: dict) -> List[str]:
+        """依上一輪的 Agent 猜最可能的追問"""
+        questions = FOLLOW_UPS.get(state.get('last_agent')) or FOLLOW_UPS[None]
+        return questions[:self.max_predictions]
+
+    def start(self):
+        """回答說完（合成完）之後呼叫：在背景預先生成追問的回答"""
+        self.cancel()
+
+        state = self.bot.session_state()
+        history = list(state['history'])
+        if not history or history[-1]['role'] != 'assistant':
+            return
+        state = {**state, 'history': history}
+        questions = self.predict(state)
+
+        cancel = threading.Event()
+        with self._lock:
+            self._ready = {}
+            self._base = (len(history), history[-1]['content'])
+            self._cancel = cancel
+
+        self._thread = threading.Thread(
+            target=self._run, args=(state, questions, cancel),
+            name='prefetch', daemon=True
+        )
+        self._thread.start()
+
+    def cancel(self):
+        """取消還在生成的預測（小朋友開口時呼叫，任何執行緒都可以）；已生成好的保留"""
+        if not self._cancel.is_set():
+            self._cancel.set()
+            if self._thread is not None and self._thread.is_alive():
+                self._count('cancelled')
+
+    def clear(self):
+        """取消並丟棄所有預測（例如重置對話）"""
+        self.cancel()
+        with self._lock:
+            self._ready = {}
+            self._base = None
+
+    def _run(self, state: dict, questions: List[str], cancel: threading.Event):
+        self._lower_priority()
+        with tracer.paused():
+            for question in questions:
+                if cancel.is_set():
+                    return
+                self._count('predicted')
+                result = self._generate(state, question, cancel)
+                if result is None:
+                    continue
+                with self._lock:
+                    if self._cancel is not cancel:
+                        return    # 已經有新的一輪預測
+                    self._ready[question] = result
+                    self.stats['prefetched'] += 1
+
+    def _generate(self, state: dict, question: str, cancel: threading.Event) -> Optional[dict]:
+        """在分身上生成一個回答；被取消或失敗時回傳 None"""
+        fork = self.bot.fork()
+        fork.save_conversation = False
+        fork.restore_state(state)
+
+        source = fork.chat_stream(question, track=False)
+        try:
+            for _ in source:
+                if cancel.is_set():
+                    return None
+        except Exception as e:
+            print(f"⚠️  預先生成失敗: {e}")
+            return None
+        finally:
+            source.close()
+
+        result = fork.session_state()
+        history = result['history']
+        if len(history) < 2 or history[-2]['content'] != question or not history[-1]['content']:
+            return None
+        return {**result, 'history': list(history)}
+
+    def _lower_priority(self):
+        """只調低這個執行緒（Linux 上 nice 以執行緒為單位）"""
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (AttributeError, OSError):
+            pass
+
+    # === 使用 ===
+
+    def take(self, question: str) -> Optional[str]:
+        """
+        小朋友的問題符合預測時，取出預先生成的回答並併入對話歷史
+
+        Args:
+            question: 辨識出的問題
+
+        Returns:
+            回答文字；沒有符合的預測時為 None（照常詢問模型）
+        """
+        self._count('asked')
+        key = self._lookup.get(_normalize(question))
+        if key is None:
+            return None
+
+        current = self.bot.session_state()
+        history = current['history']
+        if not history or history[-1]['role'] != 'assistant':
+            return None
+
+        if key == REPEAT:
+            state = {**current, 'history': history + [
+                {'role': 'user', 'content': question},
+                {'role': 'assistant', 'content': history[-1]['content']}
+            ]}
+            self._count('repeats')
+        else:
+            with self._lock:
+                state = self._ready.pop(key, None)
+                base = self._base
+            # 對話已經往前走（例如中間被跳過、重置）就不能用
+            if state is None or base != (len(history), history[-1]['content']):
+                return None
+
+        self.bot.adopt(state, question)
+        self._count('hits')
+        return state['history'][-1]['content']
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    @property
+    def hit_rate(self) -> float:
+        with self._lock:
+            return self.stats['hits'] / self.stats['asked'] if self.stats['asked'] else 0.0
@@ -0,0 +1,200 @@
+"""
+增量斷句模組
+把 LLM 逐字（token）產生的文字切成可以朗讀的句子，
+看到句尾就立刻交出一句，讓 TTS 在模型還在生成時就開始合成
+
+規則：
+- 中英文句尾標點（。！？!?；;… 與換行）都算句尾，連續的標點與收尾引號併在同一句
+- 數字中間的小數點（0.5、3.14）與清單編號（1. 2.）不是句尾
+- 還不確定的結尾（最後一個字元是句點或標點）會先保留，等下一個 token 再判斷
+- 太短的片段（例如「好！」）併入下一句，避免一個字一個字念
+- 太長又沒有句尾時，在逗號等停頓處先切出來
+"""
+
+import os
+from typing import Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 句尾標點（句點另外判斷）
+TERMINALS = set('。！？!?；;…\n')
+
+# 可以提前切開的停頓處
+SOFT_BREAKS = set('，、,：:')
+
+# 跟在句尾後面、屬於同一句的收尾符號
+CLOSERS = set('」』”’"\'）)】》〉')
+
+
+class SentenceSegmenter:
+    """增量斷句器"""
+
+    def __init__(self, min_chars: int = None, max_chars: int = None):
+        """
+        初始化斷句器
+
+        Args:
+            min_chars: 一句至少幾個字（不含標點），不足就併入下一句
+            max_chars: 超過這個長度還沒有句尾，就在停頓處先切
+        """
+        self.min_chars = min_chars or int(os.getenv('SEGMENT_MIN_CHARS', '4'))
+        self.max_chars = max_chars or int(os.getenv('SEGMENT_MAX_CHARS', '60'))
+        self._buffer = ''
+        self._carry = ''
+
+    def reset(self):
+        """清除尚未交出的文字"""
+        self._buffer = ''
+        self._carry = ''
+
+    def feed(self, text: str) -> List[str]:
+        """
+        加入一段新產生的文字
+
+        Returns:
+            已經可以朗讀的句子（可能是空列表）
+        """
+        self._buffer += text
+        sentences = []
+
+        while True:
+            cut = self._find_boundary(final=False)
+            if cut is None:
+                cut = self._find_soft_break()
+            if cut is None:
+                break
+            piece, self._buffer = self._buffer[:cut], self._buffer[cut:]
+            self._emit(piece, sentences)
+
+        return sentences
+
+    def flush(self) -> List[str]:
+        """文字結束：交出剩下的所有內容"""
+        sentences = []
+
+        while True:
+            cut = self._find_boundary(final=True)
+            if cut is None:
+                break
+            piece, self._buffer = self._buffer[:cut], self._buffer[cut:]
+            self._emit(piece, sentences)
+
+        piece, self._buffer = self._buffer, ''
+        self._emit(piece, sentences, force=True)
+        return sentences
+
+    def segment(self, text: str) -> List[str]:
+        """一次切完整段文字"""
+        self.reset()
+        return self.feed(text) + self.flush()
+
+    def iter_segments(self, tokens: Iterable[str]) -> Iterator[str]:
+        """
+        把 token 串流轉成句子串流
+
+        Args:
+            tokens: 逐段產生的文字（例如 LLM 串流輸出）
+
+        Yields:
+            可以朗讀的句子
+        """
+        self.reset()
+        for token in tokens:
+            yield from self.feed(token)
+        yield from self.flush()
+
+    # === 內部 ===
+
+    def _find_boundary(self, final: bool) -> Optional[int]:
+        """找第一個句尾，回傳切點；還不能確定時回傳 None"""
+        text = self._buffer
+        length = len(text)
+        i = 0
+
+        while i < length:
+            ch = text[i]
+
+            if ch == '.':
+                end = i
+                while end < length and text[end] == '.':
+                    end += 1
+                if end == length and not final:
+                    return None  # 可能是小數點或刪節號的一部分，等下一個 token
+
+                following = text[end] if end < length else ''
+                dots = end - i
+                previous = text[i - 1] if i > 0 else ''
+
+                # 小數點：3.14
+                if dots == 1 and previous.isdigit() and following.isdigit():
+                    i = end
+                    continue
+
+                # 清單編號：「1. 」
+                if dots == 1 and text[:i].strip().isdigit():
+                    i = end
+                    continue
+
+                # 英文句點後面要接空白、結尾、收尾符號或非英數字，才算句尾
+                if following and following.isascii() and following.isalnum():
+                    i = end
+                    continue
+
+                return self._extend(end, final)
+
+            if ch in TERMINALS:
+                return self._extend(i + 1, final)
+
+            i += 1
+
+        return None
+
+    def _extend(self, end: int, final: bool) -> Optional[int]:
+        """把句尾後面連續的標點與收尾符號併進來"""
+        text = self._buffer
+        while end < len(text) and (text[end] in TERMINALS or text[end] in CLOSERS or text[end] == '.'):
+            end += 1
+        if end == len(text) and not final:
+            return None  # 後面可能還有標點（例如「！？」），等下一個 token
+        return end
+
+    def _find_soft_break(self) -> Optional[int]:
+        """太長時在最後一個停頓處切（找不到停頓就等到兩倍長度再硬切）"""
+        if len(self._buffer) < self.max_chars:
+            return None
+
+        window = self._buffer[:self.max_chars]
+        for i in range(len(window) - 1, -1, -1):
+            if window[i] in SOFT_BREAKS and self._speakable_length(window[:i]) >= self.min_chars:
+                return i + 1
+
+        if len(self._buffer) >= self.max_chars * 2:
+            return self.max_chars
+        return None
+
+    @staticmethod
+    def _speakable_length(text: str) -> int:
+        """會被念出來的字數（中文字、英數字）"""
+        return sum(1 for ch in text if ch.isalnum())
+
+    def _emit(self, piece: str, sentences: List[str], force: bool = False):
+        """交出一句；太短就先留著併入下一句"""
+        text = self._carry + piece
+        if not force and self._speakable_length(text) < self.min_chars:
+            self._carry = text
+            return
+
+        self._carry = ''
+        text = text.strip()
+        if not text:
+            return
+
+        if self._speakable_length(text) == 0:
+            # 只有標點：接在上一句後面
+            if sentences:
+                sentences[-1] += text
+            return
+
+        sentences.append(text)
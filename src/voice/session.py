@@ -0,0 +1,725 @@
+"""
+非同步語音對話引擎
+以 asyncio 串起 聆聽 → 對話 → 分句 → 合成 → 播放，各階段是以佇列相連的 task：
+
+- 播放完成、LLM 輸出、合成結果都以事件送回事件迴圈，不再輪詢或固定 sleep
+- 空白鍵（loop.add_reader）與語音指令（關鍵字偵測回呼）都轉成 events 佇列裡的事件
+- 跳過／重置時直接取消這一輪的 task，還沒開始的合成一併取消，LLM 串流也會關閉
+- 串流合成：引擎支援時（Piper、eSpeak）一句話的第一段合成好就開始播放，不必等整句
+- 插話：播放中偵測到小朋友開口就立即停止，那一句直接當作下一個問題
+- 注意力閘門：有視覺追蹤時，只辨識小朋友面對機器人時說的話（電視、旁人聊天不會觸發回答）
+
+阻塞式的工作（麥克風聆聽、LLM 請求、TTS 合成）在執行緒中進行，
+閒置時事件迴圈只是在等待，不佔 CPU
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+
+from .audio_frame import AudioFrame
+from .segmenter import SentenceSegmenter
+from ..runtime.tracing import tracer
+
+load_dotenv()
+
+QUIT_WORDS = ['退出', '結束', '再見', 'bye', 'quit', 'exit']
+SKIP_WORDS = ['跳過', '下一個', 'skip', 'next']
+RESET_WORDS = ['重置', 'reset']
+
+# 播放中會中斷這一輪的指令
+TURN_COMMANDS = ('skip', 'reset', 'barge_in')
+
+_DONE = object()
+
+
+class _SynthesisJob:
+    """一句話的串流合成：在合成執行緒池執行，片段以事件送回事件迴圈的佇列"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, tts, sentence: str):
+        self.sentence = sentence
+        self.chunks: asyncio.Queue = asyncio.Queue()
+        self.future: Optional[asyncio.Future] = None
+        self._tts = tts
+        self._loop = loop
+        self._stop = threading.Event()
+
+    def run(self):
+        """（合成執行緒）迭代 tts.stream()，停止時關閉產生器（不完整的句子不會寫入快取）"""
+        source = self._tts.stream(self.sentence)
+        try:
+            for frame in source:
+                if self._stop.is_set():
+                    break
+                self._deliver(frame)
+        except Exception as e:
+            self._deliver(e)
+        finally:
+            source.close()
+            self._deliver(_DONE)
+
+    def cancel(self):
+        """停止合成（還沒開始的直接取消）"""
+        self._stop.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def _deliver(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self.chunks.put_nowait, item)
+        except RuntimeError:
+            self._stop.set()  # 事件迴圈已經關閉
+
+
+class VoiceSession:
+    """以事件驅動的語音對話流程"""
+
+    def __init__(self, bot, tts, stt, sink, phrases, mic_stream=None,
+                 keyword_spotter=None, echo_canceller=None, barge_in=None, prefetcher=None,
+                 attention=None, lookahead: int = None, streaming: bool = None, listen_timeout: int = 30):
+        """
+        初始化對話流程
+
+        Args:
+            bot: ChatBot 實例
+            tts: TextToSpeech 實例
+            stt: SpeechToText 實例
+            sink: 音訊輸出（AudioSink）
+            phrases: PhraseBank（預先合成的固定語句）
+            mic_stream: 播放期間監聽語音指令用的共享麥克風串流
+            keyword_spotter: 本地關鍵字偵測器（沒有樣板時退回 STT 監聽）
+            echo_canceller: 回音消除（以播放中的語音為參考）
+            barge_in: 插話偵測器（BargeInDetector），None 表示不啟用
+            prefetcher: 追問預先生成（FollowUpPrefetcher），None 表示不啟用
+            attention: 注意力閘門聆聽（GatedListener，需要 mic_stream），None 表示一律聆聽
+            lookahead: 最多預先合成幾句
+            streaming: 是否使用 LLM 串流
+            listen_timeout: 等待使用者開口的秒數
+        """
+        self.bot = bot
+        self.tts = tts
+        self.stt = stt
+        self.sink = sink
+        self.phrases = phrases
+        self.mic_stream = mic_stream
+        self.keyword_spotter = keyword_spotter
+        self.echo_canceller = echo_canceller
+        self.barge_in = barge_in
+        self.prefetcher = prefetcher
+        self.attention = attention if mic_stream is not None else None
+
+        self.lookahead = lookahead or int(os.getenv('TTS_LOOKAHEAD', '3'))
+        self.streaming = streaming if streaming is not None else \
+                         os.getenv('LLM_STREAMING', 'true').lower() == 'true'
+        self.sentence_gap = float(os.getenv('SENTENCE_GAP', '0'))
+        self.listen_timeout = listen_timeout
+
+        self.synth_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv('TTS_WORKERS', '2')),
+            thread_name_prefix='tts'
+        )
+
+        if self.keyword_spotter is not None:
+            self.keyword_spotter.on_command = self._on_voice_command
+        if self.barge_in is not None:
+            self.barge_in.on_barge_in = lambda: self.post('barge_in')
+            self.barge_in.on_utterance = lambda frame: self.post('utterance', frame)
+            self.barge_in_timeout = float(os.getenv('BARGE_IN_TIMEOUT', '16'))
+        if self.attention is not None:
+            self.attention.on_utterance = lambda frame: self.post('heard', frame)
+        if self.prefetcher is not None:
+            # 小朋友一開口就停止預先生成，把 CPU 和模型讓給真正的問題：
+            # 注意力聆聽時 VAD 一偵測到開口就取消；一般聆聽要等收到整句、開始辨識時
+            self.stt.on_speech = self.prefetcher.cancel
+            if self.attention is not None:
+                self.attention.on_speech_start = self.prefetcher.cancel
+
+        self.turns = 0
+        self.events: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._playing: Dict[object, asyncio.Future] = {}
+        self._pending_input: Optional[str] = None
+        self._pending_heard_at: Optional[int] = None  # 插話那一句說完的時間（perf_counter_ns）
+        self._keyboard = None
+        self._command_listen: Optional[asyncio.Future] = None
+
+    # === 事件 ===
+
+    def post(self, kind: str, payload=None):
+        """送出一個事件（任何執行緒都可以呼叫）"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self.events.put_nowait, (kind, payload))
+        except RuntimeError:
+            pass  # 事件迴圈已經關閉
+
+    def _on_voice_command(self, command: str, keyword: str):
+        """關鍵字偵測的回呼（麥克風執行緒）"""
+        self.post(command, keyword)
+
+    def _on_key(self):
+        """stdin 可讀時由事件迴圈呼叫"""
+        try:
+            data = os.read(sys.stdin.fileno(), 32)
+        except OSError:
+            return
+        if b' ' in data:
+            self.events.put_nowait(('skip', 'space'))
+
+    def _on_playback_event(self, event: str, handle):
+        """
+        播放開始／結束（輸出執行緒，PyAudio 時是音訊回呼）：通知回音消除，並喚醒等待這段音訊的 task
+
+        回音消除的參考訊號在 _play() 排入前已經算好（handle.tag），這裡只換指標
+        """
+        if event == 'start':
+            tracer.mark('first_audio')
+            if handle.tag is not None and self.mic_stream and self.mic_stream.is_running:
+                self.echo_canceller.start_playback(handle.tag, prepared=True)
+            return
+
+        if handle.tag is not None:
+            self.echo_canceller.stop_playback(handle.tag)
+
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._resolve_playback, handle)
+            except RuntimeError:
+                pass
+
+    def _resolve_playback(self, handle):
+        future = self._playing.pop(handle, None)
+        if future is not None and not future.done():
+            future.set_result(handle)
+
+    def _attach_keyboard(self):
+        """把終端設成 cbreak 並監聽空白鍵（不支援時略過）"""
+        try:
+            import termios
+            import tty
+            fd = sys.stdin.fileno()
+            old_settings = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        except Exception:
+            return
+
+        try:
+            self._loop.add_reader(fd, self._on_key)
+        except (NotImplementedError, RuntimeError):
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+            return
+
+        self._keyboard = (fd, old_settings)
+
+    def _detach_keyboard(self):
+        if not self._keyboard:
+            return
+
+        import termios
+        fd, old_settings = self._keyboard
+        self._keyboard = None
+        try:
+            self._loop.remove_reader(fd)
+        except Exception:
+            pass
+        try:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+        except Exception:
+            pass
+
+    def _drain_events(self):
+        """丟掉上一輪留下來的事件（例如聆聽時按到的空白鍵）"""
+        while not self.events.empty():
+            self.events.get_nowait()
+
+    # === 主流程 ===
+
+    async def run(self):
+        """執行對話主循環，直到使用者說再見"""
+        self._loop = asyncio.get_running_loop()
+        self.events = asyncio.Queue()
+        self.sink.subscribe(self._on_playback_event)
+        self._attach_keyboard()
+
+        try:
+            await self.say_phrase('greeting')
+
+            while True:
+                print("\n" + "-" * 70)
+
+                tracer.begin_turn()
+                outcome = await self._turn()
+                tracer.end_turn(outcome=outcome)
+
+                if outcome == 'quit':
+                    break
+        finally:
+            tracer.end_turn(outcome='interrupted')
+            if self.prefetcher is not None:
+                self.prefetcher.cancel()
+            self._detach_keyboard()
+            self.sink.unsubscribe(self._on_playback_event)
+            self.sink.stop()
+
+    async def _turn(self) -> str:
+        """
+        一輪對話：聆聽 → 回答
+
+        Returns:
+            這一輪的結果（answered / skip / barge_in / reset / not_heard / quit）
+        """
+        # 插話時已經收好的那一句直接當作輸入
+        user_input, self._pending_input = self._pending_input, None
+        if user_input is not None:
+            # 插話的那一句在上一輪就辨識好了，把說完的時間記到這一輪才算得出首音延遲
+            tracer.mark('speech_end', at=self._pending_heard_at)
+        else:
+            user_input = await self.listen()
+
+        if not user_input:
+            print("⏱️  沒有聽到聲音")
+            await self.say_phrase('not_heard')
+            return 'not_heard'
+
+        if any(word in user_input for word in QUIT_WORDS):
+            await self.say_phrase('farewell')
+            return 'quit'
+
+        if any(word in user_input.lower() for word in RESET_WORDS):
+            await self.reset()
+            return 'reset'
+
+        print("🤔 正在思考...")
+        print()
+
+        command = await self._run_turn(self.respond(user_input), listen_commands=True)
+        self.turns += 1
+
+        if command == 'reset':
+            await self.reset()
+
+        # 每5輪對話提示一次
+        if self.turns % 5 == 0:
+            print(f"\n💡 提示: 已經聊了 {self.turns} 輪了！")
+
+        return command or 'answered'
+
+    async def listen(self) -> str:
+        """聆聽一句話（STT 在執行緒中阻塞等待麥克風）"""
+        await self._finish_command_listening()
+
+        if self.attention is not None:
+            return await self._listen_attended()
+
+        text = await self._loop.run_in_executor(
+            None, self.stt.listen_from_microphone, self.listen_timeout, 15
+        )
+        if text:
+            print(f"👦 你說: {text}")
+        return text
+
+    async def _listen_attended(self) -> str:
+        """
+        經過注意力閘門聆聽：麥克風一直收音，只有小朋友面對機器人時說的話才辨識
+
+        沒有人在的時候安靜等待，不會每隔 listen_timeout 就說「沒有聽到」
+        """
+        self.attention.reset()
+        self.mic_stream.subscribe(self.attention.process_frame)
+        try:
+            self.mic_stream.start()
+        except Exception as e:
+            print(f"⚠️  無法啟動麥克風串流，改用一般聆聽: {e}")
+            self.mic_stream.unsubscribe(self.attention.process_frame)
+            self.attention = None
+            return await self.listen()
+
+        try:
+            while True:
+                frame = await self._next_event('heard')
+                print("🔄 正在辨識...")
+                try:
+                    text = await self._loop.run_in_executor(None, self.stt.recognize_frame, frame)
+                except Exception:
+                    print("❌ 無法辨識，請說清楚一點")
+                    continue
+                if text:
+                    print(f"👦 你說: {text}")
+                    return text
+        finally:
+            self.mic_stream.unsubscribe(self.attention.process_frame)
+            self.mic_stream.stop()
+
+    async def reset(self):
+        """清除對話歷史"""
+        if self.prefetcher is not None:
+            self.prefetcher.clear()
+        self.bot.reset_conversation()
+        await self.say_phrase('reset')
+
+    async def say_phrase(self, key: str):
+        """說出預先合成的固定語句（可用空白鍵跳過）"""
+        print(f"🤖 小助手: {self.phrases.text(key)}")
+        frame = await self._loop.run_in_executor(None, self.phrases.get, key)
+        if frame is not None:
+            await self._run_turn(self._play(frame))
+
+    async def respond(self, user_input: str):
+        """回答一個問題：LLM → 分句 → 合成 → 播放"""
+        prefetched = self.prefetcher.take(user_input) if self.prefetcher is not None else None
+        if prefetched is not None:
+            print("⚡ 使用預先準備好的回答")
+            tracer.mark('first_token', prefetched=True)
+            tokens = self._iterate([prefetched])
+        elif self.streaming:
+            tokens = self._iterate_in_thread(self.bot.chat_stream(user_input))
+        else:
+            response = await self._loop.run_in_executor(None, self.bot.chat, user_input)
+            tokens = self._iterate([response])
+
+        await self.speak(self._segment(tokens))
+
+    async def _run_turn(self, work: Awaitable, listen_commands: bool = False) -> Optional[str]:
+        """
+        執行一輪說話，同時等待跳過／重置事件
+
+        Args:
+            work: 這一輪要做的事（協程）
+            listen_commands: 是否在播放期間開麥克風聽語音指令
+
+        Returns:
+            中斷這一輪的指令，正常結束時為 None
+        """
+        self._drain_events()
+        task = asyncio.ensure_future(work)
+        listener = self._start_command_listening() if listen_commands else None
+        command = None
+
+        try:
+            while not task.done():
+                getter = asyncio.ensure_future(self.events.get())
+                done, _ = await asyncio.wait({task, getter}, return_when=asyncio.FIRST_COMPLETED)
+
+                if getter not in done:
+                    getter.cancel()
+                    break
+
+                kind, payload = getter.result()
+                if kind in TURN_COMMANDS:
+                    if payload == 'space':
+                        print("\n⌨️  空白鍵")
+                    elif kind == 'barge_in':
+                        print("\n🙋 偵測到插話")
+                        if self.prefetcher is not None:
+                            self.prefetcher.cancel()
+                    elif payload:
+                        print(f"\n🎤 聽到指令: {payload}")
+                    command = kind
+                    self.sink.stop()  # 先靜音，再取消 task
+                    task.cancel()
+                    break
+
+            try:
+                await task
+            except asyncio.CancelledError:
+                if command is None:
+                    raise
+                if command == 'skip':
+                    print("⏭️  已跳過")
+
+            if command == 'barge_in':
+                self._pending_input = await self._capture_barge_in()
+        except BaseException:
+            task.cancel()
+            raise
+        finally:
+            if listener is not None:
+                self._stop_command_listening(listener)
+
+        return command
+
+    # === 管線各階段 ===
+
+    async def speak(self, sentences: AsyncIterator[str]):
+        """
+        依序合成並播放句子
+
+        合成 task 把句子送進執行緒池串流合成（最多預先合成 lookahead 句），
+        這裡依句子順序把合成好的片段排入音訊輸出；引擎支援串流時，一句話的第一段合成好就開始播放
+        """
+        print("🤖 小助手: ", end='', flush=True)
+
+        ready: asyncio.Queue = asyncio.Queue(maxsize=self.lookahead)
+        producer = asyncio.ensure_future(self._synthesize(sentences, ready))
+
+        try:
+            while True:
+                job = await ready.get()
+                if job is None:
+                    break
+
+                # 顯示文字
+                print(job.sentence, end='', flush=True)
+
+                await self._play_stream(job)
+
+                # 句間停頓（預設 0，合成已經提前完成）
+                if self.sentence_gap > 0:
+                    await asyncio.sleep(self.sentence_gap)
+        finally:
+            # 跳過或出錯時：停止取句子，並取消還沒開始（或還沒合成完）的句子
+            producer.cancel()
+            while not ready.empty():
+                job = ready.get_nowait()
+                if job is not None:
+                    job.cancel()
+            print()  # 換行
+
+    async def _synthesize(self, sentences: AsyncIterator[str], ready: asyncio.Queue):
+        """把句子送去串流合成，每一句的合成工作依序放進 ready"""
+        futures = []
+        try:
+            async for sentence in sentences:
+                job = _SynthesisJob(self._loop, self.tts, sentence)
+                job.future = self._loop.run_in_executor(self.synth_pool, job.run)
+                futures.append(job.future)
+                await ready.put(job)
+
+            # 全部合成完之後只剩播放，這段空檔拿來預先生成追問的回答
+            if self.prefetcher is not None and futures:
+                await asyncio.wait(futures)
+                self.prefetcher.start()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"\n❌ 產生回應錯誤: {e}")
+        finally:
+            await sentences.aclose()
+
+        await ready.put(None)
+
+    async def _play_stream(self, job: '_SynthesisJob'):
+        """一句話的片段一合成好就排入輸出（片段之間沒有空隙），等到最後一段播完（或被停止）"""
+        span = tracer.span('playback')
+        handles = []
+        try:
+            while True:
+                item = await job.chunks.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    print(f"\n❌ TTS 錯誤: {item}")
+                    break
+                reference = self.echo_canceller.prepare(item.samples, item.sample_rate) \
+                            if self.echo_canceller else None
+                handles.append(self.sink.play(item, tag=reference))
+
+            if handles:
+                finished = self._loop.create_future()
+                self._playing[handles[-1]] = finished
+                await finished
+        finally:
+            job.cancel()
+            if handles:
+                self._playing.pop(handles[-1], None)
+            span.set(
+                seconds=round(sum(h.frame.duration for h in handles), 2),
+                played=round(sum(h.played_seconds for h in handles), 2),
+                chunks=len(handles)
+            )
+            span.finish()
+
+    async def _play(self, frame: AudioFrame):
+        """播放一段音訊，等到輸出回報結束（或被停止）"""
+        span = tracer.span('playback', seconds=round(frame.duration, 2))
+        reference = self.echo_canceller.prepare(frame.samples, frame.sample_rate) if self.echo_canceller else None
+        handle = self.sink.play(frame, tag=reference)
+        finished = self._loop.create_future()
+        self._playing[handle] = finished
+        try:
+            await finished
+        finally:
+            self._playing.pop(handle, None)
+            span.set(played=round(handle.played_seconds, 2))
+            span.finish()
+
+    async def _segment(self, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+        """token 串流 → 句子串流"""
+        segmenter = SentenceSegmenter()
+        try:
+            async for token in tokens:
+                for sentence in segmenter.feed(token):
+                    yield sentence
+            for sentence in segmenter.flush():
+                yield sentence
+        finally:
+            await tokens.aclose()
+
+    @staticmethod
+    async def _iterate(items: Iterable[str]) -> AsyncIterator[str]:
+        for item in items:
+            yield item
+
+    async def _iterate_in_thread(self, iterable: Iterable[str]) -> AsyncIterator[str]:
+        """
+        在背景執行緒迭代阻塞式的產生器（例如 LLM 串流），結果以事件送回
+
+        停止迭代時由背景執行緒自己關閉產生器（已生成的部分仍會記入對話歷史）
+        """
+        items: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        loop = self._loop
+
+        def deliver(item):
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, item)
+            except RuntimeError:
+                stop.set()  # 事件迴圈已經關閉
+
+        def pump():
+            iterator = iter(iterable)
+            try:
+                for item in iterator:
+                    if stop.is_set():
+                        break
+                    deliver(item)
+            except Exception as e:
+                deliver(e)
+            finally:
+                close = getattr(iterator, 'close', None)
+                if close:
+                    close()
+                deliver(_DONE)
+
+        threading.Thread(target=pump, daemon=True, name='llm-stream').start()
+
+        try:
+            while True:
+                item = await items.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    # === 語音指令 ===
+
+    def _start_command_listening(self):
+        """
+        播放期間監聽「跳過」「重置」與插話
+
+        優先使用共享麥克風串流（本地關鍵字偵測、插話偵測），兩者都沒有時退回 STT
+        """
+        spotter = self.keyword_spotter
+        subscribers = []
+        if spotter is not None and spotter.has_templates:
+            spotter.reset()
+            subscribers.append(spotter.process_frame)
+        if self.barge_in is not None:
+            self.barge_in.reset()
+            subscribers.append(self.barge_in.process_frame)
+
+        if subscribers and self.mic_stream is not None:
+            try:
+                if self.echo_canceller:
+                    self.mic_stream.add_stage(self.echo_canceller.process)
+                for callback in subscribers:
+                    self.mic_stream.subscribe(callback)
+                self.mic_stream.start()
+                return subscribers
+            except Exception as e:
+                print(f"⚠️  無法啟動本地關鍵字偵測: {e}")
+                for callback in subscribers:
+                    self.mic_stream.unsubscribe(callback)
+
+        return asyncio.ensure_future(self._listen_for_commands())
+
+    def _stop_command_listening(self, listener):
+        if isinstance(listener, list):
+            for callback in listener:
+                self.mic_stream.unsubscribe(callback)
+            self.mic_stream.stop()
+        else:
+            listener.cancel()
+
+    async def _capture_barge_in(self) -> Optional[str]:
+        """
+        插話後繼續收音，等那一句說完再辨識
+
+        Returns:
+            辨識出的文字；只是說「跳過」或沒聽清楚時回傳 None（回到一般聆聽）
+        """
+        try:
+            frame = await asyncio.wait_for(self._next_event('utterance'), self.barge_in_timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        print("🔄 正在辨識...")
+        self._pending_heard_at = time.perf_counter_ns()
+        try:
+            text = await self._loop.run_in_executor(None, self.stt.recognize_frame, frame)
+        except Exception:
+            print("❌ 無法辨識，請說清楚一點")
+            return None
+
+        if text.strip(' 。！!？?，,').lower() in SKIP_WORDS:
+            print(f"🎤 聽到指令: {text}")
+            return None
+
+        print(f"👦 你說: {text}")
+        return text
+
+    async def _next_event(self, kind: str):
+        """等待某一種事件，其他事件略過"""
+        while True:
+            event, payload = await self.events.get()
+            if event == kind:
+                return payload
+
+    async def _listen_for_commands(self):
+        """沒有關鍵字樣板時：以短時間的 STT 監聽指令"""
+        while True:
+            # 取消這個 task 不會停止執行緒裡的 STT，留著 future 讓下一次聆聽等它結束
+            self._command_listen = self._loop.run_in_executor(
+                None, self.stt.listen_from_microphone, 1, 2
+            )
+            try:
+                text = await asyncio.shield(self._command_listen)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                continue
+
+            if not text:
+                continue
+            if any(word in text for word in SKIP_WORDS):
+                self.post('skip', text)
+                return
+            if any(word in text.lower() for word in RESET_WORDS):
+                self.post('reset', text)
+                return
+
+    async def _finish_command_listening(self):
+        """等上一輪的指令監聽 STT 結束（最多幾秒），兩次聆聽不能同時搶麥克風"""
+        future, self._command_listen = self._command_listen, None
+        if future is None or future.done():
+            return
+        try:
+            await future
+        except Exception:
+            pass
+
+    def close(self):
+        """釋放合成執行緒"""
+        self.synth_pool.shutdown(wait=False, cancel_futures=True)
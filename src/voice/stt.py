@@ -8,23 +8,48 @@
 2. 優化環境噪音處理
 3. 支援更長的語音輸入
 4. 所有參數可通過環境變數調整
+5. 支援本地 Whisper 引擎（STT_ENGINE=whisper）
+6. 支援多進程批次轉錄（transcribe_many）
 """
 
 import os
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
 from pathlib import Path
+from typing import Iterable, Iterator, Tuple, Union
 import speech_recognition as sr
 from dotenv import load_dotenv
 
+from .audio_frame import AudioFrame
+from ..runtime.tracing import tracer
+from ..runtime.governor import governor
+
 load_dotenv()
 
+# 批次轉錄支援的音訊副檔名
+AUDIO_EXTENSIONS = ('.wav', '.aiff', '.aif', '.flac')
+
 
 class SpeechToText:
     """語音轉文字處理器 - 改進版"""
     
-    def __init__(self):
+    def __init__(self, engine: str = None):
         self.recognizer = sr.Recognizer()
         self.language = os.getenv('STT_LANGUAGE', 'zh-TW')
         
+        # 辨識引擎：google（雲端）或 whisper（本地）
+        self.engine = (engine or os.getenv('STT_ENGINE', 'google')).lower()
+        if self.engine not in ('google', 'whisper'):
+            raise ValueError(f"不支援的 STT 引擎: {self.engine}")
+        self.whisper_model_name = os.getenv('WHISPER_MODEL', 'base')
+        self._whisper_model = None
+        # Whisper 輸入用的 float32 工作區，重複使用避免每句重新配置
+        self._float_buffer = None
+        
+        # 收到一句話、開始辨識前呼叫（例如取消背景的預先生成，把 CPU 讓給辨識）
+        self.on_speech = None
+        
         # === 核心參數（可通過環境變數調整）===
         
         # 能量門檻：降低以提高靈敏度，減少漏聽
@@ -54,8 +79,87 @@ class SpeechToText:
             print(f"  • 停頓容忍: {self.recognizer.pause_threshold} 秒")
             print(f"  • 非語音時長: {self.recognizer.non_speaking_duration} 秒")
             print(f"  • 動態調整: {self.recognizer.dynamic_energy_threshold}")
+            print(f"  • 辨識引擎: {self.engine}")
             print()
     
+    def warm_up(self):
+        """預先載入本地模型，避免第一次辨識時才載入"""
+        if self.engine == 'whisper':
+            self._load_whisper()
+    
+    def _load_whisper(self):
+        """載入 Whisper 模型（只載入一次）"""
+        if self._whisper_model is None:
+            import whisper
+            self._whisper_model = whisper.load_model(self.whisper_model_name)
+        return self._whisper_model
+    
+    @governor.track('stt')
+    def _recognize(self, audio: sr.AudioData) -> str:
+        """
+        使用目前的引擎辨識音訊
+        
+        Raises:
+            sr.UnknownValueError: 無法辨識
+            sr.RequestError: 雲端 API 錯誤
+        """
+        tracer.mark('speech_end')
+        if self.on_speech is not None:
+            self.on_speech()
+        with tracer.span('stt.recognize', engine=self.engine):
+            if self.engine == 'whisper':
+                return self._recognize_whisper(audio)
+            
+            # 使用 Google Speech Recognition（免費）
+            return self.recognizer.recognize_google(audio, language=self.language)
+    
+    @governor.track('stt')
+    def recognize_frame(self, frame: AudioFrame) -> str:
+        """
+        直接辨識 AudioFrame（本地引擎不經過 sr.AudioData / bytes 轉換）
+        
+        Raises:
+            sr.UnknownValueError: 無法辨識
+            sr.RequestError: 雲端 API 錯誤
+        """
+        tracer.mark('speech_end')
+        if self.on_speech is not None:
+            self.on_speech()
+        with tracer.span('stt.recognize', engine=self.engine):
+            if self.engine == 'whisper':
+                return self._recognize_whisper_frame(frame)
+            return self.recognizer.recognize_google(frame.to_audio_data(), language=self.language)
+    
+    def _recognize_whisper(self, audio: sr.AudioData) -> str:
+        """使用本地 Whisper 模型辨識"""
+        # 16-bit 音訊直接共用 AudioData 的記憶體
+        return self._recognize_whisper_frame(AudioFrame.from_audio_data(audio))
+    
+    def _recognize_whisper_frame(self, frame: AudioFrame) -> str:
+        """Whisper 辨識（16kHz float32，工作區重複使用）"""
+        import numpy as np
+        
+        frame = frame.resample(16000)
+        if self._float_buffer is None or len(self._float_buffer) < len(frame):
+            self._float_buffer = np.empty(max(len(frame), 16000 * 30), dtype=np.float32)
+        samples = frame.as_float32(out=self._float_buffer)
+        
+        result = self._load_whisper().transcribe(
+            samples,
+            language=self.language.split('-')[0],
+            fp16=False
+        )
+        text = result.get('text', '').strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+    
+    def _transcribe_file(self, audio_file_path: str) -> str:
+        """將音訊檔案轉換為文字（錯誤直接拋出）"""
+        with sr.AudioFile(audio_file_path) as source:
+            audio = self.recognizer.record(source)
+        return self._recognize(audio)
+    
     def transcribe(self, audio_file_path: str) -> str:
         """
         將音訊檔案轉換為文字
@@ -67,12 +171,7 @@ class SpeechToText:
             辨識出的文字內容
         """
         try:
-            with sr.AudioFile(audio_file_path) as source:
-                audio = self.recognizer.record(source)
-                
-            # 使用 Google Speech Recognition（免費）
-            text = self.recognizer.recognize_google(audio, language=self.language)
-            return text
+            return self._transcribe_file(audio_file_path)
             
         except sr.UnknownValueError:
             print("❌ 無法辨識音訊內容")
@@ -84,6 +183,100 @@ class SpeechToText:
             print(f"❌ STT 錯誤: {e}")
             return ""
     
+    def transcribe_many(self, sources: Union[str, Path, Iterable[Union[str, Path]]],
+                        workers: int = None,
+                        manifest: Union[str, Path] = None) -> Iterator[Tuple[str, str]]:
+        """
+        批次轉錄多個音訊檔案（多進程，每個 worker 各自載入一份模型）
+        
+        Args:
+            sources: 音訊檔案路徑列表，或一個目錄（遞迴尋找 wav/aiff/flac）
+            workers: 進程數，預設為 CPU 核心數
+            manifest: 進度檔（JSONL），已成功轉錄的檔案會被略過，可中斷後續跑
+            
+        Yields:
+            (檔案路徑, 辨識文字)，依完成順序；辨識失敗時文字為空字串
+        """
+        paths = self._collect_audio_paths(sources)
+        
+        manifest_path = Path(manifest) if manifest else None
+        done = self._load_manifest(manifest_path) if manifest_path else set()
+        pending = [p for p in paths if p not in done]
+        
+        if not pending:
+            return
+        
+        workers = workers or int(os.getenv('STT_BATCH_WORKERS', '0')) or os.cpu_count() or 1
+        workers = max(1, min(workers, len(pending)))
+        # 每個 worker 分到的運算執行緒，避免 torch 在多進程下互搶核心
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        
+        manifest_file = open(manifest_path, 'a', encoding='utf-8') if manifest_path else None
+        
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context('spawn'),
+                initializer=_init_batch_worker,
+                initargs=(self.engine, self.language, threads_per_worker)
+            ) as pool:
+                futures = {pool.submit(_batch_transcribe, path): path for path in pending}
+                
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        text, error = future.result()
+                    except Exception as e:
+                        text, error = "", str(e)
+                    
+                    if manifest_file:
+                        entry = {'path': path, 'text': text, 'engine': self.engine}
+                        if error:
+                            entry['error'] = error
+                        manifest_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                        manifest_file.flush()
+                    
+                    yield path, text
+        finally:
+            if manifest_file:
+                manifest_file.close()
+    
+    @staticmethod
+    def _collect_audio_paths(sources) -> list:
+        """展開目錄並回傳排序後的音訊檔案路徑"""
+        if isinstance(sources, (str, Path)):
+            sources = [sources]
+        
+        paths = []
+        for source in sources:
+            source = Path(source)
+            if source.is_dir():
+                paths.extend(
+                    p for p in sorted(source.rglob('*'))
+                    if p.suffix.lower() in AUDIO_EXTENSIONS
+                )
+            else:
+                paths.append(source)
+        
+        return [str(p) for p in paths]
+    
+    @staticmethod
+    def _load_manifest(manifest_path: Path) -> set:
+        """讀取進度檔中已成功轉錄的檔案"""
+        done = set()
+        if not manifest_path.exists():
+            return done
+        
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 中斷時可能寫了一半
+                if not entry.get('error'):
+                    done.add(entry['path'])
+        return done
+    
     def listen_from_microphone(self, timeout: int = 5, phrase_time_limit: int = 10) -> str:
         """
         從麥克風即時錄音並轉文字
@@ -106,11 +299,12 @@ class SpeechToText:
                 
                 # 開始錄音
                 try:
-                    audio = self.recognizer.listen(
-                        source, 
-                        timeout=timeout,
-                        phrase_time_limit=phrase_time_limit
-                    )
+                    with tracer.span('stt.listen'):
+                        audio = self.recognizer.listen(
+                            source, 
+                            timeout=timeout,
+                            phrase_time_limit=phrase_time_limit
+                        )
                 except sr.WaitTimeoutError:
                     print("⏱️  沒有聽到聲音，超時了")
                     return ""
@@ -118,8 +312,7 @@ class SpeechToText:
             print("🔄 正在辨識...")
             
             # 識別語音
-            text = self.recognizer.recognize_google(audio, language=self.language)
-            return text
+            return self._recognize(audio)
             
         except sr.UnknownValueError:
             print("❌ 無法辨識，請說清楚一點")
@@ -169,25 +362,21 @@ class SpeechToText:
             # 識別語音（使用 show_all 獲取更多候選）
             try:
                 # 嘗試獲取最佳結果
-                text = self.recognizer.recognize_google(
-                    audio, 
-                    language=self.language,
-                    show_all=False  # 只返回最可能的結果
-                )
-                return text
+                return self._recognize(audio)
             except sr.UnknownValueError:
-                # 如果無法識別，嘗試獲取所有候選
-                try:
-                    results = self.recognizer.recognize_google(
-                        audio, 
-                        language=self.language,
-                        show_all=True
-                    )
-                    if results and 'alternative' in results:
-                        # 返回第一個候選
-                        return results['alternative'][0]['transcript']
-                except:
-                    pass
+                # 如果無法識別，嘗試獲取所有候選（僅 Google 支援）
+                if self.engine == 'google':
+                    try:
+                        results = self.recognizer.recognize_google(
+                            audio, 
+                            language=self.language,
+                            show_all=True
+                        )
+                        if results and 'alternative' in results:
+                            # 返回第一個候選
+                            return results['alternative'][0]['transcript']
+                    except:
+                        pass
                 
                 print("❌ 無法辨識，請重新說一遍")
                 return ""
@@ -245,6 +434,37 @@ class SpeechToText:
             return False
 
 
+# === 批次轉錄 worker（在子進程中執行）===
+
+_worker_stt = None
+
+
+def _init_batch_worker(engine: str, language: str, num_threads: int):
+    """子進程初始化：建立並預熱一份 SpeechToText"""
+    global _worker_stt
+    
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+    
+    _worker_stt = SpeechToText(engine=engine)
+    _worker_stt.language = language
+    _worker_stt.warm_up()
+
+
+def _batch_transcribe(path: str) -> Tuple[str, str]:
+    """轉錄單一檔案，回傳 (文字, 錯誤訊息)"""
+    try:
+        return _worker_stt._transcribe_file(path), ""
+    except sr.UnknownValueError:
+        return "", ""
+    except Exception as e:
+        return "", str(e)
+
+
+# 使用相對匯入，請在專案根目錄以 python -m src.voice.stt 執行
 if __name__ == "__main__":
     # 測試範例
     print("=" * 70)
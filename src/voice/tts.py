@@ -1,16 +1,34 @@
 """
 文字轉語音 (Text-to-Speech) 模組 - 優化語速版
-使用 gTTS 生成語音，並透過 pydub 進行速度處理
+依 TTS_ENGINES 的順序使用 TTS 引擎（預設 gTTS，沒有網路時改用離線引擎），
+再以向量化 WSOLA 調整語速
+處理好的語音會存入內容定址快取，相同句子不再重新合成
+
+整個合成流程都在記憶體中進行（引擎 → NumPy PCM → 調整語速），
+不使用共用暫存檔，可以從多個線程同時呼叫；只有呼叫端要求輸出檔時才寫入磁碟
+
+播放用的檔案預設為 WAV：不需要再編碼成 MP3，播放器也不必再解碼；
+MP3 只在開啟封存 (TTS_ARCHIVE_MP3) 時於背景另存一份
 """
 
+import io
 import os
-import subprocess
+import threading
 from pathlib import Path
-from datetime import datetime
-from gtts import gTTS
+from typing import Iterable, Iterator, Optional, Tuple, Union
+import numpy as np
 from pydub import AudioSegment
 from dotenv import load_dotenv
 
+from .audio_frame import AudioFrame
+from .audio_sink import create_sink
+from .audio_spool import AudioSpool
+from .time_stretch import TimeStretcher, time_stretch
+from .tts_cache import TTSCache
+from .tts_engines import TTSEngine, create_engine_chain
+from ..runtime.tracing import tracer
+from ..runtime.governor import governor
+
 load_dotenv()
 
 class TextToSpeech:
@@ -22,53 +40,261 @@ class TextToSpeech:
         self.speed_factor = float(os.getenv('TTS_SPEED', '1.25'))
         
         self.audio_dir = Path(os.getenv('DATA_DIR', './data')) / 'audio'
-        self.audio_dir.mkdir(parents=True, exist_ok=True)
         
-    def speak(self, text: str, output_file: str = None, play: bool = False) -> str:
-        """將文字轉換為語音並調整語速"""
+        # 每句話的語音檔：唯一檔名、依日期分目錄，背景依容量與天數清理
+        self.spool = AudioSpool(self.audio_dir)
+        self.spool.start_janitor()
+        
+        # TTS 引擎（依序備援）
+        self.engines = create_engine_chain()
+        self.engine_name = self.engines.primary.name
+        
+        # 語音快取
+        self.cache = TTSCache() if os.getenv('TTS_CACHE', 'true').lower() == 'true' else None
+        
+        # 播放用輸出格式（wav 免編碼；mp3 僅為相容舊設定）
+        self.output_format = os.getenv('TTS_OUTPUT_FORMAT', 'wav').lower().lstrip('.')
+        
+        # MP3 封存（背景編碼，不影響播放延遲）
+        self.archive_mp3 = os.getenv('TTS_ARCHIVE_MP3', 'false').lower() == 'true'
+        
+        # play_audio 用的音訊輸出（第一次播放時才建立）
+        self._sink = None
+    
+    def _cache_key(self, text: str) -> str:
+        return TTSCache.make_key(text, self.language, self.speed_factor, self.engine_name)
+    
+    @governor.track('tts')
+    def synthesize(self, text: str) -> AudioFrame:
+        """
+        將文字合成為處理好語速的 PCM（全程在記憶體中，執行緒安全）
+        
+        Args:
+            text: 要合成的文字
+            
+        Returns:
+            單聲道 int16 AudioFrame
+        """
+        cache_key = self._cache_key(text) if self.cache else None
+        
+        with tracer.span('tts.synthesize', chars=len(text)) as span:
+            if cache_key:
+                data = self.cache.get_bytes(cache_key)
+                if data is not None:
+                    span.set(cache='hit')
+                    return self._decode(data)
+            
+            frame, engine = self._synthesize_uncached(text)
+            span.set(engine=engine.name)
+        
+        # 只快取主要引擎的結果，備援引擎的語音等網路恢復後會重新合成
+        if cache_key and engine is self.engines.primary:
+            self.cache.put(cache_key, frame.to_wav_bytes(), suffix='.wav')
+        
+        return frame
+    
+    @governor.track('tts')
+    def stream(self, text: str) -> Iterator[AudioFrame]:
+        """
+        串流合成（引擎支援時邊合成邊交出音訊，第一段可以先開始播放）
+        
+        整句合成完之後與 render() 一樣寫入快取、暫存區與封存；中途停止迭代時不寫入
+        
+        Args:
+            text: 要合成的文字
+            
+        Yields:
+            處理好語速的 AudioFrame 片段
+        """
+        cache_key = self._cache_key(text) if self.cache else None
+        span = tracer.span('tts.synthesize', chars=len(text), streaming=True)
+        
         try:
-            if output_file is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_file = self.audio_dir / f"tts_{timestamp}.mp3"
-            else:
-                output_file = Path(output_file)
+            if cache_key:
+                data = self.cache.get_bytes(cache_key)
+                if data is not None:
+                    span.set(cache='hit')
+                    frame = self._decode(data)
+                    yield frame
+                    self._store(text, frame)
+                    return
             
-            # 1. 先生成原始語音檔
-            temp_file = self.audio_dir / "temp_tts_raw.mp3"
-            tts = gTTS(text=text, lang=self.language, slow=False)
-            tts.save(str(temp_file))
+            # 整句共用一個 WSOLA 狀態：片段之間沒有接縫，接起來就是整句調整語速的結果
+            stretcher = None
+            chunks = []
+            engine = None
+            for chunk, engine in self.engines.synthesize_stream(text, self.language):
+                if stretcher is None:
+                    stretcher = TimeStretcher(chunk.sample_rate, self.speed_factor)
+                    span.set(engine=engine.name)
+                samples = stretcher.push(chunk.samples)
+                if len(samples):
+                    chunks.append(samples)
+                    yield AudioFrame(samples, chunk.sample_rate)
             
-            # 2. 如果語速不是 1.0，則進行處理
-            if self.speed_factor != 1.0:
-                audio = AudioSegment.from_file(str(temp_file))
-                # 調整速度而不改變音調 (使用 speedup)
-                # chunk_size 與 crossfade 能減少加速後的爆音感
-                fast_audio = audio.speedup(playback_speed=self.speed_factor, chunk_size=150, crossfade=25)
-                fast_audio.export(str(output_file), format="mp3")
-                
-                if temp_file.exists():
-                    temp_file.unlink() # 刪除暫存原速檔
-            else:
-                os.rename(temp_file, output_file)
+            if stretcher is None:
+                return
+            samples = stretcher.flush()
+            if len(samples):
+                chunks.append(samples)
+                yield AudioFrame(samples, chunk.sample_rate)
+        finally:
+            span.finish()
+        
+        if not chunks:
+            return
+        frame = AudioFrame(np.concatenate(chunks), chunk.sample_rate)
+        if cache_key and engine is self.engines.primary:
+            self.cache.put(cache_key, frame.to_wav_bytes(), suffix='.wav')
+        self._store(text, frame)
+    
+    def _synthesize_uncached(self, text: str) -> Tuple[AudioFrame, TTSEngine]:
+        """呼叫 TTS 引擎並調整語速，回傳 (音訊, 實際使用的引擎)"""
+        frame, engine = self.engines.synthesize(text, self.language)
+        return self._apply_speed(frame), engine
+    
+    def _apply_speed(self, frame: AudioFrame) -> AudioFrame:
+        """語速不是 1.0 時，直接在 PCM 上調整速度而不改變音調（向量化 WSOLA）"""
+        if self.speed_factor == 1.0:
+            return frame
+        samples = time_stretch(frame.samples, frame.sample_rate, self.speed_factor)
+        return AudioFrame(samples, frame.sample_rate, frame.start_index)
+    
+    @staticmethod
+    def _decode(data: bytes) -> AudioFrame:
+        """解碼快取內容（WAV 直接解析，舊版的 MP3 快取才需要 ffmpeg）"""
+        if data[:4] == b'RIFF':
+            return AudioFrame.from_wav_bytes(data)
+        
+        audio = AudioSegment.from_file(io.BytesIO(data)).set_channels(1).set_sample_width(2)
+        return AudioFrame(np.frombuffer(audio.raw_data, dtype=np.int16), audio.frame_rate)
+    
+    def save(self, frame: AudioFrame, output_file: Union[str, Path]) -> Path:
+        """將 PCM 寫入檔案（依副檔名決定格式，.wav 不需要編碼）"""
+        output_file = Path(output_file)
+        fmt = output_file.suffix.lstrip('.').lower() or 'wav'
+        
+        if fmt == 'wav':
+            output_file.write_bytes(frame.to_wav_bytes())
+        else:
+            AudioSegment(
+                data=bytes(frame.to_bytes()),
+                sample_width=2,
+                frame_rate=frame.sample_rate,
+                channels=1
+            ).export(str(output_file), format=fmt)
+        
+        return output_file
+    
+    def render(self, text: str) -> Tuple[Optional[str], AudioFrame]:
+        """
+        合成並準備好可直接播放的檔案
+        
+        Args:
+            text: 要合成的文字
+            
+        Returns:
+            (音訊檔路徑, PCM)；PCM 可直接交給音訊輸出與回音消除，不必再解碼檔案
+            關閉保存 (AUDIO_SPOOL_KEEP=false) 且沒有快取檔時，路徑為 None
+        """
+        frame = self.synthesize(text)
+        return self._store(text, frame), frame
+    
+    def _store(self, text: str, frame: AudioFrame) -> Optional[str]:
+        """依設定保存合成好的一句（暫存區、MP3 封存），回傳可播放的檔案路徑"""
+        # 快取裡已經有同格式的檔案就直接播放，不再寫一份
+        path = None
+        if self.cache:
+            cached = self.cache.peek(self._cache_key(text))
+            if cached is not None and cached.suffix.lstrip('.') == self.output_format:
+                path = cached
+        
+        if path is None and self.spool.keep:
+            path = self.save(frame, self.spool.new_path(f".{self.output_format}"))
+        
+        if self.archive_mp3:
+            self._archive(frame)
+        
+        return str(path) if path else None
+    
+    def _archive(self, frame: AudioFrame):
+        """在背景把 PCM 編碼成 MP3 封存（同樣受暫存區的容量與天數限制）"""
+        def encode():
+            try:
+                self.save(frame, self.spool.new_path('.mp3', subdir='archive'))
+            except Exception as e:
+                print(f"⚠️  MP3 封存失敗: {e}")
+        
+        threading.Thread(target=encode, daemon=True).start()
+    
+    def speak(self, text: str, output_file: str = None, play: bool = False) -> str:
+        """將文字轉換為語音並調整語速"""
+        try:
+            with tracer.span('tts.speak', chars=len(text)):
+                if output_file is None:
+                    audio_file, frame = self.render(text)
+                    if audio_file is None:
+                        # 呼叫端需要檔案：即使關閉保存也寫一份到暫存區（之後由清理線程回收）
+                        audio_file = str(self.save(frame, self.spool.new_path(f".{self.output_format}")))
+                else:
+                    audio_file = str(self.save(self.synthesize(text), output_file))
             
             if play:
-                self.play_audio(str(output_file))
+                self.play_audio(audio_file)
             
-            return str(output_file)
+            return audio_file
             
         except Exception as e:
             print(f"❌ TTS 錯誤: {e}")
             return ""
     
+    def preseed_cache(self, phrases: Iterable[str]) -> int:
+        """
+        預先合成常用句子並放入快取（可在背景線程呼叫）
+        
+        Returns:
+            新合成的句數
+        """
+        if not self.cache:
+            return 0
+        
+        count = 0
+        for phrase in phrases:
+            if self._cache_key(phrase) in self.cache:
+                continue
+            try:
+                self.synthesize(phrase)
+                count += 1
+            except Exception as e:
+                print(f"⚠️  預熱失敗「{phrase}」: {e}")
+        return count
+    
+    def load_pcm(self, audio_file: str, sample_rate: int = 16000):
+        """將音訊檔解碼為單聲道 int16 PCM（供回音消除當參考訊號）"""
+        if str(audio_file).lower().endswith('.wav'):
+            # WAV 直接解析，不經過 ffmpeg
+            try:
+                frame = AudioFrame.from_wav_bytes(Path(audio_file).read_bytes())
+                return frame.resample(sample_rate).samples
+            except ValueError:
+                pass
+        
+        audio = AudioSegment.from_file(str(audio_file))
+        audio = audio.set_channels(1).set_frame_rate(sample_rate).set_sample_width(2)
+        return np.frombuffer(audio.raw_data, dtype=np.int16)
+    
     def play_audio(self, audio_file: str):
-        """播放音訊檔案 (Mac)"""
+        """播放音訊檔案（透過長駐的音訊輸出，播完才回傳）"""
         try:
-            # 使用 afplay 播放
-            subprocess.run(['afplay', audio_file], check=True)
+            if self._sink is None:
+                self._sink = create_sink()
+            samples = self.load_pcm(audio_file, self._sink.sample_rate)
+            self._sink.play(AudioFrame(samples, self._sink.sample_rate)).wait()
         except Exception as e:
             print(f"❌ 播放失敗: {e}")
 
+# 使用相對匯入，請在專案根目錄以 python -m src.voice.tts 執行
 if __name__ == "__main__":
     tts = TextToSpeech()
-    print(f"🚀 當前設定語速: {tts.speed_factor}x")
-    tts.speak("你好！我是陪讀小助手，現在我的講話速度已經加快了，聽起來應該比較自然一點吧？", play=True)
\ No newline at end of file
+    print(f"🚀 當前設定語速: {tts.speed_factor}x，引擎: {[e.name for e in tts.engines.engines]}")
+    tts.speak("你好！我是陪讀小助手，現在我的講話速度已經加快了，聽起來應該比較自然一點吧？", play=True)
@@ -0,0 +1,222 @@
+"""
+TTS 語音快取模組
+以 (文字, 語言, 語速, 引擎) 的雜湊值為鍵，把處理好的語音存在磁碟上；
+超過容量上限時依最近使用時間 (LRU) 淘汰，常用的項目另外保留在記憶體中
+
+固定句子（打招呼、再見、常見開場白）命中快取後不需要再呼叫 gTTS
+"""
+
+import os
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class TTSCache:
+    """內容定址的 TTS 快取（磁碟 LRU + 選用的記憶體熱區）"""
+
+    def __init__(self, cache_dir: str = None, max_mb: float = None, memory_items: int = None):
+        """
+        初始化快取
+
+        Args:
+            cache_dir: 快取目錄，預設 {DATA_DIR}/tts_cache
+            max_mb: 磁碟容量上限（MB）
+            memory_items: 記憶體熱區保留幾筆，0 表示停用
+        """
+        self.cache_dir = Path(cache_dir or os.getenv(
+            'TTS_CACHE_DIR',
+            str(Path(os.getenv('DATA_DIR', './data')) / 'tts_cache')
+        ))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.max_bytes = int((max_mb or float(os.getenv('TTS_CACHE_MAX_MB', '200'))) * 1024 * 1024)
+        self.memory_items = memory_items if memory_items is not None else \
+                            int(os.getenv('TTS_CACHE_MEMORY_ITEMS', '32'))
+
+        self._lock = threading.Lock()
+        # key -> (路徑, 大小)，順序即 LRU 順序（最舊的在前）
+        self._index: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self._load_index()
+
+    @staticmethod
+    def make_key(text: str, language: str, speed_factor: float, engine: str) -> str:
+        """計算快取鍵（內容雜湊）"""
+        payload = f"{engine}\x00{language}\x00{speed_factor:.3f}\x00{text.strip()}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _load_index(self):
+        """掃描快取目錄，依修改時間重建 LRU 順序"""
+        entries = []
+        for path in self.cache_dir.glob('*/*'):
+            if path.is_file() and not path.name.startswith('.'):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem, path, stat.st_size))
+
+        for _, key, path, size in sorted(entries):
+            self._index[key] = (path, size)
+            self.total_bytes += size
+
+    def _path_for(self, key: str, suffix: str) -> Path:
+        # 以前兩碼分目錄，避免單一目錄檔案過多
+        return self.cache_dir / key[:2] / f"{key}{suffix}"
+
+    def get(self, key: str) -> Optional[Path]:
+        """
+        取得快取檔案路徑
+
+        Returns:
+            命中時回傳路徑（同時更新 LRU 順序），否則 None
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            path, _ = entry
+            if not path.exists():
+                self._drop(key)
+                self.misses += 1
+                return None
+
+            self._index.move_to_end(key)
+            self.hits += 1
+
+        # 更新修改時間，重新啟動後仍保有 LRU 順序
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def peek(self, key: str) -> Optional[Path]:
+        """查詢快取檔案路徑（不計入命中統計、不更新 LRU 順序）"""
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is None or not entry[0].exists():
+            return None
+        return entry[0]
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """取得快取內容（優先從記憶體熱區）"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                if key in self._index:
+                    self._index.move_to_end(key)
+                self.hits += 1
+                return data
+
+        path = self.get(key)
+        if path is None:
+            return None
+
+        data = path.read_bytes()
+        self._remember(key, data)
+        return data
+
+    def put(self, key: str, source: Union[str, Path, bytes], suffix: str = '.mp3') -> Path:
+        """
+        存入快取
+
+        Args:
+            key: 快取鍵
+            source: 檔案路徑（以硬連結或複製存入）或音訊 bytes
+            suffix: 副檔名
+
+        Returns:
+            快取檔案路徑
+        """
+        path = self._path_for(key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+
+        if isinstance(source, (bytes, bytearray)):
+            temp.write_bytes(source)
+            self._remember(key, bytes(source))
+        else:
+            try:
+                os.link(source, temp)
+            except OSError:
+                shutil.copyfile(source, temp)
+
+        # 原子替換，讀取端不會看到寫了一半的檔案
+        os.replace(temp, path)
+        size = path.stat().st_size
+
+        with self._lock:
+            if key in self._index:
+                self.total_bytes -= self._index[key][1]
+            self._index[key] = (path, size)
+            self._index.move_to_end(key)
+            self.total_bytes += size
+            self._evict()
+
+        return path
+
+    def _remember(self, key: str, data: bytes):
+        """放進記憶體熱區"""
+        if self.memory_items <= 0:
+            return
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _evict(self):
+        """超過容量時淘汰最久沒用的項目（需持有鎖）"""
+        while self.total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            path, _ = self._index[key]
+            self._drop(key)
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _drop(self, key: str):
+        """從索引移除（需持有鎖）"""
+        _, size = self._index.pop(key)
+        self.total_bytes -= size
+        self._memory.pop(key, None)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index
+
+    def stats(self) -> dict:
+        """快取統計"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._index),
+            'memory_entries': len(self._memory),
+            'size_mb': self.total_bytes / 1024 / 1024,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+def load_phrase_list(path: Union[str, Path]) -> Iterable[str]:
+    """讀取預熱句子清單（一行一句，# 開頭為註解）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
@@ -0,0 +1,295 @@
+"""
+TTS 引擎模組
+把「文字 → PCM」抽成可替換的引擎，TextToSpeech 依設定的順序使用，
+前一個失敗（例如沒有網路）就改用下一個
+
+GTTSEngine   : Google TTS（需要網路，音質最好）
+PiperEngine  : Piper 本地神經網路語音（離線，可串流輸出）
+ESpeakEngine : eSpeak-NG（離線、極快，機器音較重）
+
+TTS_ENGINES=gtts,piper,espeak 設定順序；不存在的引擎會自動略過
+"""
+
+import io
+import os
+import json
+import time
+import shutil
+import threading
+import subprocess
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .audio_frame import AudioFrame
+
+load_dotenv()
+
+
+class TTSEngine(ABC):
+    """TTS 引擎基類"""
+
+    name = 'base'
+
+    # 是否需要網路（需要網路的引擎失敗後會暫停一段時間再重試）
+    requires_network = False
+
+    @abstractmethod
+    def synthesize(self, text: str, language: str) -> AudioFrame:
+        """
+        合成整句語音
+
+        Args:
+            text: 要合成的文字
+            language: 語言代碼（例如 zh-TW）
+
+        Returns:
+            單聲道 int16 AudioFrame（原始語速）
+        """
+        pass
+
+    def synthesize_stream(self, text: str, language: str) -> Iterator[AudioFrame]:
+        """串流合成（引擎不支援時一次回傳整句）"""
+        yield self.synthesize(text, language)
+
+    def is_available(self) -> bool:
+        """檢查這台機器能不能使用此引擎"""
+        return True
+
+
+class GTTSEngine(TTSEngine):
+    """Google TTS（gTTS → 記憶體中的 MP3 → 解碼一次）"""
+
+    name = 'gtts'
+    requires_network = True
+
+    def __init__(self):
+        self.slow = os.getenv('TTS_SLOW', 'false').lower() == 'true'
+        self.timeout = float(os.getenv('GTTS_TIMEOUT', '5'))
+
+    def synthesize(self, text: str, language: str) -> AudioFrame:
+        from gtts import gTTS
+        from pydub import AudioSegment
+
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=language, slow=self.slow, timeout=self.timeout).write_to_fp(buffer)
+        buffer.seek(0)
+
+        audio = AudioSegment.from_file(buffer, format="mp3").set_channels(1).set_sample_width(2)
+        return AudioFrame(np.frombuffer(audio.raw_data, dtype=np.int16), audio.frame_rate)
+
+    def is_available(self) -> bool:
+        try:
+            import gtts  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+
+class ESpeakEngine(TTSEngine):
+    """eSpeak-NG（輸出 WAV 到 stdout）"""
+
+    name = 'espeak'
+
+    # gTTS 語言代碼 → eSpeak 語音
+    VOICES = {
+        'zh-tw': 'cmn',
+        'zh-cn': 'cmn',
+        'zh': 'cmn',
+        'en': 'en-us',
+        'en-us': 'en-us',
+        'en-gb': 'en',
+    }
+
+    def __init__(self):
+        self.binary = shutil.which('espeak-ng') or shutil.which('espeak')
+        self.voice = os.getenv('ESPEAK_VOICE')
+        self.words_per_minute = int(os.getenv('ESPEAK_WPM', '160'))
+
+    def synthesize(self, text: str, language: str) -> AudioFrame:
+        voice = self.voice or self.VOICES.get(language.lower(), language.lower())
+        result = subprocess.run(
+            [self.binary, '--stdout', '-v', voice, '-s', str(self.words_per_minute), text],
+            capture_output=True,
+            check=True,
+            timeout=30
+        )
+        return AudioFrame.from_wav_bytes(result.stdout)
+
+    def is_available(self) -> bool:
+        return self.binary is not None
+
+
+class PiperEngine(TTSEngine):
+    """Piper 本地神經網路語音（raw PCM 從 stdout 串流輸出）"""
+
+    name = 'piper'
+
+    def __init__(self, model_path: str = None):
+        """
+        Args:
+            model_path: .onnx 語音模型路徑，預設讀 PIPER_MODEL
+        """
+        self.binary = shutil.which('piper')
+        self.model_path = Path(model_path or os.getenv('PIPER_MODEL', ''))
+        self.sample_rate = self._read_sample_rate()
+        self.chunk_samples = self.sample_rate // 4  # 串流時每 250ms 交出一段
+
+    def _read_sample_rate(self) -> int:
+        """從模型旁的 .onnx.json 讀取取樣率"""
+        if not self.model_path.name:
+            return 22050    # 沒有設定 PIPER_MODEL（is_available 會回傳 False）
+        config = self.model_path.with_name(self.model_path.name + '.json')
+        try:
+            with open(config, 'r', encoding='utf-8') as f:
+                return int(json.load(f)['audio']['sample_rate'])
+        except (OSError, KeyError, ValueError):
+            return 22050
+
+    def _command(self) -> List[str]:
+        return [self.binary, '--model', str(self.model_path), '--output_raw']
+
+    def synthesize(self, text: str, language: str) -> AudioFrame:
+        result = subprocess.run(
+            self._command(),
+            input=text.encode('utf-8'),
+            capture_output=True,
+            check=True,
+            timeout=30
+        )
+        return AudioFrame(np.frombuffer(result.stdout, dtype=np.int16), self.sample_rate)
+
+    def synthesize_stream(self, text: str, language: str) -> Iterator[AudioFrame]:
+        process = subprocess.Popen(
+            self._command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            process.stdin.write(text.encode('utf-8'))
+            process.stdin.close()
+
+            chunk_bytes = self.chunk_samples * 2
+            start_index = 0
+            while True:
+                data = process.stdout.read(chunk_bytes)
+                if not data:
+                    break
+                samples = np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16)
+                yield AudioFrame(samples, self.sample_rate, start_index)
+                start_index += len(samples)
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+
+        if process.returncode not in (0, -9):
+            raise RuntimeError(f"piper 結束碼 {process.returncode}")
+
+    def is_available(self) -> bool:
+        return self.binary is not None and self.model_path.is_file()
+
+
+ENGINES = {
+    'gtts': GTTSEngine,
+    'piper': PiperEngine,
+    'espeak': ESpeakEngine,
+}
+
+
+class EngineChain:
+    """依序嘗試多個引擎的 TTS（備援鏈）"""
+
+    def __init__(self, engines: List[TTSEngine], retry_seconds: float = None):
+        """
+        Args:
+            engines: 依優先順序排列的引擎
+            retry_seconds: 需要網路的引擎失敗後，暫停多久才再試
+        """
+        self.engines = engines
+        self.retry_seconds = retry_seconds if retry_seconds is not None else \
+                             float(os.getenv('TTS_ENGINE_RETRY_SECONDS', '60'))
+        self._disabled_until = {}
+        self._lock = threading.Lock()
+
+    @property
+    def primary(self) -> Optional[TTSEngine]:
+        return self.engines[0] if self.engines else None
+
+    def _candidates(self) -> List[TTSEngine]:
+        """目前可用的引擎（失敗後冷卻中的網路引擎先跳過，以免每句都等逾時）"""
+        now = time.monotonic()
+        with self._lock:
+            ready = [e for e in self.engines if self._disabled_until.get(e.name, 0) <= now]
+        return ready or self.engines
+
+    def _mark_failed(self, engine: TTSEngine, error: Exception):
+        print(f"⚠️  TTS 引擎 {engine.name} 失敗，改用下一個: {error}")
+        if engine.requires_network:
+            with self._lock:
+                self._disabled_until[engine.name] = time.monotonic() + self.retry_seconds
+
+    def synthesize(self, text: str, language: str) -> Tuple[AudioFrame, TTSEngine]:
+        """
+        合成整句語音
+
+        Returns:
+            (AudioFrame, 實際使用的引擎)
+        """
+        last_error = None
+        for engine in self._candidates():
+            try:
+                return engine.synthesize(text, language), engine
+            except Exception as e:
+                last_error = e
+                self._mark_failed(engine, e)
+        raise RuntimeError(f"所有 TTS 引擎都失敗: {last_error}")
+
+    def synthesize_stream(self, text: str, language: str) -> Iterator[Tuple[AudioFrame, TTSEngine]]:
+        """
+        串流合成；已經交出音訊後才失敗就不再切換引擎（避免同一句講兩次）
+        """
+        last_error = None
+        for engine in self._candidates():
+            produced = False
+            try:
+                for frame in engine.synthesize_stream(text, language):
+                    produced = True
+                    yield frame, engine
+                return
+            except Exception as e:
+                if produced:
+                    raise
+                last_error = e
+                self._mark_failed(engine, e)
+        raise RuntimeError(f"所有 TTS 引擎都失敗: {last_error}")
+
+
+def create_engine_chain(names: str = None) -> EngineChain:
+    """
+    依設定建立引擎鏈
+
+    Args:
+        names: 以逗號分隔的引擎名稱，預設讀 TTS_ENGINES（gtts,piper,espeak）
+    """
+    names = names or os.getenv('TTS_ENGINES', 'gtts,piper,espeak')
+
+    engines = []
+    for name in filter(None, (n.strip().lower() for n in names.split(','))):
+        engine_class = ENGINES.get(name)
+        if engine_class is None:
+            print(f"⚠️  未知的 TTS 引擎: {name}")
+            continue
+        engine = engine_class()
+        if engine.is_available():
+            engines.append(engine)
+
+    if not engines:
+        print("⚠️  沒有可用的 TTS 引擎，改用 gTTS")
+        engines.append(GTTSEngine())
+
+    return EngineChain(engines)
@@ -0,0 +1,156 @@
+"""
+語音活動偵測 (Voice Activity Detection) 模組
+以音框能量搭配自適應噪音底線判斷是否有人說話，
+並把連續的語音音框切成一段段的語句
+
+輸入可以是 np.ndarray 或 AudioFrame；有提供環形緩衝區時，
+語句結束直接回傳緩衝區內的視圖，不再串接音框
+"""
+
+import os
+from collections import deque
+from typing import Optional, Union
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .audio_frame import AudioFrame, AudioRingBuffer, as_samples
+
+load_dotenv()
+
+
+class EnergyVAD:
+    """能量式 VAD（逐音框處理，適合即時串流）"""
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 20,
+                 threshold_ratio: float = None, min_speech_ms: int = None,
+                 hangover_ms: int = None, max_segment_ms: int = None,
+                 preroll_ms: int = 200, source: AudioRingBuffer = None):
+        """
+        初始化 VAD
+
+        Args:
+            sample_rate: 取樣率（Hz）
+            frame_ms: 音框長度（毫秒）
+            threshold_ratio: 能量超過噪音底線幾倍視為語音
+            min_speech_ms: 少於此長度的語音段視為雜訊丟棄
+            hangover_ms: 靜音持續多久才判定語句結束
+            max_segment_ms: 單段語音最長長度，超過即強制切段
+            preroll_ms: 語音起點前保留的音訊長度，避免吃掉第一個字
+            source: 音框所在的環形緩衝區（MicrophoneStream.buffer）
+        """
+        self.sample_rate = sample_rate
+        self.source = source
+        self.frame_ms = frame_ms
+
+        self.threshold_ratio = threshold_ratio or float(os.getenv('VAD_THRESHOLD_RATIO', '3.0'))
+        min_speech_ms = min_speech_ms or int(os.getenv('VAD_MIN_SPEECH_MS', '150'))
+        hangover_ms = hangover_ms or int(os.getenv('VAD_HANGOVER_MS', '300'))
+        max_segment_ms = max_segment_ms or int(os.getenv('VAD_MAX_SEGMENT_MS', '10000'))
+
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.max_segment_frames = max(1, max_segment_ms // frame_ms)
+
+        # 噪音底線（RMS），以指數移動平均在非語音時更新
+        self.min_noise_floor = float(os.getenv('VAD_MIN_NOISE_FLOOR', '50'))
+        self.noise_floor = self.min_noise_floor
+        self.noise_alpha = 0.05
+
+        # 播放期間消除後的殘餘回音能量（由 EchoCanceller 更新），語音必須明顯大於殘餘回音
+        self.echo_level = 0.0
+        self.echo_ratio = float(os.getenv('VAD_ECHO_RATIO', '2.0'))
+
+        self._preroll = deque(maxlen=max(1, preroll_ms // frame_ms))
+        self.reset()
+
+    def reset(self):
+        """清除目前的語音段狀態（保留噪音底線）"""
+        self._segment = []
+        self._speech_frames = 0
+        self._silence_frames = 0
+        self.in_speech = False
+        self.last_speech = False
+        self._preroll.clear()
+
+    @staticmethod
+    def frame_rms(frame: np.ndarray) -> float:
+        """計算音框 RMS 能量"""
+        samples = frame.astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+    def set_echo_level(self, rms: float):
+        """設定目前（消除後）的殘餘回音能量（0 表示沒有在播放）"""
+        self.echo_level = rms
+
+    def is_speech(self, frame: Union[np.ndarray, AudioFrame]) -> bool:
+        """判斷單一音框是否為語音，並在靜音時更新噪音底線"""
+        rms = self.frame_rms(as_samples(frame))
+        threshold = max(self.noise_floor * self.threshold_ratio, self.echo_level * self.echo_ratio)
+        speech = rms > threshold
+
+        # 播放期間的殘餘回音不能算進噪音底線
+        if not speech and self.echo_level == 0:
+            self.noise_floor = max(
+                self.min_noise_floor,
+                (1 - self.noise_alpha) * self.noise_floor + self.noise_alpha * rms
+            )
+        return speech
+
+    def process(self, frame: Union[np.ndarray, AudioFrame]) -> Optional[Union[np.ndarray, AudioFrame]]:
+        """
+        處理一個音框
+
+        Args:
+            frame: int16 PCM 音框（np.ndarray 或 AudioFrame）
+
+        Returns:
+            語句結束時回傳整段語音（含前導音訊，型別同輸入），否則回傳 None
+        """
+        speech = self.is_speech(frame)
+        self.last_speech = speech
+
+        if not self.in_speech:
+            if speech:
+                self.in_speech = True
+                self._segment = list(self._preroll)
+                self._speech_frames = 0
+                self._silence_frames = 0
+            else:
+                self._preroll.append(frame)
+                return None
+
+        self._segment.append(frame)
+
+        if speech:
+            self._speech_frames += 1
+            self._silence_frames = 0
+        else:
+            self._silence_frames += 1
+
+        ended = self._silence_frames >= self.hangover_frames
+        too_long = len(self._segment) >= self.max_segment_frames
+
+        if not (ended or too_long):
+            return None
+
+        segment = self._segment
+        enough_speech = self._speech_frames >= self.min_speech_frames
+        self.reset()
+
+        if not enough_speech:
+            return None
+        return self._join(segment)
+
+    def _join(self, segment: list):
+        """把音框組成一段語音；在環形緩衝區內連續時直接取視圖"""
+        if not isinstance(segment[0], AudioFrame):
+            return np.concatenate(segment)
+
+        if self.source is not None:
+            joined = self.source.read(segment[0].start_index, segment[-1].end_index)
+            if joined is not None:
+                return joined
+
+        samples = np.concatenate([f.samples for f in segment])
+        return AudioFrame(samples, segment[0].sample_rate, segment[0].start_index)